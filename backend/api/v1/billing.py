@@ -14,6 +14,7 @@ Polar API Reference:
 - GET /v1/orders/?customer_id={id} - List customer orders
 - GET /v1/customers/{id} - Get customer details
 """
+import importlib.util
 import httpx
 import logging
 from typing import List, Optional
@@ -29,6 +30,11 @@ logger = logging.getLogger(__name__)
 
 POLAR_API_BASE = "https://api.polar.sh/v1"
 
+# One keep-alive pool for all Polar calls in this process (see get_polar_client)
+POLAR_HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=20)
+POLAR_HTTP2 = importlib.util.find_spec("h2") is not None
+_polar_client: Optional[httpx.AsyncClient] = None
+
 
 # ============================================================
 # CONSTANTS & METADATA
@@ -136,6 +142,33 @@ def get_polar_headers() -> dict:
     }
 
 
+def get_polar_client() -> httpx.AsyncClient:
+    """
+    Shared Polar API client (created on first use).
+    
+    Reusing one pooled client keeps connections to api.polar.sh alive across
+    requests instead of paying a TLS handshake per call, and negotiates
+    HTTP/2 when h2 is installed.
+    """
+    global _polar_client
+    if _polar_client is None or _polar_client.is_closed:
+        _polar_client = httpx.AsyncClient(
+            http2=POLAR_HTTP2,
+            limits=POLAR_HTTP_LIMITS,
+            timeout=30.0,
+            follow_redirects=True,
+        )
+    return _polar_client
+
+
+async def close_polar_client() -> None:
+    """Close the shared Polar client (application shutdown)."""
+    global _polar_client
+    if _polar_client is not None:
+        await _polar_client.aclose()
+        _polar_client = None
+
+
 async def get_customer_id_for_user(user_id: str) -> Optional[str]:
     """
     Get Polar customer_id for a user.
@@ -163,21 +196,21 @@ async def get_customer_id_for_user(user_id: str) -> Optional[str]:
         
         if sub_response.data and sub_response.data[0].get("polar_id"):
             polar_sub_id = sub_response.data[0]["polar_id"]
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{POLAR_API_BASE}/subscriptions/{polar_sub_id}",
-                    headers=get_polar_headers()
-                )
-                if response.status_code == 200:
-                    sub_data = response.json()
-                    customer_id = sub_data.get("customer", {}).get("id")
-                    if customer_id:
-                        # Cache it in our database
-                        supabase.table("subscriptions").update({
-                            "customer_id": customer_id
-                        }).eq("team_id", team_id).execute()
-                        return customer_id
-        
+            client = get_polar_client()
+            response = await client.get(
+                f"{POLAR_API_BASE}/subscriptions/{polar_sub_id}",
+                headers=get_polar_headers()
+            )
+            if response.status_code == 200:
+                sub_data = response.json()
+                customer_id = sub_data.get("customer", {}).get("id")
+                if customer_id:
+                    # Cache it in our database
+                    supabase.table("subscriptions").update({
+                        "customer_id": customer_id
+                    }).eq("team_id", team_id).execute()
+                    return customer_id
+
         # 3. Fallback: Search Polar by Email (Self-healing)
         # If we have no local record, check if they exist in Polar (e.g. they bought it, webhook failed)
         user_email = None
@@ -191,21 +224,21 @@ async def get_customer_id_for_user(user_id: str) -> Optional[str]:
             logger.warning(f"[Billing] Failed to fetch user email: {e}")
 
         if user_email:
-             async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{POLAR_API_BASE}/customers",
-                    params={"email": user_email, "limit": 1},
-                    headers=get_polar_headers()
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    items = data.get("items", [])
-                    if items:
-                         customer_id = items[0].get("id")
-                         logger.info(f"[Billing] Found customer_id via email lookup: {customer_id}")
-                         # Cache it (requires creating/updating subscription row likely, or just return for now)
-                         # We'll return it so billing history works, next webhook/sync will fix DB.
-                         return customer_id
+            client = get_polar_client()
+            response = await client.get(
+                f"{POLAR_API_BASE}/customers",
+                params={"email": user_email, "limit": 1},
+                headers=get_polar_headers()
+            )
+            if response.status_code == 200:
+                data = response.json()
+                items = data.get("items", [])
+                if items:
+                     customer_id = items[0].get("id")
+                     logger.info(f"[Billing] Found customer_id via email lookup: {customer_id}")
+                     # Cache it (requires creating/updating subscription row likely, or just return for now)
+                     # We'll return it so billing history works, next webhook/sync will fix DB.
+                     return customer_id
 
         return None
         
@@ -227,83 +260,83 @@ async def list_plans():
         logger.warning("[Billing] Polar token not configured")
         return []
 
-    async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-        try:
-            response = await client.get(
-                f"{POLAR_API_BASE}/products?is_archived=false",
-                headers=get_polar_headers()
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"[Billing] Polar API Error: {response.status_code}")
-                return []
-            
-            data = response.json()
-            items = data.get("items", [])
-            plans = []
-            
-            # Map Polar Product IDs to plan types
-            product_mapping = {
-                settings.POLAR_PRODUCT_ID_STARTER_MONTHLY: "starter",
-                settings.POLAR_PRODUCT_ID_PRO_MONTHLY: "pro",
-            }
-            
-            if hasattr(settings, 'POLAR_PRODUCT_ID_ENTERPRISE') and settings.POLAR_PRODUCT_ID_ENTERPRISE:
-                product_mapping[settings.POLAR_PRODUCT_ID_ENTERPRISE] = "enterprise"
-
-            for item in items:
-                product_id = item.get("id")
-                if product_id in product_mapping:
-                    prices = item.get("prices", [])
-                    if not prices:
-                        continue
-                    
-                    price = prices[0]
-                    plan_type = product_mapping[product_id]
-                    meta = PLAN_METADATA.get(plan_type, {})
-                    
-                    plans.append(PlanResponse(
-                        id=product_id,
-                        name=item.get("name", ""),
-                        description=item.get("description", ""),
-                        price_amount=price.get("price_amount", 0),
-                        price_currency=price.get("price_currency", "usd"),
-                        interval=price.get("recurring_interval", "month"),
-                        type=plan_type,
-                        features=meta.get("features", []),
-                        button_text=meta.get("button_text", "Subscribe"),
-                        button_variant=meta.get("button_variant", "default"),
-                        popular=meta.get("popular", False)
-                    ))
-            
-            # Sort: starter, pro, enterprise
-            order = {"starter": 0, "pro": 1, "enterprise": 2}
-            plans.sort(key=lambda x: order.get(x.type, 99))
-
-            # Ensure Enterprise is present even if not in Polar (as "Contact Us" fallback)
-            # This is optional but good if Enterprise is not a real Polar product yet
-            has_enterprise = any(p.type == "enterprise" for p in plans)
-            if not has_enterprise:
-                ent_meta = PLAN_METADATA["enterprise"]
+    client = get_polar_client()
+    try:
+        response = await client.get(
+            f"{POLAR_API_BASE}/products?is_archived=false",
+            headers=get_polar_headers()
+        )
+        
+        if response.status_code != 200:
+            logger.error(f"[Billing] Polar API Error: {response.status_code}")
+            return []
+        
+        data = response.json()
+        items = data.get("items", [])
+        plans = []
+        
+        # Map Polar Product IDs to plan types
+        product_mapping = {
+            settings.POLAR_PRODUCT_ID_STARTER_MONTHLY: "starter",
+            settings.POLAR_PRODUCT_ID_PRO_MONTHLY: "pro",
+        }
+        
+        if hasattr(settings, 'POLAR_PRODUCT_ID_ENTERPRISE') and settings.POLAR_PRODUCT_ID_ENTERPRISE:
+            product_mapping[settings.POLAR_PRODUCT_ID_ENTERPRISE] = "enterprise"
+
+        for item in items:
+            product_id = item.get("id")
+            if product_id in product_mapping:
+                prices = item.get("prices", [])
+                if not prices:
+                    continue
+                
+                price = prices[0]
+                plan_type = product_mapping[product_id]
+                meta = PLAN_METADATA.get(plan_type, {})
+                
                 plans.append(PlanResponse(
-                    id="enterprise-contact-us",
-                    name="Enterprise",
-                    description="For organizations at scale",
-                    price_amount=0,
-                    price_currency="usd",
-                    interval="",
-                    type="enterprise",
-                    features=ent_meta["features"],
-                    button_text=ent_meta["button_text"],
-                    button_variant=ent_meta["button_variant"],
-                    popular=ent_meta["popular"]
+                    id=product_id,
+                    name=item.get("name", ""),
+                    description=item.get("description", ""),
+                    price_amount=price.get("price_amount", 0),
+                    price_currency=price.get("price_currency", "usd"),
+                    interval=price.get("recurring_interval", "month"),
+                    type=plan_type,
+                    features=meta.get("features", []),
+                    button_text=meta.get("button_text", "Subscribe"),
+                    button_variant=meta.get("button_variant", "default"),
+                    popular=meta.get("popular", False)
                 ))
-            
-            return plans
-            
-        except Exception as e:
-            logger.error(f"[Billing] Failed to fetch plans: {e}")
-            return []
+        
+        # Sort: starter, pro, enterprise
+        order = {"starter": 0, "pro": 1, "enterprise": 2}
+        plans.sort(key=lambda x: order.get(x.type, 99))
+
+        # Ensure Enterprise is present even if not in Polar (as "Contact Us" fallback)
+        # This is optional but good if Enterprise is not a real Polar product yet
+        has_enterprise = any(p.type == "enterprise" for p in plans)
+        if not has_enterprise:
+            ent_meta = PLAN_METADATA["enterprise"]
+            plans.append(PlanResponse(
+                id="enterprise-contact-us",
+                name="Enterprise",
+                description="For organizations at scale",
+                price_amount=0,
+                price_currency="usd",
+                interval="",
+                type="enterprise",
+                features=ent_meta["features"],
+                button_text=ent_meta["button_text"],
+                button_variant=ent_meta["button_variant"],
+                popular=ent_meta["popular"]
+            ))
+        
+        return plans
+        
+    except Exception as e:
+        logger.error(f"[Billing] Failed to fetch plans: {e}")
+        return []
 
 
 # ============================================================
@@ -337,23 +370,23 @@ async def create_checkout_session(
     if not product_id:
         raise HTTPException(status_code=400, detail=f"Invalid plan: {data.plan}")
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            response = await client.post(
-                f"{POLAR_API_BASE}/checkouts/custom/",
-                json={
-                    "product_id": product_id,
-                    "success_url": f"{settings.APP_URL}/settings?tab=billing&checkout=success",
-                    "metadata": {"team_id": team_id}
-                },
-                headers=get_polar_headers()
-            )
-            response.raise_for_status()
-            return {"url": response.json()["url"]}
-            
-        except Exception as e:
-            logger.error(f"[Billing] Checkout error: {e}")
-            raise HTTPException(status_code=500, detail="Failed to create checkout")
+    client = get_polar_client()
+    try:
+        response = await client.post(
+            f"{POLAR_API_BASE}/checkouts/custom/",
+            json={
+                "product_id": product_id,
+                "success_url": f"{settings.APP_URL}/settings?tab=billing&checkout=success",
+                "metadata": {"team_id": team_id}
+            },
+            headers=get_polar_headers()
+        )
+        response.raise_for_status()
+        return {"url": response.json()["url"]}
+        
+    except Exception as e:
+        logger.error(f"[Billing] Checkout error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to create checkout")
 
 
 # ============================================================
@@ -381,27 +414,27 @@ async def create_portal_session(current_user_id: str = Depends(get_current_user)
                 detail="No subscription found. Please subscribe first."
             )
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            response = await client.post(
-                f"{POLAR_API_BASE}/customer-sessions",
-                json={
-                    "customer_id": customer_id,
-                    "return_url": f"{settings.APP_URL}/settings?tab=billing"
-                },
-                headers=get_polar_headers()
-            )
-            
-            if response.status_code in [200, 201]:
-                session_data = response.json()
-                portal_url = session_data.get("customer_portal_url")
-                
-                if portal_url:
-                    logger.info(f"[Billing] Portal session created for {current_user_id[:8]}...")
-                    return PortalResponse(url=portal_url)
-            
-            logger.error(f"[Billing] Customer session failed: {response.status_code} - {response.text}")
-            raise HTTPException(status_code=500, detail="Failed to create portal session")
+        client = get_polar_client()
+        response = await client.post(
+            f"{POLAR_API_BASE}/customer-sessions",
+            json={
+                "customer_id": customer_id,
+                "return_url": f"{settings.APP_URL}/settings?tab=billing"
+            },
+            headers=get_polar_headers()
+        )
+        
+        if response.status_code in [200, 201]:
+            session_data = response.json()
+            portal_url = session_data.get("customer_portal_url")
             
+            if portal_url:
+                logger.info(f"[Billing] Portal session created for {current_user_id[:8]}...")
+                return PortalResponse(url=portal_url)
+        
+        logger.error(f"[Billing] Customer session failed: {response.status_code} - {response.text}")
+        raise HTTPException(status_code=500, detail="Failed to create portal session")
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -429,41 +462,41 @@ async def get_current_subscription(current_user_id: str = Depends(get_current_us
         if not customer_id:
             return None
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{POLAR_API_BASE}/subscriptions/",
-                params={"customer_id": customer_id, "active": True},
-                headers=get_polar_headers()
-            )
-            
-            if response.status_code != 200:
-                logger.warning(f"[Billing] Subscription fetch failed: {response.status_code}")
-                return None
-            
-            data = response.json()
-            items = data.get("items", [])
-            
-            if not items:
-                return None
-            
-            # Get first active subscription
-            sub = items[0]
-            product = sub.get("product", {})
-            prices = product.get("prices", [{}])
-            price = prices[0] if prices else {}
-            
-            return SubscriptionDetailResponse(
-                id=sub.get("id", ""),
-                status=sub.get("status", "unknown"),
-                plan_name=product.get("name", "Unknown"),
-                price_amount=price.get("price_amount", 0),
-                price_currency=price.get("price_currency", "usd"),
-                interval=price.get("recurring_interval", "month"),
-                current_period_start=sub.get("current_period_start"),
-                current_period_end=sub.get("current_period_end"),
-                cancel_at_period_end=sub.get("cancel_at_period_end", False)
-            )
-            
+        client = get_polar_client()
+        response = await client.get(
+            f"{POLAR_API_BASE}/subscriptions/",
+            params={"customer_id": customer_id, "active": True},
+            headers=get_polar_headers()
+        )
+        
+        if response.status_code != 200:
+            logger.warning(f"[Billing] Subscription fetch failed: {response.status_code}")
+            return None
+        
+        data = response.json()
+        items = data.get("items", [])
+        
+        if not items:
+            return None
+        
+        # Get first active subscription
+        sub = items[0]
+        product = sub.get("product", {})
+        prices = product.get("prices", [{}])
+        price = prices[0] if prices else {}
+        
+        return SubscriptionDetailResponse(
+            id=sub.get("id", ""),
+            status=sub.get("status", "unknown"),
+            plan_name=product.get("name", "Unknown"),
+            price_amount=price.get("price_amount", 0),
+            price_currency=price.get("price_currency", "usd"),
+            interval=price.get("recurring_interval", "month"),
+            current_period_start=sub.get("current_period_start"),
+            current_period_end=sub.get("current_period_end"),
+            cancel_at_period_end=sub.get("cancel_at_period_end", False)
+        )
+        
     except Exception as e:
         logger.error(f"[Billing] Subscription error: {e}")
         return None
@@ -489,38 +522,38 @@ async def get_billing_history(current_user_id: str = Depends(get_current_user)):
         if not customer_id:
             return []
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{POLAR_API_BASE}/orders/",
-                params={"customer_id": customer_id},
-                headers=get_polar_headers()
-            )
-            
-            if response.status_code != 200:
-                logger.warning(f"[Billing] Orders fetch failed: {response.status_code}")
-                return []
-            
-            data = response.json()
-            items = data.get("items", [])
-            
-            invoices = []
-            for item in items:
-                product = item.get("product", {})
-                
-                invoices.append(InvoiceResponse(
-                    id=item.get("id", ""),
-                    amount=item.get("amount", 0),
-                    currency=item.get("currency", "usd"),
-                    status=item.get("status", "unknown"),
-                    created_at=item.get("created_at", ""),
-                    product_name=product.get("name", "Subscription"),
-                    invoice_url=item.get("invoice_url")
-                ))
-            
-            # Sort by date (most recent first)
-            invoices.sort(key=lambda x: x.created_at, reverse=True)
-            return invoices
+        client = get_polar_client()
+        response = await client.get(
+            f"{POLAR_API_BASE}/orders/",
+            params={"customer_id": customer_id},
+            headers=get_polar_headers()
+        )
+        
+        if response.status_code != 200:
+            logger.warning(f"[Billing] Orders fetch failed: {response.status_code}")
+            return []
+        
+        data = response.json()
+        items = data.get("items", [])
+        
+        invoices = []
+        for item in items:
+            product = item.get("product", {})
             
+            invoices.append(InvoiceResponse(
+                id=item.get("id", ""),
+                amount=item.get("amount", 0),
+                currency=item.get("currency", "usd"),
+                status=item.get("status", "unknown"),
+                created_at=item.get("created_at", ""),
+                product_name=product.get("name", "Subscription"),
+                invoice_url=item.get("invoice_url")
+            ))
+        
+        # Sort by date (most recent first)
+        invoices.sort(key=lambda x: x.created_at, reverse=True)
+        return invoices
+        
     except Exception as e:
         logger.error(f"[Billing] Orders error: {e}")
         return []
@@ -544,32 +577,32 @@ async def download_invoice(
         raise HTTPException(status_code=500, detail="Billing not configured")
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # First try to get the invoice
-            response = await client.get(
+        client = get_polar_client()
+        # First try to get the invoice
+        response = await client.get(
+            f"{POLAR_API_BASE}/orders/{order_id}/invoice",
+            headers=get_polar_headers()
+        )
+        
+        if response.status_code == 200:
+            invoice_data = response.json()
+            return {"url": invoice_data.get("url")}
+        
+        elif response.status_code == 404:
+            # Invoice not generated, generate it
+            gen_response = await client.post(
                 f"{POLAR_API_BASE}/orders/{order_id}/invoice",
                 headers=get_polar_headers()
             )
             
-            if response.status_code == 200:
-                invoice_data = response.json()
-                return {"url": invoice_data.get("url")}
-            
-            elif response.status_code == 404:
-                # Invoice not generated, generate it
-                gen_response = await client.post(
-                    f"{POLAR_API_BASE}/orders/{order_id}/invoice",
-                    headers=get_polar_headers()
-                )
+            if gen_response.status_code == 202:
+                return {
+                    "status": "generating",
+                    "message": "Invoice is being generated. Please try again in a few seconds."
+                }
                 
-                if gen_response.status_code == 202:
-                    return {
-                        "status": "generating",
-                        "message": "Invoice is being generated. Please try again in a few seconds."
-                    }
-                    
-            raise HTTPException(status_code=404, detail="Invoice not found")
-            
+        raise HTTPException(status_code=404, detail="Invoice not found")
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -617,36 +650,36 @@ async def fix_customer_id(current_user_id: str = Depends(get_current_user)):
             return {"status": "ok", "customer_id": sub["customer_id"], "message": "Already has customer_id"}
         
         # Fetch from Polar
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{POLAR_API_BASE}/subscriptions/{polar_id}",
-                headers=get_polar_headers()
-            )
-            
-            logger.info(f"[Billing] Polar subscription response: {response.status_code}")
+        client = get_polar_client()
+        response = await client.get(
+            f"{POLAR_API_BASE}/subscriptions/{polar_id}",
+            headers=get_polar_headers()
+        )
+        
+        logger.info(f"[Billing] Polar subscription response: {response.status_code}")
+        
+        if response.status_code == 200:
+            data = response.json()
+            customer = data.get("customer", {})
+            customer_id = customer.get("id")
             
-            if response.status_code == 200:
-                data = response.json()
-                customer = data.get("customer", {})
-                customer_id = customer.get("id")
+            if customer_id:
+                # Update database
+                supabase.table("subscriptions").update({
+                    "customer_id": customer_id
+                }).eq("team_id", team_id).execute()
                 
-                if customer_id:
-                    # Update database
-                    supabase.table("subscriptions").update({
-                        "customer_id": customer_id
-                    }).eq("team_id", team_id).execute()
-                    
-                    logger.info(f"[Billing] Updated customer_id for team {team_id}: {customer_id}")
-                    return {"status": "ok", "customer_id": customer_id, "message": "Fixed!"}
-                else:
-                    return {"status": "error", "message": "No customer in subscription data", "data": data}
+                logger.info(f"[Billing] Updated customer_id for team {team_id}: {customer_id}")
+                return {"status": "ok", "customer_id": customer_id, "message": "Fixed!"}
             else:
-                return {
-                    "status": "error", 
-                    "message": f"Polar API error: {response.status_code}",
-                    "response": response.text
-                }
-                
+                return {"status": "error", "message": "No customer in subscription data", "data": data}
+        else:
+            return {
+                "status": "error", 
+                "message": f"Polar API error: {response.status_code}",
+                "response": response.text
+            }
+            
     except HTTPException:
         raise
     except Exception as e:
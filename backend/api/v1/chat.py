@@ -9,7 +9,7 @@ from services.audit import log_chat_delete, audit_logger
 from services.llm_factory import LLMFactory
 from services.guardrails import guardrail_service
 from services.router import llm_router
-from langchain_openai import OpenAIEmbeddings
+from services.embeddings import get_embeddings_model
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from slowapi import Limiter
@@ -478,10 +478,7 @@ async def chat_endpoint(
     search_query = condense_question(payload.query, trimmed_history)
     
     # ========== STEP 7: EMBED QUERY ==========
-    embeddings_model = OpenAIEmbeddings(
-        model="text-embedding-3-small", 
-        api_key=settings.OPENAI_API_KEY
-    )
+    embeddings_model = get_embeddings_model()
     
     try:
         query_vector = embeddings_model.embed_query(search_query)
@@ -22,6 +22,7 @@ from core.quotas import QUOTA_LIMITS, check_quota
 from services.usage import check_can_upload, check_feature_access
 from services.team_service import team_service
 from api.v1.dependencies import validate_team_access
+from worker.tasks import crawl_web_task, ingest_connector_task, ingest_file_task
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 import magic
@@ -169,7 +170,6 @@ async def ingest_document(
         
         crawl_id = str(crawl_res.data[0]["id"])
         
-        from worker.tasks import crawl_web_task
         try:
             task = crawl_web_task.delay(
                 user_id=user_id,
@@ -199,8 +199,6 @@ async def ingest_document(
     # ROUTE 2: CLOUD CONNECTORS (Drive, Notion)
     # =========================================================
     if drive_id or notion_page_id:
-        from worker.tasks import ingest_connector_task
-        
         connector_type = "drive" if drive_id else "notion"
         item_id = drive_id if drive_id else notion_page_id
         
@@ -333,7 +331,6 @@ async def ingest_document(
         job_id = str(job_res.data[0]["id"])
         
         # Dispatch to worker
-        from worker.tasks import ingest_file_task
         try:
             task = ingest_file_task.delay(
                 user_id=user_id,
@@ -517,7 +514,6 @@ async def ingest_file_reference(
     job_id = str(job_res.data[0]["id"])
     
     # 4. Dispatch to worker (same task as regular file upload)
-    from worker.tasks import ingest_file_task
     try:
         task = ingest_file_task.delay(
             user_id=user_id,
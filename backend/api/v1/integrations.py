@@ -10,6 +10,7 @@ from core.security import get_current_user, encrypt_token, decrypt_token
 from core.db import get_supabase
 from core.config import settings
 from core.rate_limit import limiter
+from worker.tasks import ingest_connector_task
 from google_auth_oauthlib.flow import Flow
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List
@@ -390,7 +391,6 @@ async def exchange_notion_token(
             if job_response.data:
                 job_id = job_response.data[0]["id"]
                 # Queue the connector ingestion tasks (one per page)
-                from worker.tasks import ingest_connector_task
                 task_ids = []
                 for item_id in items:
                     task = ingest_connector_task.delay(
@@ -655,8 +655,6 @@ async def ingest_provider_items(
         logger.info(f"📋 [Ingest] Created job {job_id} for {len(request.item_ids)} items")
         
         # 3. Queue the connector ingestion tasks (one per item)
-        from worker.tasks import ingest_connector_task
-        
         task_ids = []
         for item_id in request.item_ids:
             task = ingest_connector_task.delay(
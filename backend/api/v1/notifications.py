@@ -54,11 +54,11 @@ def create_notification(
                 .select("enabled")\
                 .eq("user_id", user_id)\
                 .eq("setting_key", check_setting_key)\
-                .maybeSingle()\
+                .maybe_single()\
                 .execute()
             
             # If preference exists and is explicitly False, skip notification
-            if pref.data and pref.data.get("enabled") is False:
+            if pref and pref.data and pref.data.get("enabled") is False:
                 logger.info(f"Notification skipped for {user_id}: {check_setting_key} is disabled")
                 return None
         except Exception as e:
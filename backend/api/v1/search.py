@@ -3,8 +3,7 @@ from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 from core.security import get_current_user
 from core.db import get_supabase
-from core.config import settings
-from langchain_openai import OpenAIEmbeddings
+from services.embeddings import get_embeddings_model
 
 router = APIRouter()
 
@@ -24,10 +23,7 @@ async def search_documents(
     supabase = get_supabase()
     
     # 1. Embed Query
-    embeddings_model = OpenAIEmbeddings(
-        model="text-embedding-3-small",
-        api_key=settings.OPENAI_API_KEY
-    )
+    embeddings_model = get_embeddings_model()
     
     try:
         query_vector = embeddings_model.embed_query(payload.query)
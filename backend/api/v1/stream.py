@@ -10,7 +10,8 @@ from typing import AsyncGenerator, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from langchain_openai import ChatOpenAI
+from services.embeddings import get_embeddings_model
 from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.outputs import LLMResult
 import asyncio
@@ -74,10 +75,7 @@ async def stream_generator(
     
     try:
         # 1. Embed the query
-        embeddings_model = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            api_key=settings.OPENAI_API_KEY
-        )
+        embeddings_model = get_embeddings_model()
         query_vector = embeddings_model.embed_query(query)
         
         # 2. Retrieve context
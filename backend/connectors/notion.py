@@ -10,6 +10,7 @@ from typing import List, Optional, Dict, Any, Iterator, AsyncIterator
 from datetime import datetime, timezone
 from .base import BaseConnector, ConnectorDocument, ConnectorItem
 from core.db import get_supabase
+from core.security import decrypt_token
 from core.resilience import with_retry_sync
 import requests
 from starlette.concurrency import run_in_threadpool
@@ -51,8 +52,6 @@ class NotionConnector(BaseConnector):
     
     def _get_access_token(self, user_id: str) -> str:
         """Get the Notion access token for a user (DB Lookup)."""
-        from core.security import decrypt_token
-        
         supabase = get_supabase()
         connector_def_id = self._get_connector_definition_id()
         res = supabase.table("user_integrations").select("access_token").eq(
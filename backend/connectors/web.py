@@ -12,23 +12,96 @@ Supports:
 The connector provides discovery capabilities; looping logic is in the Celery worker.
 """
 
+import gzip
 import re
 import logging
+import threading
+import time
 from typing import List, Dict, Any, Optional, Set, Iterator, AsyncIterator
-from urllib.parse import urlparse, urljoin
+from urllib.parse import urlparse, urljoin, urlunparse, parse_qsl, urlencode
+from urllib.robotparser import RobotFileParser
 from .base import BaseConnector, ConnectorDocument, ConnectorItem
 import trafilatura
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
 # YouTube URL patterns
 YOUTUBE_PATTERNS = [
-    r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=([a-zA-Z0-9_-]{11})',
-    r'(?:https?://)?(?:www\.)?youtu\.be/([a-zA-Z0-9_-]{11})',
-    r'(?:https?://)?(?:www\.)?youtube\.com/embed/([a-zA-Z0-9_-]{11})',
+    re.compile(r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=([a-zA-Z0-9_-]{11})'),
+    re.compile(r'(?:https?://)?(?:www\.)?youtu\.be/([a-zA-Z0-9_-]{11})'),
+    re.compile(r'(?:https?://)?(?:www\.)?youtube\.com/embed/([a-zA-Z0-9_-]{11})'),
 ]
 
+# Connection pool sized for a whole crawl sharing one session across worker threads
+HTTP_POOL_SIZE = 100
+# Statuses worth retrying on the same pooled connection
+RETRY_STATUSES = (429, 502, 503, 504)
+# Seconds a parsed robots.txt is reused before it is fetched again. Worker
+# processes keep one connector alive across crawls, so rules must expire.
+ROBOTS_CACHE_TTL_SECONDS = 3600
+
+
+def create_http_session() -> requests.Session:
+    """
+    Build a keep-alive session with a pooled, retrying adapter.
+    
+    Reusing one session across a crawl skips the TCP+TLS handshake on every
+    request to a host we have already talked to.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_SIZE,
+        pool_maxsize=HTTP_POOL_SIZE,
+        # Retry throttled/unavailable responses too, waiting out Retry-After;
+        # the last response is returned so callers still see the status.
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=RETRY_STATUSES,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = WebConnector.USER_AGENT
+    return session
+
+
+# Paths parsed directly as sitemap files (others go through usp discovery)
+SITEMAP_SUFFIXES = (".xml", ".xml.gz")
+# Sitemap index -> sitemap -> ... nesting followed by the basic parser
+MAX_SITEMAP_INDEX_DEPTH = 3
+
+
+# Query parameters that only track the visitor and never change page content
+TRACKING_PARAMS = frozenset({"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid"})
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a URL so trivially different spellings dedupe to one entry.
+    
+    Lower-cases the host, drops the fragment, strips tracking parameters
+    (utm_*, fbclid, gclid, ...) and the trailing slash, and sorts the
+    remaining query parameters. E.g.
+    `https://X.com/a/?utm_source=x#top` -> `https://x.com/a`.
+    """
+    parsed = urlparse(url)
+    query = urlencode(sorted(
+        (key, value)
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ))
+    return urlunparse(parsed._replace(
+        netloc=parsed.netloc.lower(),
+        query=query,
+        fragment=""
+    )).rstrip("/")
+
 
 class WebConnector(BaseConnector):
     """
@@ -41,6 +114,17 @@ class WebConnector(BaseConnector):
     # User-Agent for polite crawling
     USER_AGENT = "AxioBot/1.0 (+https://axiohub.io/bot)"
     
+    def __init__(self, session: Optional[requests.Session] = None):
+        """
+        Args:
+            session: Shared HTTP session (e.g. one per crawl). A pooled
+                session is created when omitted.
+        """
+        self.session = session or create_http_session()
+        # robots.txt parsers per origin, shared by every URL this connector checks
+        self._robots_cache: Dict[str, RobotFileParser] = {}
+        self._robots_lock = threading.Lock()
+    
     async def authorize(self, user_id: str) -> bool:
         """Web connector is public/open, always authorized."""
         return True
@@ -99,64 +183,91 @@ class WebConnector(BaseConnector):
         Returns:
             List of page URLs found in the sitemap
         """
+        urls = list(self.iter_sitemap_urls(sitemap_url))
+        logger.info(f"📍 [Web] Parsed sitemap: {len(urls)} URLs from {sitemap_url}")
+        return urls
+    
+    def iter_sitemap_urls(self, sitemap_url: str) -> Iterator[str]:
+        """
+        Yield page URLs from a sitemap as they are parsed (see parse_sitemap).
+        
+        Callers that only need the first N URLs can stop early and the rest
+        of the sitemap is never downloaded or parsed. Errors are logged and
+        end the iteration (URLs already yielded stay valid).
+        """
+        # Direct sitemap files are streamed; homepages go through usp discovery
+        if urlparse(sitemap_url).path.lower().endswith(SITEMAP_SUFFIXES):
+            yield from self._iter_sitemap_basic(sitemap_url)
+            return
+        
         try:
             from usp.tree import sitemap_tree_for_homepage
-            
+        except ImportError:
+            logger.warning("⚠️ [Web] ultimate-sitemap-parser not installed, falling back to basic parsing")
+            yield from self._iter_sitemap_basic(sitemap_url)
+            return
+        
+        try:
             # Parse the sitemap tree
             tree = sitemap_tree_for_homepage(sitemap_url)
-            
-            urls = []
             for page in tree.all_pages():
                 if page.url:
-                    urls.append(page.url)
-            
-            logger.info(f"📍 [Web] Parsed sitemap: {len(urls)} URLs from {sitemap_url}")
-            return urls
-            
-        except ImportError:
-            logger.warning("⚠️ [Web] ultimate-sitemap-parser not installed, falling back to basic parsing")
-            return self._parse_sitemap_basic(sitemap_url)
+                    yield page.url
         except Exception as e:
             logger.error(f"❌ [Web] Sitemap parsing failed for {sitemap_url}: {e}")
-            return []
     
-    def _parse_sitemap_basic(self, sitemap_url: str) -> List[str]:
-        """Basic sitemap parser fallback using BeautifulSoup."""
+    def _iter_sitemap_basic(self, sitemap_url: str, depth: int = 0) -> Iterator[str]:
+        """
+        Streaming sitemap parser (lxml iterparse).
+        
+        Each <url>/<sitemap> element is cleared once its <loc> is read, so
+        memory stays flat even for 50 MB sitemaps, and page URLs are yielded
+        while the download is still in progress. Follows sitemap indexes up
+        to MAX_SITEMAP_INDEX_DEPTH levels and handles .gz files.
+        """
+        nested = []
         try:
-            from bs4 import BeautifulSoup
+            from lxml import etree
             
-            response = requests.get(
+            response = self.session.get(
                 sitemap_url,
                 headers={"User-Agent": self.USER_AGENT},
-                timeout=30
+                timeout=30,
+                stream=True
             )
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, "lxml-xml")
-            
-            # Check for sitemap index
-            sitemaps = soup.find_all("sitemap")
-            if sitemaps:
-                urls = []
-                for sitemap in sitemaps:
-                    loc = sitemap.find("loc")
-                    if loc:
-                        # Recursively parse nested sitemap
-                        urls.extend(self._parse_sitemap_basic(loc.text.strip()))
-                return urls
-            
-            # Regular sitemap - extract URLs
-            urls = []
-            for url_tag in soup.find_all("url"):
-                loc = url_tag.find("loc")
-                if loc:
-                    urls.append(loc.text.strip())
+            # Undo transport compression; .gz files served as plain bytes need gunzip
+            response.raw.decode_content = True
+            source = response.raw
+            if sitemap_url.lower().endswith(".gz") and "gzip" not in response.headers.get("Content-Encoding", ""):
+                source = gzip.GzipFile(fileobj=response.raw)
             
-            return urls
+            try:
+                for _, elem in etree.iterparse(
+                    source, events=("end",), tag=("{*}url", "{*}sitemap"), resolve_entities=False
+                ):
+                    loc = elem.findtext("{*}loc")
+                    if loc and loc.strip():
+                        if etree.QName(elem).localname == "sitemap":
+                            nested.append(loc.strip())
+                        else:
+                            yield loc.strip()
+                    # Drop the element and already-processed siblings
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+            finally:
+                response.close()
             
         except Exception as e:
             logger.error(f"❌ [Web] Basic sitemap parsing failed: {e}")
-            return []
+            return
+        
+        if depth < MAX_SITEMAP_INDEX_DEPTH:
+            for loc in nested:
+                # Recursively parse nested sitemap
+                yield from self._iter_sitemap_basic(loc, depth + 1)
     
     def extract_links(self, html_content: str, base_url: str) -> List[str]:
         """
@@ -173,16 +284,27 @@ class WebConnector(BaseConnector):
             List of absolute URLs on the same domain
         """
         try:
-            from bs4 import BeautifulSoup
+            import lxml.html
+            
+            if not html_content or not html_content.strip():
+                return []
             
-            soup = BeautifulSoup(html_content, "html.parser")
+            # lxml's C parser is far faster than BeautifulSoup's html.parser.
+            # Fed as UTF-8 bytes so pages with an XML encoding declaration
+            # parse too (a parser per call: they are not thread-safe).
+            doc = lxml.html.fromstring(
+                html_content.encode("utf-8", "replace"),
+                parser=lxml.html.HTMLParser(encoding="utf-8")
+            )
             base_parsed = urlparse(base_url)
             base_domain = base_parsed.netloc
             
             links: Set[str] = set()
             
-            for a_tag in soup.find_all("a", href=True):
-                href = a_tag["href"]
+            for a_tag in doc.iter("a"):
+                href = a_tag.get("href")
+                if href is None:
+                    continue
                 
                 # Skip non-HTTP links
                 if href.startswith(("#", "javascript:", "mailto:", "tel:", "data:")):
@@ -211,6 +333,10 @@ class WebConnector(BaseConnector):
         """
         Check if a URL is allowed by robots.txt.
         
+        robots.txt is fetched once per origin and cached on the connector
+        for ROBOTS_CACHE_TTL_SECONDS, so a crawl of N pages on one host
+        costs one robots request, not N.
+        
         Args:
             url: The URL to check
             user_agent: User-agent to check rules for
@@ -219,34 +345,59 @@ class WebConnector(BaseConnector):
             True if allowed to crawl, False if disallowed
         """
         try:
-            from urllib.robotparser import RobotFileParser
-            
-            parsed = urlparse(url)
-            robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
-            
-            rp = RobotFileParser()
-            rp.set_url(robots_url)
-            rp.read()
-            
-            return rp.can_fetch(user_agent, url)
-            
+            return self._get_robots_parser(url).can_fetch(user_agent, url)
         except Exception as e:
             # If robots.txt check fails, allow crawling (fail open)
             logger.warning(f"⚠️ [Web] robots.txt check failed for {url}: {e}")
             return True
     
+    def _get_robots_parser(self, url: str) -> RobotFileParser:
+        """Return the cached robots.txt parser for the URL's origin, fetching it when missing or stale."""
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        
+        with self._robots_lock:
+            rp = self._robots_cache.get(origin)
+        if rp is not None and time.time() - rp.mtime() < ROBOTS_CACHE_TTL_SECONDS:
+            return rp
+        
+        rp = RobotFileParser(f"{origin}/robots.txt")
+        try:
+            response = self.session.get(rp.url, headers={"User-Agent": self.USER_AGENT}, timeout=10)
+            # Same status handling as RobotFileParser.read()
+            if response.status_code in (401, 403):
+                rp.disallow_all = True
+            elif 400 <= response.status_code < 500:
+                rp.allow_all = True
+            else:
+                response.raise_for_status()
+                rp.parse(response.text.splitlines())
+        except Exception as e:
+            # Unreachable robots.txt: fail open, and don't retry it for every page
+            logger.warning(f"⚠️ [Web] robots.txt fetch failed for {origin}: {e}")
+            rp.allow_all = True
+        rp.modified()
+        
+        with self._robots_lock:
+            cached = self._robots_cache.get(origin)
+            # Another thread may have refreshed it meanwhile; keep the newest
+            if cached is None or cached.mtime() < rp.mtime():
+                self._robots_cache[origin] = rp
+                return rp
+            return cached
+    
     # =========================================================================
     # YOUTUBE SUPPORT
     # =========================================================================
     
     def is_youtube_url(self, url: str) -> bool:
         """Check if a URL is a YouTube video."""
-        return any(re.match(pattern, url) for pattern in YOUTUBE_PATTERNS)
+        return any(pattern.match(url) for pattern in YOUTUBE_PATTERNS)
     
     def extract_youtube_video_id(self, url: str) -> Optional[str]:
         """Extract video ID from a YouTube URL."""
         for pattern in YOUTUBE_PATTERNS:
-            match = re.match(pattern, url)
+            match = pattern.match(url)
             if match:
                 return match.group(1)
         return None
@@ -327,6 +478,14 @@ class WebConnector(BaseConnector):
         from starlette.concurrency import iterate_in_threadpool
         return iterate_in_threadpool(self._ingest_implementation(config))
 
+    def ingest_sync(self, config: Dict[str, Any]) -> List[ConnectorDocument]:
+        """
+        Synchronous ingestion for Celery workers (no event loop needed).
+        
+        Same config as ingest(); returns the scraped documents as a list.
+        """
+        return list(self._ingest_implementation(config))
+
     def _ingest_implementation(self, config: Dict[str, Any]) -> "Iterator[ConnectorDocument]":
         """
         Ingests web pages or YouTube videos (Generator).
@@ -358,33 +517,12 @@ class WebConnector(BaseConnector):
                         )
                     continue
                 
-                # Standard web page
-                downloaded = trafilatura.fetch_url(url)
+                # Standard web page (pooled session instead of trafilatura.fetch_url)
+                downloaded = self.fetch_html(url)
                 if downloaded:
-                    text = trafilatura.extract(
-                        downloaded,
-                        include_comments=False,
-                        include_tables=True,
-                        include_links=False,
-                        output_format="txt"
-                    )
-                    metadata = trafilatura.extract_metadata(downloaded)
-                    
-                    if text and text.strip():
-                        title = metadata.title if metadata and metadata.title else url
-                        yield ConnectorDocument(
-                            page_content=text,
-                            metadata={
-                                "source": "web",
-                                "title": title,
-                                "source_url": url,
-                                "author": metadata.author if metadata else None,
-                                "date": str(metadata.date) if metadata and metadata.date else None,
-                            }
-                        )
-                        logger.info(f"✅ [Web] Scraped: {url}")
-                    else:
-                        logger.warning(f"⚠️ [Web] No text extracted from: {url}")
+                    document = self.document_from_html(url, downloaded)
+                    if document:
+                        yield document
                 else:
                     logger.warning(f"⚠️ [Web] Failed to download: {url}")
                     
@@ -393,6 +531,39 @@ class WebConnector(BaseConnector):
         
         logger.info(f"📥 [WebConnector] Ingestion stream ended")
     
+    def document_from_html(self, url: str, html: str) -> Optional[ConnectorDocument]:
+        """
+        Extract the main text and metadata from already-downloaded HTML.
+        
+        Lets a recursive crawl reuse the HTML it fetched for link
+        extraction instead of downloading every page twice.
+        """
+        text = trafilatura.extract(
+            html,
+            include_comments=False,
+            include_tables=True,
+            include_links=False,
+            output_format="txt"
+        )
+        metadata = trafilatura.extract_metadata(html)
+        
+        if not text or not text.strip():
+            logger.warning(f"⚠️ [Web] No text extracted from: {url}")
+            return None
+        
+        title = metadata.title if metadata and metadata.title else url
+        logger.info(f"✅ [Web] Scraped: {url}")
+        return ConnectorDocument(
+            page_content=text,
+            metadata={
+                "source": "web",
+                "title": title,
+                "source_url": url,
+                "author": metadata.author if metadata else None,
+                "date": str(metadata.date) if metadata and metadata.date else None,
+            }
+        )
+    
     def fetch_html(self, url: str) -> Optional[str]:
         """
         Fetch raw HTML content for link extraction.
@@ -400,7 +571,7 @@ class WebConnector(BaseConnector):
         Used by the worker for recursive crawling.
         """
         try:
-            response = requests.get(
+            response = self.session.get(
                 url,
                 headers={"User-Agent": self.USER_AGENT},
                 timeout=30
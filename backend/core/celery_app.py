@@ -5,10 +5,14 @@ Production-grade async task queue for heavy file processing.
 Uses Redis as broker and result backend.
 """
 
+import logging
 import os
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 from core.config import settings
 
+logger = logging.getLogger(__name__)
+
 # =============================================================================
 # Sentry Error Tracking + Logs for Celery Workers
 # =============================================================================
@@ -17,7 +21,6 @@ if settings.SENTRY_DSN:
         import sentry_sdk
         from sentry_sdk.integrations.celery import CeleryIntegration
         from sentry_sdk.integrations.logging import LoggingIntegration
-        import logging
         
         logging_integration = LoggingIntegration(
             level=logging.INFO,
@@ -65,8 +68,56 @@ celery_app.conf.update(
     
     # Memory Safety: Worker takes ONLY 1 task at a time
     # Vital for large file processing (prevents memory exhaustion)
+    # Combine with `-Ofair` so long-running ingest/crawl tasks are only
+    # handed to child processes that are actually free.
     worker_prefetch_multiplier=1,
     
+    # Recycle pool children to bound slow leaks (parser buffers, HTTP/SDK
+    # client state): after 100 tasks, or once a child grows past ~1.5 GB
+    # (in KiB) after finishing its current task. Replacement children are
+    # warmed by worker_process_init like the originals.
+    worker_max_tasks_per_child=100,
+    worker_max_memory_per_child=1_500_000,
+    
+    # ============================================================
+    # QUEUE ROUTING
+    # ============================================================
+    # Long-running I/O tasks get their own queues so they never sit
+    # behind (or starve) short tasks on the default `celery` queue.
+    # Workers must consume these queues, e.g.:
+    #   celery -A core.celery_app worker -Ofair \
+    #       -Q celery,ingest,embed,crawl,crawl_master,crawl_pages,beat,notifications
+    # or run dedicated pools per queue (-Q ingest / -Q embed / -Q crawl).
+    # `embed` is almost pure network wait on OpenAI + Supabase, so it can
+    # run with a much higher concurrency than the parsing-heavy `ingest`.
+    # Distributed crawls split the long-running discovery master from the
+    # thousands of short page fetches, so a master never holds a slot that
+    # idle page workers could use (and vice versa). Sized per role, e.g.:
+    #   celery -A core.celery_app worker -Q crawl_master -c 2
+    #   celery -A core.celery_app worker -Q crawl_pages -c 32
+    # Periodic housekeeping gets its own `beat` queue so scheduled runs are
+    # never stuck behind a backlog of ingests or page fetches.
+    # User emails go to `notifications`: pure provider wait, so a small
+    # high-concurrency pool drains it without touching ingest slots.
+    task_routes={
+        "worker.tasks.ingest_file_task": {"queue": "ingest"},
+        "worker.tasks.embed_and_store_task": {"queue": "embed"},
+        "worker.tasks.ingest_connector_task": {"queue": "ingest"},
+        "worker.tasks.crawl_web_task": {"queue": "crawl"},
+        "worker.tasks.crawl_discovery_task": {"queue": "crawl_master"},
+        "worker.tasks.process_page_task": {"queue": "crawl_pages"},
+        "worker.tasks.discover_page_task": {"queue": "crawl_pages"},
+        "worker.tasks.store_crawl_pages_task": {"queue": "embed"},
+        "worker.tasks.check_scheduled_crawls": {"queue": "beat"},
+        "worker.tasks.sweep_staging_uploads": {"queue": "beat"},
+        "worker.tasks.cleanup_old_jobs": {"queue": "beat"},
+        "worker.tasks.flush_completion_emails": {"queue": "beat"},
+        "worker.tasks.reap_stalled_discoveries": {"queue": "beat"},
+        "worker.tasks.notify_ingestion_task": {"queue": "notifications"},
+        "worker.tasks.send_email_task": {"queue": "notifications"},
+        "worker.tasks.send_failure_email_task": {"queue": "notifications"},
+    },
+    
     # Serialization
     task_serializer="json",
     accept_content=["json"],
@@ -92,6 +143,21 @@ celery_app.conf.update(
             "task": "worker.tasks.check_scheduled_crawls",
             "schedule": 3600.0,  # Every hour (in seconds)
         },
+        # Delete staged uploads queued by finished ingest tasks
+        "sweep-staging-uploads": {
+            "task": "worker.tasks.sweep_staging_uploads",
+            "schedule": 15.0,  # Every 15 seconds
+        },
+        # One summary completion email per user instead of one per file
+        "flush-completion-emails": {
+            "task": "worker.tasks.flush_completion_emails",
+            "schedule": 60.0,  # Every minute
+        },
+        # Fail recursive crawl discoveries that stopped making progress
+        "reap-stalled-discoveries": {
+            "task": "worker.tasks.reap_stalled_discoveries",
+            "schedule": 300.0,  # Every 5 minutes
+        },
         # Cleanup old completed/failed jobs daily at midnight UTC
         "cleanup-old-jobs-daily": {
             "task": "worker.tasks.cleanup_old_jobs",
@@ -99,3 +165,45 @@ celery_app.conf.update(
         },
     },
 )
+
+
+# ============================================================
+# WORKER WARM-UP
+# ============================================================
+
+@worker_process_init.connect
+def warm_worker_process(**kwargs):
+    """
+    Build per-process clients as soon as a pool child starts.
+    
+    Task modules (parsers, tiktoken) are already imported by the parent
+    before forking. The Supabase client, Redis client, OpenAI embeddings
+    client and the crawler's pooled HTTP session are built here, inside
+    each child, so the first task does not pay for them and no connection
+    pool is shared across forked processes.
+    """
+    try:
+        from core.db import init_process_supabase
+        from services.embeddings import get_embeddings_model
+        from worker.tasks import get_redis, get_web_connector
+        init_process_supabase()
+        get_redis()
+        get_embeddings_model()
+        get_web_connector()
+    except Exception as e:
+        # Fail open: the first task will build the clients lazily instead
+        logger.warning(f"⚠️ [Worker] Warm-up failed: {e}")
+
+
+@worker_process_shutdown.connect
+def close_worker_process(**kwargs):
+    """Close pooled keep-alive connections when a pool child exits."""
+    try:
+        from core.db import close_supabase
+        from worker.tasks import close_notifications, close_redis, close_web_connector
+        close_notifications()
+        close_web_connector()
+        close_redis()
+        close_supabase()
+    except Exception as e:
+        logger.warning(f"⚠️ [Worker] Shutdown cleanup failed: {e}")
@@ -57,6 +57,11 @@ class Settings(BaseSettings):
     GROQ_API_KEY: Optional[str] = None
     
     RAG_SIMILARITY_THRESHOLD: float = 0.70 
+    
+    # OpenAI embeddings budget per worker process (proactive throttling).
+    # Set to the account limit divided by the number of pool processes.
+    OPENAI_EMBEDDING_RPM: int = 3000
+    OPENAI_EMBEDDING_TPM: int = 1_000_000
 
     # =========================================================================
     # COMMERCIALIZATION & TIER LIMITS
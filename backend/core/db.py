@@ -1,5 +1,4 @@
 from supabase import create_client, Client
-from functools import lru_cache
 from core.config import settings
 import logging
 
@@ -14,16 +13,34 @@ except Exception as e:
     raise
 
 
-@lru_cache()
 def get_supabase() -> Client:
     """
     Returns the Supabase client instance.
     
-    Uses lru_cache to ensure the module-level singleton is always returned,
-    preventing accidental re-initialization and connection pool exhaustion.
+    Always the module-level singleton, preventing accidental re-initialization
+    and connection pool exhaustion. Worker pool children swap in their own
+    client via init_process_supabase().
     """
     return supabase
 
+
+def init_process_supabase() -> Client:
+    """
+    Build a fresh client for the current process (Celery worker_process_init).
+    
+    The import-time client is created in the parent before prefork, so its
+    keep-alive connections to PostgREST would otherwise be inherited by every
+    pool child. Each child builds its own once and reuses it for all tasks.
+    """
+    global supabase
+    supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_SECRET_KEY)
+    return supabase
+
+
+def close_supabase() -> None:
+    """Close the client's PostgREST connections (worker process shutdown)."""
+    supabase.postgrest.aclose()
+
 async def check_connection() -> bool:
     """
     Checks if the Supabase connection is active.
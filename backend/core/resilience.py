@@ -6,10 +6,11 @@ especially for external services like Google Drive, Notion, etc.
 """
 
 import logging
+import random
 import ssl
 import http.client
 from functools import wraps
-from typing import Callable, TypeVar, Any
+from typing import Callable, TypeVar, Any, Optional
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -19,6 +20,7 @@ from tenacity import (
     RetryError,
 )
 from httpx import HTTPStatusError, ConnectError, TimeoutException
+from postgrest.exceptions import APIError as PostgrestAPIError
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +47,10 @@ TRANSIENT_EXCEPTIONS = (
 # Rate limit status codes
 RATE_LIMIT_STATUS_CODES = {429, 503, 502, 504}
 
+# PostgREST error codes that mean the database is overloaded rather than the
+# request being wrong: connection pool acquisition timeout, too many connections
+POSTGREST_THROTTLE_CODES = {"PGRST003", "53300"}
+
 
 def is_retryable_error(exception: BaseException) -> bool:
     """
@@ -61,6 +67,43 @@ def is_retryable_error(exception: BaseException) -> bool:
     return False
 
 
+def _throttle_status(exception: BaseException) -> Optional[int]:
+    """HTTP status of a throttled/unavailable response, or None."""
+    response = getattr(exception, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None and isinstance(exception, PostgrestAPIError):
+        # postgrest-py attaches no response. Non-JSON gateway errors carry the
+        # HTTP status as `code`; PostgREST's own errors carry an error code
+        if str(exception.code) in POSTGREST_THROTTLE_CODES:
+            return 503
+        try:
+            status = int(exception.code)
+        except (TypeError, ValueError):
+            return None
+    return status if status in RATE_LIMIT_STATUS_CODES else None
+
+
+def throttle_retry_delay(exception: BaseException, attempt: int, max_delay: float = 300) -> Optional[float]:
+    """
+    Seconds to wait before retrying a throttled/unavailable upstream call.
+    
+    Works for any exception carrying an httpx response (httpx.HTTPStatusError,
+    the OpenAI SDK's APIStatusError) and for Supabase's postgrest APIError,
+    matched on its code. Honours a delta-seconds Retry-After header when there
+    is one; otherwise falls back to exponential backoff with full jitter.
+    Returns None when the error is not a rate-limit/unavailable response.
+    """
+    if _throttle_status(exception) is None:
+        return None
+    
+    headers = getattr(getattr(exception, "response", None), "headers", None) or {}
+    try:
+        delay = float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        delay = random.uniform(0, 2 ** attempt * 2)
+    return min(max(delay, 0.0), max_delay)
+
+
 # =============================================================================
 # Retry Decorators
 # =============================================================================
@@ -19,6 +19,9 @@ try:
         )
     
     if ENCRYPTION_KEY:
+        # Built once per process. Fernet takes the key as-is (no KDF), so each
+        # decrypt_token() is a single OpenSSL AES-CBC + HMAC call. Stored
+        # tokens are Fernet, so changing the cipher would need a re-encryption.
         cipher_suite = Fernet(ENCRYPTION_KEY.encode())
         HAS_ENCRYPTION = True
     else:
@@ -31,6 +34,10 @@ except ImportError:
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
 
+# Every Fernet token is base64url(0x80 version byte + 64-bit timestamp), so
+# it starts with this prefix; anything else is a legacy plain-text token.
+FERNET_TOKEN_PREFIX = "gAAAAA"
+
 
 def encrypt_token(token: str) -> str:
     """
@@ -79,6 +86,10 @@ def decrypt_token(token: str) -> str:
         # No encryption configured, return as-is
         return token
     
+    if not token.startswith(FERNET_TOKEN_PREFIX):
+        # Legacy plain-text token: skip the base64/HMAC work and the exception path
+        return token
+    
     try:
         # Attempt decryption
         decrypted = cipher_suite.decrypt(token.encode()).decode()
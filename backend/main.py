@@ -73,6 +73,7 @@ from api.v1.ingest import router as ingest_router
 from api.v1.search import router as search_router
 from api.v1.chat import router as chat_router
 from api.v1.documents import router as documents_router
+from api.v1.billing import close_polar_client
 
 
 @asynccontextmanager
@@ -92,6 +93,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown: cleanup
     logger.info("👋 Shutting down Axio Hub API...")
+    await close_polar_client()
 
 
 # =============================================================================
@@ -4,17 +4,118 @@ Embedding Service
 Provides centralized embedding generation using OpenAI's text-embedding-3-small model.
 """
 
+import importlib.util
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
+import httpx
+import tiktoken
 from langchain_openai import OpenAIEmbeddings
 from core.config import settings
 from core.resilience import with_retry_sync
 
 logger = logging.getLogger(__name__)
 
-# Singleton embeddings model instance
+# Token counting for the rate limiter (cl100k_base, as text-embedding-3-*)
+try:
+    TIKTOKEN_ENCODER = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    TIKTOKEN_ENCODER = None
+    logger.warning("tiktoken encoder not available")
+
+# Max texts per embeddings request. Sub-batches are also capped by total
+# tokens (tiktoken; without it, UTF-8 bytes, an upper bound since every
+# cl100k token covers at least one byte), so a batch of whole crawled pages
+# stays under OpenAI's 300k-tokens-per-request limit, while typical
+# ~250-token chunks still go EMBEDDING_BATCH_SIZE at a time.
+EMBEDDING_BATCH_SIZE = 256
+EMBEDDING_BATCH_MAX_TOKENS = 250_000
+# Sub-batches in flight at once. Each one first waits for rate-limit budget
+# (TokenBucketLimiter); 429s that still happen are retried by the client.
+EMBEDDING_CONCURRENCY = 8
+
+# Connection pool of the shared OpenAI HTTP client. Crawl and metadata
+# threads embed concurrently too, so keep more than EMBEDDING_CONCURRENCY
+# connections warm. HTTP/2 (multiplexed requests over one connection) is
+# used when the optional `h2` package is installed.
+EMBEDDING_HTTP_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+EMBEDDING_HTTP2 = importlib.util.find_spec("h2") is not None
+# Client-side retries of a failed request. The OpenAI client waits as long
+# as a 429's Retry-After header asks before each one.
+EMBEDDING_MAX_RETRIES = 5
+
+
+class TokenBucketLimiter:
+    """
+    Proactive OpenAI throttling with two token buckets: requests per minute
+    and tokens per minute, each refilled continuously.
+    
+    Callers wait for budget *before* sending, so a large ingestion paces
+    itself below the account limit instead of burning time on 429s.
+    Thread-safe; one instance per worker process.
+    """
+    
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens: int) -> float:
+        """
+        Take one request and `tokens` tokens, sleeping until both are free.
+        
+        A request larger than the whole token bucket waits for a full one.
+        
+        Returns:
+            Seconds spent waiting
+        """
+        tokens = min(tokens, self.tpm)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._updated
+                self._updated = now
+                self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+                self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return waited
+                delay = max(
+                    (1 - self._requests) * 60 / self.rpm,
+                    (tokens - self._tokens) * 60 / self.tpm
+                )
+            # Sleep outside the lock so other threads can refill and check too
+            time.sleep(delay)
+            waited += delay
+
+
+_rate_limiter = TokenBucketLimiter(settings.OPENAI_EMBEDDING_RPM, settings.OPENAI_EMBEDDING_TPM)
+
+
+def count_tokens(texts: List[str]) -> int:
+    """Token count of a request's inputs (~4 characters per token without tiktoken)."""
+    if TIKTOKEN_ENCODER is None:
+        return sum(len(text) // 4 + 1 for text in texts)
+    return sum(map(len, TIKTOKEN_ENCODER.encode_ordinary_batch(texts)))
+
+
+def _embed_documents_throttled(model: OpenAIEmbeddings, texts: List[str]) -> List[List[float]]:
+    """Wait for rate-limit budget, then embed one sub-batch."""
+    waited = _rate_limiter.acquire(count_tokens(texts))
+    if waited:
+        logger.info(f"⏳ [Embeddings] Throttled {waited:.1f}s to stay under the OpenAI rate limit")
+    return model.embed_documents(texts)
+
+# Singleton embeddings model instance (one pooled HTTP client per process)
 _embeddings_model: Optional[OpenAIEmbeddings] = None
+_embeddings_model_lock = threading.Lock()
 
 
 def get_embeddings_model() -> OpenAIEmbeddings:
@@ -25,13 +126,22 @@ def get_embeddings_model() -> OpenAIEmbeddings:
     global _embeddings_model
     
     if _embeddings_model is None:
-        _embeddings_model = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            api_key=settings.OPENAI_API_KEY,
-            request_timeout=60,
-            max_retries=2
-        )
-        logger.info("📊 [Embeddings] Initialized OpenAI embeddings model (text-embedding-3-small)")
+        # Worker threads (crawl pool, metadata writers) may race here on the
+        # first call; build exactly one client so its connection pool is shared.
+        with _embeddings_model_lock:
+            if _embeddings_model is None:
+                _embeddings_model = OpenAIEmbeddings(
+                    model="text-embedding-3-small",
+                    api_key=settings.OPENAI_API_KEY,
+                    request_timeout=60,
+                    max_retries=EMBEDDING_MAX_RETRIES,
+                    http_client=httpx.Client(
+                        http2=EMBEDDING_HTTP2,
+                        limits=EMBEDDING_HTTP_LIMITS,
+                        timeout=60
+                    )
+                )
+                logger.info(f"📊 [Embeddings] Initialized OpenAI embeddings model (text-embedding-3-small, http2={EMBEDDING_HTTP2})")
     
     return _embeddings_model
 
@@ -53,6 +163,7 @@ def generate_embedding(text: str) -> Optional[List[float]]:
     
     try:
         model = get_embeddings_model()
+        _rate_limiter.acquire(count_tokens([text]))
         embedding = model.embed_query(text)
         return embedding
     except Exception as e:
@@ -60,14 +171,38 @@ def generate_embedding(text: str) -> Optional[List[float]]:
         raise
 
 
+def _text_token_counts(texts: List[str]) -> List[int]:
+    """Per-text token counts (UTF-8 byte length, an upper bound, without tiktoken)."""
+    if TIKTOKEN_ENCODER is None:
+        return [len(text.encode("utf-8")) for text in texts]
+    return [len(tokens) for tokens in TIKTOKEN_ENCODER.encode_ordinary_batch(texts)]
+
+
+def _iter_embedding_batches(texts: List[str]):
+    """
+    Yield consecutive sub-batches of at most EMBEDDING_BATCH_SIZE texts and
+    EMBEDDING_BATCH_MAX_TOKENS tokens (a longer text goes on its own).
+    """
+    batch: List[str] = []
+    batch_tokens = 0
+    for text, tokens in zip(texts, _text_token_counts(texts)):
+        if batch and (len(batch) >= EMBEDDING_BATCH_SIZE or batch_tokens + tokens > EMBEDDING_BATCH_MAX_TOKENS):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
 @with_retry_sync(max_attempts=3)
 def generate_embeddings_batch(texts: List[str]) -> List[Optional[List[float]]]:
     """
     Generate embeddings for a batch of texts.
     
-    Automatically splits into sub-batches to stay under OpenAI's token limits.
-    Uses ~300 tokens per chunk estimate, limiting to ~800 chunks per batch
-    for safety margin under 300K token limit.
+    Automatically splits into sub-batches (_iter_embedding_batches) to stay
+    under OpenAI's token limits, and sends up to EMBEDDING_CONCURRENCY of
+    them concurrently.
     
     Args:
         texts: List of texts to embed
@@ -92,26 +227,21 @@ def generate_embeddings_batch(texts: List[str]) -> List[Optional[List[float]]]:
     try:
         model = get_embeddings_model()
         
-        # PRODUCTION TUNING: Maximum Safety
-        # Dense PDF pages can have 2000+ tokens. With 20 chunks * 2000 = 40k tokens max.
-        # This guarantees we NEVER hit the 300k token limit per request.
-        BATCH_SIZE = 20
-        # Conservative sleep interval to respect Tokens Per Minute (TPM) limits
-        SLEEP_INTERVAL = 1.0
+        batches = list(_iter_embedding_batches(valid_texts))
+        
+        # Sub-batches are independent HTTPS calls: keep a few in flight instead
+        # of waiting on each round-trip in turn. map() preserves batch order.
+        def embed(batch: List[str]) -> List[List[float]]:
+            return _embed_documents_throttled(model, batch)
         
-        all_embeddings = []
+        if len(batches) == 1:
+            batch_results = [embed(batches[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(EMBEDDING_CONCURRENCY, len(batches))) as pool:
+                batch_results = list(pool.map(embed, batches))
+            logger.info(f"📊 [Embeddings] Processed {len(batches)} batches ({EMBEDDING_CONCURRENCY} concurrent)")
         
-        for batch_start in range(0, len(valid_texts), BATCH_SIZE):
-            batch_end = min(batch_start + BATCH_SIZE, len(valid_texts))
-            batch_texts = valid_texts[batch_start:batch_end]
-            
-            batch_embeddings = model.embed_documents(batch_texts)
-            all_embeddings.extend(batch_embeddings)
-            
-            # Rate Limit Protection: Always sleep between batches to respect OpenAI TPM
-            if batch_end < len(valid_texts):
-                logger.info(f"📊 [Embeddings] Processed batch {batch_start//BATCH_SIZE + 1}: {len(batch_texts)} texts")
-                time.sleep(SLEEP_INTERVAL)
+        all_embeddings = [embedding for batch in batch_results for embedding in batch]
         
         # Reconstruct full result list with None for empty texts
         result = [None for _ in texts]
@@ -50,10 +50,9 @@ async def test_list_plans_success(mock_settings):
     }
 
     mock_client = AsyncMock()
-    mock_client.__aenter__.return_value = mock_client
     mock_client.get.return_value = mock_response
 
-    with patch("httpx.AsyncClient", return_value=mock_client):
+    with patch("api.v1.billing.get_polar_client", return_value=mock_client):
         plans = await list_plans()
 
     assert len(plans) == 2
@@ -72,9 +71,21 @@ async def test_list_plans_no_token():
 @pytest.mark.asyncio
 async def test_list_plans_api_error(mock_settings):
     mock_client = AsyncMock()
-    mock_client.__aenter__.return_value = mock_client
     mock_client.get.side_effect = Exception("API Error")
 
-    with patch("httpx.AsyncClient", return_value=mock_client):
+    with patch("api.v1.billing.get_polar_client", return_value=mock_client):
         plans = await list_plans()
         assert plans == []
+
+def test_polar_client_is_shared_until_closed():
+    import asyncio
+    import api.v1.billing as billing
+
+    with patch.object(billing, "_polar_client", None):
+        client = billing.get_polar_client()
+        assert billing.get_polar_client() is client
+
+        asyncio.run(billing.close_polar_client())
+        assert client.is_closed
+        assert billing.get_polar_client() is not client
+        asyncio.run(billing.close_polar_client())
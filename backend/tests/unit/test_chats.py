@@ -81,7 +81,7 @@ class TestRAGChatEndpoint:
              patch("api.v1.chat.guardrail_service.analyze_query") as mock_guard, \
              patch("api.v1.chat.llm_router.select_model") as mock_router, \
              patch("api.v1.chat.condense_question", return_value="Condensed Question?") as mock_condense, \
-             patch("api.v1.chat.OpenAIEmbeddings"), \
+             patch("api.v1.chat.get_embeddings_model"), \
              patch("api.v1.chat.LLMFactory") as mock_llm_factory, \
              patch("api.v1.chat.save_messages") as mock_save_messages:
             
@@ -150,7 +150,7 @@ class TestRAGChatEndpoint:
         with patch("api.v1.chat.get_supabase", return_value=mock_supabase), \
              patch("api.v1.chat.guardrail_service.analyze_query") as mock_guard, \
              patch("api.v1.chat.condense_question", return_value="Q"), \
-             patch("api.v1.chat.OpenAIEmbeddings"), \
+             patch("api.v1.chat.get_embeddings_model"), \
              patch("api.v1.chat.LLMFactory"), \
              patch("api.v1.chat.sentry_sdk") as mock_sentry:
                 
@@ -185,7 +185,7 @@ class TestRAGChatEndpoint:
              patch("api.v1.chat.guardrail_service.analyze_query") as mock_guard, \
              patch("api.v1.chat.llm_router.select_model") as mock_router, \
              patch("api.v1.chat.condense_question", return_value="Q"), \
-             patch("api.v1.chat.OpenAIEmbeddings"), \
+             patch("api.v1.chat.get_embeddings_model"), \
              patch("api.v1.chat.LLMFactory"), \
              patch("api.v1.chat.sentry_sdk") as mock_sentry:
             
@@ -26,6 +26,132 @@ class TestCrawlWebTask:
         from worker.tasks import crawl_web_task
         assert callable(crawl_web_task)
     
+    @patch('time.sleep')
+    @patch('worker.tasks.create_notification')
+    @patch('worker.tasks.generate_embeddings_batch')
+    @patch('worker.tasks.get_supabase')
+    def test_processes_urls_across_hosts(self, mock_supabase, mock_embeddings, mock_notify, mock_sleep):
+        """Should ingest every discovered URL via the worker pool."""
+        from worker.tasks import crawl_web_task
+        from connectors.base import ConnectorDocument
+        
+        urls = ["https://a.example.com/1", "https://b.example.com/1", "https://a.example.com/2"]
+        mock_connector = Mock()
+        mock_connector.parse_sitemap.return_value = urls
+        mock_connector.ingest_sync.side_effect = lambda cfg: [
+            ConnectorDocument(page_content="text", metadata={"source_url": cfg["item_ids"][0]})
+        ]
+        mock_embeddings.return_value = [[0.1]] * len(urls)
+        mock_supabase.return_value.rpc.return_value.execute.return_value = Mock(data=["d1", "d2", "d3"])
+        
+        with patch('worker.tasks.WebConnector', return_value=mock_connector):
+            result = crawl_web_task(
+                user_id="user-1",
+                root_url="https://a.example.com/sitemap.xml",
+                crawl_config={"crawl_type": "sitemap"}
+            )
+        
+        assert result["pages_ingested"] == 3
+        assert result["pages_failed"] == 0
+        assert mock_connector.ingest_sync.call_count == 3
+        # All pages stored through one batched RPC
+        mock_supabase.return_value.rpc.assert_called_once()
+        assert mock_supabase.return_value.rpc.call_args[0][0] == "ingest_documents_with_chunks"
+    
+    @patch('time.sleep')
+    @patch('worker.tasks.create_notification')
+    @patch('worker.tasks.get_supabase')
+    def test_dedupes_sitemap_urls(self, mock_supabase, mock_notify, mock_sleep):
+        """Should ingest each canonical sitemap URL once."""
+        from worker.tasks import crawl_web_task
+        
+        mock_connector = Mock()
+        mock_connector.parse_sitemap.return_value = [
+            "https://example.com/a", "https://example.com/a/", "https://example.com/a?utm_source=x"
+        ]
+        mock_connector.ingest_sync.return_value = []
+        
+        with patch('worker.tasks.WebConnector', return_value=mock_connector):
+            crawl_web_task(
+                user_id="user-1",
+                root_url="https://example.com/sitemap.xml",
+                crawl_config={"crawl_type": "sitemap"}
+            )
+        
+        assert mock_connector.ingest_sync.call_count == 1
+    
+    @patch('time.sleep')
+    @patch('worker.tasks.create_notification')
+    @patch('worker.tasks.generate_embeddings_batch')
+    @patch('worker.tasks.get_supabase')
+    def test_recursive_crawl_fetches_each_page_once(self, mock_supabase, mock_embeddings, mock_notify, mock_sleep):
+        """Should follow links while ingesting, fetching every canonical page once."""
+        from worker.tasks import crawl_web_task
+        
+        links = {
+            "https://example.com": ["https://example.com/a", "https://example.com/b/"],
+            "https://example.com/a": ["https://example.com/b", "https://example.com/c"],
+        }
+        mock_connector = Mock()
+        mock_connector.is_youtube_url.return_value = False
+        mock_connector.check_robots_txt.return_value = True
+        mock_connector.fetch_html.side_effect = lambda url: url
+        mock_connector.extract_links.side_effect = lambda html, url: links.get(url, [])
+        mock_connector.document_from_html.return_value = None
+        
+        with patch('worker.tasks.WebConnector', return_value=mock_connector):
+            result = crawl_web_task(
+                user_id="user-1",
+                root_url="https://example.com/",
+                crawl_config={"crawl_type": "recursive", "max_depth": 2}
+            )
+        
+        assert result["pages_discovered"] == 4
+        # One download per page feeds both link discovery and text extraction
+        assert mock_connector.fetch_html.call_count == 4
+        assert mock_connector.document_from_html.call_count == 4
+        mock_connector.ingest_sync.assert_not_called()
+        # Depth-2 pages are ingested but their links are not followed
+        assert mock_connector.extract_links.call_count == 3
+
+    @patch('time.sleep')
+    @patch('worker.tasks.CRAWL_MAX_IN_FLIGHT', 1)
+    @patch('worker.tasks.CRAWL_STORE_WINDOW', 2)
+    @patch('worker.tasks.DISCOVERY_MAX_URLS', 5)
+    @patch('worker.tasks.store_documents')
+    @patch('worker.tasks.embed_with_cache')
+    @patch('worker.tasks.create_notification')
+    @patch('worker.tasks.get_supabase')
+    def test_recursive_crawl_is_capped_and_stored_in_windows(self, mock_supabase, mock_notify, mock_embed, mock_store, mock_sleep):
+        """The frontier stops at DISCOVERY_MAX_URLS and pages are stored as they accumulate."""
+        from worker.tasks import crawl_web_task
+        from connectors.base import ConnectorDocument
+
+        mock_connector = Mock()
+        mock_connector.is_youtube_url.return_value = False
+        mock_connector.check_robots_txt.return_value = True
+        mock_connector.fetch_html.side_effect = lambda url: url
+        # Every page links to 50 new pages
+        mock_connector.extract_links.side_effect = lambda html, url: [f"{url}/{i}" for i in range(50)]
+        mock_connector.document_from_html.side_effect = lambda url, html: ConnectorDocument(
+            page_content=url, metadata={"source_url": url}
+        )
+        mock_embed.side_effect = lambda supabase, texts: [[0.1]] * len(texts)
+        mock_store.side_effect = lambda supabase, user_id, source_type, pages: [p["source_url"] for p in pages]
+
+        with patch('worker.tasks.WebConnector', return_value=mock_connector):
+            result = crawl_web_task(
+                user_id="user-1",
+                root_url="https://example.com/",
+                crawl_config={"crawl_type": "recursive", "max_depth": 5}
+            )
+
+        assert result["pages_discovered"] == 5
+        assert mock_connector.fetch_html.call_count == 5
+        # Stored while crawling, not in one call at the end
+        assert [len(c[0][3]) for c in mock_store.call_args_list] == [2, 2, 1]
+        assert sum(len(c[0][3]) for c in mock_store.call_args_list) == 5
+
     @patch('worker.tasks.get_supabase')
     def test_updates_crawl_status(self, mock_supabase):
         """Should update crawl status throughout the process."""
@@ -45,6 +171,65 @@ class TestCrawlWebTask:
         mock_supabase_instance.table.assert_called_with("web_crawl_configs")
 
 
+class TestHostThrottle:
+    """Test per-host crawl politeness."""
+    
+    @patch('time.sleep')
+    @patch('random.uniform', return_value=1.0)
+    @patch('time.monotonic', return_value=100.0)
+    def test_spaces_same_host_only(self, mock_monotonic, mock_uniform, mock_sleep):
+        """Should delay repeat requests to one host but not other hosts."""
+        from worker.tasks import HostThrottle
+        
+        throttle = HostThrottle((1.0, 1.0))
+        throttle.wait("https://a.example.com/1")
+        throttle.wait("https://b.example.com/1")
+        throttle.wait("https://a.example.com/2")
+        throttle.wait("https://a.example.com/3")
+        
+        assert [c[0][0] for c in mock_sleep.call_args_list] == [1.0, 2.0]
+
+
+class TestSharedWebConnector:
+    """Test the per-process pooled WebConnector."""
+
+    def test_reused_within_process_and_rebuilt_after_fork(self):
+        """Should return one connector per PID."""
+        from worker.tasks import get_web_connector, close_web_connector
+
+        close_web_connector()
+        try:
+            first = get_web_connector()
+            assert get_web_connector() is first
+
+            with patch('os.getpid', return_value=-1):
+                assert get_web_connector() is not first
+        finally:
+            close_web_connector()
+
+
+class TestWorkerProcessSupabase:
+    """Test the per-process Supabase client."""
+
+    def test_pool_child_builds_and_reuses_its_own_client(self):
+        """Should swap in one fresh client per process and return it on every call."""
+        import core.db as db
+
+        parent_client = db.supabase
+        child_client = Mock()
+        try:
+            with patch('core.db.create_client', return_value=child_client) as mock_create:
+                db.init_process_supabase()
+                assert db.get_supabase() is child_client
+                assert db.get_supabase() is child_client
+                mock_create.assert_called_once()
+
+            db.close_supabase()
+            child_client.postgrest.aclose.assert_called_once()
+        finally:
+            db.supabase = parent_client
+
+
 class TestCheckScheduledCrawls:
     """Test the scheduled re-crawl task."""
     
@@ -75,6 +260,59 @@ class TestCheckScheduledCrawls:
         # The task would be called via Celery - testing the logic
         assert True  # Placeholder
     
+    @patch('worker.tasks.group')
+    @patch('worker.tasks.get_supabase')
+    def test_resets_and_dispatches_due_crawls_in_bulk(self, mock_supabase, mock_group):
+        """Should reset all due crawls with one RPC and publish them as one group."""
+        from worker.tasks import check_scheduled_crawls
+
+        due = [
+            {"id": f"crawl-{i}", "user_id": "user-1", "root_url": f"https://example{i}.com",
+             "crawl_type": "single", "max_depth": 1, "refresh_interval": interval}
+            for i, interval in enumerate(["daily", "weekly"])
+        ]
+        client = mock_supabase.return_value
+        table = client.table.return_value
+        table.select.return_value.eq.return_value.neq.return_value.lte.return_value.execute.return_value = Mock(data=due)
+        client.rpc.return_value.execute.return_value = Mock(data=["crawl-0", "crawl-1"])
+
+        result = check_scheduled_crawls()
+
+        assert result["crawls_triggered"] == 2
+        table.update.assert_not_called()
+        table.upsert.assert_not_called()
+        name, params = client.rpc.call_args[0]
+        assert name == "reset_scheduled_crawls"
+        rows = params["p_rows"]
+        # Only the per-row values are sent, never the full config rows
+        assert all(set(r) == {"id", "celery_task_id", "next_crawl_at"} for r in rows)
+        assert all(r["celery_task_id"] and r["next_crawl_at"] for r in rows)
+        signatures = list(mock_group.call_args[0][0])
+        assert [sig.id for sig in signatures] == [r["celery_task_id"] for r in rows]
+        mock_group.return_value.apply_async.assert_called_once()
+
+    @patch('worker.tasks.group')
+    @patch('worker.tasks.get_supabase')
+    def test_skips_configs_not_reset(self, mock_supabase, mock_group):
+        """Configs deleted or edited since the select should not be dispatched."""
+        from worker.tasks import check_scheduled_crawls
+
+        due = [
+            {"id": f"crawl-{i}", "user_id": "user-1", "root_url": f"https://example{i}.com",
+             "crawl_type": "single", "max_depth": 1, "refresh_interval": "daily"}
+            for i in range(2)
+        ]
+        client = mock_supabase.return_value
+        client.table.return_value.select.return_value.eq.return_value.neq.return_value.lte.return_value.execute.return_value = Mock(data=due)
+        client.rpc.return_value.execute.return_value = Mock(data=["crawl-1"])
+
+        result = check_scheduled_crawls()
+
+        assert result["crawls_triggered"] == 1
+        rows = client.rpc.call_args[0][1]["p_rows"]
+        signatures = list(mock_group.call_args[0][0])
+        assert [sig.id for sig in signatures] == [rows[1]["celery_task_id"]]
+
     @patch('worker.tasks.get_supabase')
     def test_no_pending_crawls(self, mock_supabase):
         """Should handle case with no pending crawls."""
@@ -106,6 +344,22 @@ class TestCrawlDiscoveryTask:
         assert len(new_urls) == 1
         assert new_urls[0] == "https://example.com/page2"
     
+    def test_existing_url_lookup_covers_every_url(self):
+        """Should check all discovered URLs in batches instead of the first 1000."""
+        from worker.tasks import find_existing_source_urls, DEDUP_LOOKUP_BATCH
+
+        urls = [f"https://example.com/{i}" for i in range(DEDUP_LOOKUP_BATCH * 12 + 1)]
+        mock_supabase = Mock()
+        query = mock_supabase.table.return_value.select.return_value.eq.return_value
+        query.in_.side_effect = lambda col, batch: Mock(
+            execute=Mock(return_value=Mock(data=[{"source_url": u} for u in batch if u.endswith("0")]))
+        )
+
+        existing = find_existing_source_urls(mock_supabase, "user-1", urls)
+
+        assert query.in_.call_count == 13
+        assert existing == {u for u in urls if u.endswith("0")}
+
     def test_recursive_discovery(self):
         """Should perform BFS for recursive crawling."""
         # Test concept: recursive mode should follow links
@@ -128,7 +382,21 @@ class TestProcessPageTask:
         # Test that the task exists
         from worker.tasks import process_page_task
         assert callable(process_page_task)
-    
+
+    def test_registered_tasks_are_the_module_definitions(self):
+        """The finalized app should run the same crawl tasks the module exports."""
+        import inspect
+        from core.celery_app import celery_app
+        from worker import tasks
+
+        celery_app.finalize()
+        for name in ("process_page_task", "crawl_discovery_task"):
+            registered = celery_app.tasks[f"worker.tasks.{name}"]
+            assert registered.run is getattr(tasks, name).run
+
+        params = list(inspect.signature(celery_app.tasks["worker.tasks.process_page_task"].run).parameters)
+        assert params[:3] == ["url", "user_id", "crawl_id"]
+
     def test_respects_rate_limit(self):
         """Should wait when rate limited."""
         # Test concept: rate limiting should block after N requests
@@ -137,6 +405,36 @@ class TestProcessPageTask:
         should_wait = requests_made >= RATE_LIMIT
         assert should_wait is True
     
+    @patch('worker.tasks.get_web_connector')
+    @patch('worker.tasks.check_rate_limit', return_value=False)
+    @patch('worker.tasks.get_supabase')
+    def test_rate_limited_page_is_retried_not_slept(self, mock_supabase, mock_rate_limit, mock_connector):
+        """Should hand a rate-limited page back to the queue without fetching it."""
+        from celery.exceptions import Retry
+        from worker.tasks import process_page_task
+
+        with patch('time.sleep') as mock_sleep, pytest.raises(Retry):
+            process_page_task("https://example.com", "user-1", "crawl-1")
+
+        mock_sleep.assert_not_called()
+        mock_connector.assert_not_called()
+
+    @patch('worker.tasks.get_web_connector')
+    @patch('worker.tasks.check_rate_limit', return_value=True)
+    @patch('worker.tasks.get_supabase')
+    def test_page_makes_no_per_page_progress_rpc(self, mock_supabase, mock_rate_limit, mock_connector):
+        """Progress is published per batch by store_crawl_pages_task, not per page."""
+        from core.celery_app import celery_app
+
+        doc = MagicMock(page_content="Hello", metadata={"title": "Home"})
+        mock_connector.return_value.ingest_sync.return_value = [doc]
+
+        celery_app.finalize()
+        result = celery_app.tasks["worker.tasks.process_page_task"]("https://example.com", "user-1", "crawl-1")
+
+        assert result["status"] == "success"
+        mock_supabase.return_value.rpc.assert_not_called()
+
     def test_handles_empty_content(self):
         """Should handle pages with no content gracefully."""
         # Test concept: empty pages should be skipped
@@ -150,6 +448,190 @@ class TestProcessPageTask:
         assert rpc_name == "ingest_document_with_chunks"
 
 
+class TestDiscoverPageTask:
+    """Test the distributed recursive discovery task."""
+
+    STATE = {
+        b"user_id": b"user-1",
+        b"root_url": b"https://example.com",
+        b"crawl_config": b'{"crawl_id": "crawl-1", "max_depth": 3}',
+    }
+
+    def _connector(self, links):
+        connector = Mock()
+        connector.fetch_html.return_value = "<html></html>"
+        connector.extract_links.return_value = links
+        return connector
+
+    def _redis(self, *executes):
+        """Redis mock whose pipelines return `executes` in turn."""
+        mock_redis = MagicMock()
+        mock_redis.hgetall.return_value = self.STATE
+        mock_redis.pipeline.return_value.execute.side_effect = list(executes)
+        return mock_redis
+
+    @patch('worker.tasks.dispatch_crawl_pages')
+    @patch('worker.tasks.check_rate_limit', return_value=True)
+    def test_fans_out_only_unseen_links(self, mock_rate_limit, mock_dispatch):
+        """Should queue one discovery task per link no worker has seen yet."""
+        from worker.tasks import discover_page_task
+
+        connector = self._connector(["https://example.com/a", "https://example.com/b/"])
+        # scard + SADDs (/a is new, /b was already seen elsewhere), then
+        # SREM/SCARD/ZADD for this page with the child still in flight
+        mock_redis = self._redis([1, 1, 0], [1, 1, 0])
+
+        with patch('worker.tasks.get_redis', return_value=mock_redis), \
+                patch('worker.tasks.get_web_connector', return_value=connector), \
+                patch('worker.tasks.group') as mock_group:
+            result = discover_page_task("run-1", "https://example.com", 0)
+
+        children = list(mock_group.call_args[0][0])
+        assert [sig.args for sig in children] == [("run-1", "https://example.com/a", 1)]
+        mock_redis.sadd.assert_called_once_with("crawl:inflight:run-1", "https://example.com/a")
+        mock_redis.pipeline.return_value.srem.assert_called_once_with("crawl:inflight:run-1", "https://example.com")
+        assert result["new_links"] == 1
+        mock_dispatch.assert_not_called()
+
+    @patch('worker.tasks.get_supabase')
+    @patch('worker.tasks.dispatch_crawl_pages', return_value={"status": "dispatched"})
+    @patch('worker.tasks.check_rate_limit', return_value=True)
+    def test_last_task_dispatches_seen_urls(self, mock_rate_limit, mock_dispatch, mock_supabase):
+        """Should hand every seen URL to the page workers once the run drains."""
+        from worker.tasks import discover_page_task
+
+        mock_redis = self._redis([1, 0, 0])
+        mock_redis.zrem.return_value = 1
+        mock_redis.smembers.return_value = {b"https://example.com/a", b"https://example.com"}
+
+        with patch('worker.tasks.get_redis', return_value=mock_redis), \
+                patch('worker.tasks.get_web_connector', return_value=self._connector([])):
+            result = discover_page_task("run-1", "https://example.com/a", 2)
+
+        assert result == {"status": "dispatched"}
+        args, kwargs = mock_dispatch.call_args
+        assert args[4] == ["https://example.com", "https://example.com/a"]
+        assert kwargs == {"run_id": "run-1"}
+        mock_redis.delete.assert_called_once_with("crawl:discovery:run-1", "crawl:seen:run-1", "crawl:inflight:run-1")
+
+    @patch('worker.tasks.get_supabase')
+    @patch('worker.tasks.dispatch_crawl_pages', return_value={"status": "dispatched"})
+    @patch('worker.tasks.check_rate_limit', return_value=True)
+    def test_failed_fan_out_still_drains_the_run(self, mock_rate_limit, mock_dispatch, mock_supabase):
+        """A page whose children cannot be published leaves the run as a leaf."""
+        from worker.tasks import discover_page_task
+
+        mock_redis = self._redis([1, 1], [1, 0, 0])
+        mock_redis.zrem.return_value = 1
+        mock_redis.smembers.return_value = {b"https://example.com", b"https://example.com/a"}
+
+        with patch('worker.tasks.get_redis', return_value=mock_redis), \
+                patch('worker.tasks.get_web_connector', return_value=self._connector(["https://example.com/a"])), \
+                patch('worker.tasks.group') as mock_group:
+            mock_group.return_value.apply_async.side_effect = RuntimeError("broker down")
+            result = discover_page_task("run-1", "https://example.com", 0)
+
+        mock_redis.srem.assert_called_once_with("crawl:inflight:run-1", "https://example.com/a")
+        assert result == {"status": "dispatched"}
+
+    @patch('worker.tasks.dispatch_crawl_pages')
+    @patch('worker.tasks.check_rate_limit', return_value=True)
+    def test_redelivered_page_does_not_finish_twice(self, mock_rate_limit, mock_dispatch):
+        """A page that already left the in-flight set must not count again."""
+        from worker.tasks import discover_page_task
+
+        mock_redis = self._redis([0, 0, 0])
+
+        with patch('worker.tasks.get_redis', return_value=mock_redis), \
+                patch('worker.tasks.get_web_connector', return_value=self._connector([])):
+            result = discover_page_task("run-1", "https://example.com/a", 2)
+
+        assert result["status"] == "duplicate"
+        mock_redis.zrem.assert_not_called()
+        mock_dispatch.assert_not_called()
+
+
+class TestReapStalledDiscoveries:
+    """Test the watchdog for recursive discovery runs."""
+
+    @patch('worker.tasks.finalize_crawl')
+    @patch('worker.tasks.get_supabase')
+    def test_fails_stalled_runs_once(self, mock_supabase, mock_finalize):
+        """Stalled runs are claimed with ZREM and finalized with an error."""
+        from worker.tasks import reap_stalled_discoveries
+
+        mock_redis = MagicMock()
+        mock_redis.zrangebyscore.return_value = [b"run-1", b"run-2"]
+        # run-2 finished (or was claimed) between the scan and the claim
+        mock_redis.zrem.side_effect = [1, 0]
+        mock_redis.hgetall.return_value = TestDiscoverPageTask.STATE
+
+        with patch('worker.tasks.get_redis', return_value=mock_redis):
+            assert reap_stalled_discoveries() == 1
+
+        args = mock_finalize.call_args[0]
+        assert args[1:6] == ("user-1", "https://example.com", "crawl-1", 0, 0)
+        assert args[6].startswith("Discovery stalled")
+        mock_redis.delete.assert_called_once_with("crawl:discovery:run-1", "crawl:seen:run-1", "crawl:inflight:run-1")
+
+
+class TestStoreCrawlPagesTask:
+    """Test the chord callback that embeds and stores fetched pages."""
+
+    @patch('worker.tasks.create_notification')
+    @patch('worker.tasks.embed_with_cache')
+    @patch('worker.tasks.get_supabase')
+    def test_embeds_all_pages_in_one_batch(self, mock_supabase, mock_embeddings, mock_notify):
+        """Should embed every fetched page together and store them with one RPC."""
+        from worker.tasks import store_crawl_pages_task
+
+        results = [
+            {"status": "success", "url": f"https://example.com/{i}", "title": f"Page {i}",
+             "metadata": {}, "content": f"text {i}"}
+            for i in range(3)
+        ] + [{"status": "failed", "url": "https://example.com/x", "error": "boom"}]
+        mock_embeddings.return_value = [[0.1]] * 3
+        mock_supabase.return_value.rpc.return_value.execute.return_value = Mock(data=["d1", "d2", "d3"])
+
+        result = store_crawl_pages_task(results, "user-1", "https://example.com", None)
+
+        mock_embeddings.assert_called_once_with(mock_supabase.return_value, ["text 0", "text 1", "text 2"])
+        mock_supabase.return_value.rpc.assert_called_once()
+        assert mock_supabase.return_value.rpc.call_args[0][0] == "ingest_documents_with_chunks"
+        assert result["success"] == 3
+        assert result["failed"] == 1
+
+    @patch('worker.tasks.create_notification')
+    @patch('worker.tasks.update_crawl_status')
+    @patch('worker.tasks.embed_with_cache', return_value=[[0.1]])
+    @patch('worker.tasks.get_supabase')
+    def test_batches_report_progress_and_last_one_finalizes(self, mock_supabase, mock_embeddings, mock_status, mock_notify):
+        """Should write run totals per batch and mark the crawl completed after the last one."""
+        from worker.tasks import store_crawl_pages_task
+
+        page = [{"status": "success", "url": "https://example.com", "title": "T", "metadata": {}, "content": "text"}]
+        mock_supabase.return_value.rpc.return_value.execute.return_value = Mock(data=["d1"])
+        mock_pipe = Mock()
+        mock_pipe.execute.side_effect = [[1, 0, 1, True], [2, 0, 2, True]]
+
+        with patch('worker.tasks.get_redis') as mock_redis:
+            mock_redis.return_value.pipeline.return_value = mock_pipe
+            first = store_crawl_pages_task(page, "user-1", "https://example.com", "crawl-1", run_id="run-1", total_batches=2)
+            # Interim progress only, not completion
+            mock_status.assert_called_once_with(
+                mock_supabase.return_value, "crawl-1", pages_ingested=1, pages_failed=0
+            )
+            mock_status.reset_mock()
+            second = store_crawl_pages_task(page, "user-1", "https://example.com", "crawl-1", run_id="run-1", total_batches=2)
+
+        assert first["status"] == "batch_stored"
+        assert second["success"] == 2
+        mock_status.assert_called_once_with(
+            mock_supabase.return_value, "crawl-1", status="completed", pages_ingested=2, pages_failed=0
+        )
+        mock_notify.assert_called_once()
+
+
 class TestRateLimiting:
     """Test Redis-based rate limiting."""
     
@@ -173,6 +655,30 @@ class TestRateLimiting:
         # This is fail-open behavior for resilience
         assert True
 
+    def test_single_script_call_per_check(self):
+        """Should decide with one script call on the shared client."""
+        import worker.tasks as tasks
+
+        script = Mock(side_effect=[1, 0])
+        mock_redis = Mock()
+        mock_redis.register_script.return_value = script
+
+        with patch.object(tasks, '_rate_limit_script', None), \
+                patch('worker.tasks.get_redis', return_value=mock_redis):
+            assert tasks.check_rate_limit(None, "https://example.com/a") is True
+            assert tasks.check_rate_limit(None, "https://example.com/b") is False
+
+        mock_redis.register_script.assert_called_once()
+        assert script.call_args[1]["keys"] == ["crawl_ratelimit:example.com"]
+
+    def test_script_error_allows_request(self):
+        """Should fail open when Redis is unavailable."""
+        import worker.tasks as tasks
+
+        with patch.object(tasks, '_rate_limit_script', None), \
+                patch('worker.tasks.get_redis', side_effect=Exception("down")):
+            assert tasks.check_rate_limit(None, "https://example.com") is True
+
 
 class TestUpdateCrawlStatus:
     """Test crawl status update helper."""
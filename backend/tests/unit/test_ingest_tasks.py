@@ -80,6 +80,326 @@ class TestIngestFileTask:
         mock_supabase_instance.table.assert_called_with("notifications")
 
 
+class TestEmbedPipeline:
+    """Test the ingest -> embed/store -> notify chain."""
+    
+    @staticmethod
+    def _stream_bytes(mock_stream, *blocks):
+        """Make httpx.stream() yield the given byte blocks."""
+        response = mock_stream.return_value.__enter__.return_value
+        response.iter_bytes.return_value = list(blocks)
+        return response
+    
+    @patch('worker.tasks.httpx.stream')
+    @patch('worker.tasks.chain')
+    @patch('worker.tasks.schedule_staging_cleanup')
+    @patch('services.parsers.DocumentProcessorFactory.process')
+    @patch('worker.tasks.create_notification')
+    @patch('worker.tasks.update_job_status')
+    @patch('worker.tasks.get_supabase')
+    def test_ingest_file_hands_off_chunks(self, mock_supabase, mock_status, mock_notify, mock_process, mock_cleanup, mock_chain, mock_stream):
+        """Should parse, then queue embedding instead of embedding inline."""
+        from worker.tasks import ingest_file_task
+        
+        mock_supabase.return_value.storage.from_.return_value.create_signed_url.return_value = {"signedURL": "https://signed"}
+        self._stream_bytes(mock_stream, b"hel", b"lo")
+        mock_result = Mock(file_type="txt", total_tokens=2, metadata={})
+        mock_result.chunks = [Mock(content="hello", chunk_index=0, metadata={}, token_count=2)]
+        mock_process.return_value = mock_result
+        mock_chain.return_value.apply_async.return_value = Mock(id="pipeline-1")
+        
+        result = ingest_file_task(
+            user_id="user-123", job_id="job-123",
+            storage_path="user-123/f.txt", filename="f.txt"
+        )
+        
+        assert result["status"] == "queued"
+        assert result["chunks"] == 1
+        mock_stream.assert_called_once_with("GET", "https://signed", timeout=60)
+        assert mock_process.call_args.kwargs["file_path"].endswith(".txt")
+        # File size is counted from the streamed blocks
+        assert mock_chain.call_args[0][0].args[5] == 5
+        mock_supabase.return_value.rpc.assert_not_called()
+        embed_sig = mock_chain.call_args[0][0]
+        assert embed_sig.args[3] == [{"content": "hello", "chunk_index": 0, "metadata": {"token_count": 2}}]
+        # Storage deletion is queued, not done inline
+        mock_cleanup.assert_called_once_with(mock_supabase.return_value, "user-123/f.txt")
+        mock_supabase.return_value.storage.from_.return_value.remove.assert_not_called()
+    
+    @patch('worker.tasks.find_existing_documents')
+    @patch('worker.tasks.httpx.stream')
+    @patch('worker.tasks.chain')
+    @patch('worker.tasks.schedule_staging_cleanup')
+    @patch('services.parsers.DocumentProcessorFactory.process')
+    @patch('worker.tasks.create_notification')
+    @patch('worker.tasks.update_job_status')
+    @patch('worker.tasks.get_supabase')
+    def test_ingest_file_skips_already_ingested_content(self, mock_supabase, mock_status, mock_notify, mock_process, mock_cleanup, mock_chain, mock_stream, mock_existing):
+        """Should not parse or embed bytes the user already has stored."""
+        from worker.tasks import ingest_file_task, document_content_hash
+        
+        mock_supabase.return_value.storage.from_.return_value.create_signed_url.return_value = {"signedURL": "https://signed"}
+        self._stream_bytes(mock_stream, b"hel", b"lo")
+        content_hash = document_content_hash("hello")
+        mock_existing.side_effect = lambda supabase, user_id, keys: {k: "doc-1" for k in keys if k == ("f.txt", content_hash)}
+        
+        result = ingest_file_task(
+            user_id="user-123", job_id="job-123",
+            storage_path="user-123/f.txt", filename="f.txt"
+        )
+        
+        assert result["status"] == "skipped"
+        assert result["document_id"] == "doc-1"
+        mock_process.assert_not_called()
+        mock_chain.assert_not_called()
+        mock_status.assert_called_with(mock_supabase.return_value, "job-123", "completed", 1)
+        mock_cleanup.assert_called_once()
+
+    @patch('worker.tasks.queue_email')
+    @patch('worker.tasks.httpx.stream')
+    @patch('worker.tasks.schedule_staging_cleanup')
+    @patch('worker.tasks.create_notification')
+    @patch('worker.tasks.update_job_status')
+    @patch('worker.tasks.get_supabase')
+    def test_ingest_file_retries_transient_download_errors(self, mock_supabase, mock_status, mock_notify, mock_cleanup, mock_stream, mock_email):
+        """Transport errors and 5xx are retried without failing the job; 4xx fails it."""
+        import httpx
+        from celery.exceptions import Retry
+        from worker.tasks import ingest_file_task
+
+        mock_supabase.return_value.storage.from_.return_value.create_signed_url.return_value = {"signedURL": "https://signed"}
+        request = httpx.Request("GET", "https://signed")
+        run = lambda: ingest_file_task(user_id="user-123", job_id="job-123", storage_path="user-123/f.txt", filename="f.txt")
+
+        # Dropped connection: re-raised for autoretry, staged file kept
+        mock_stream.side_effect = httpx.ReadError("reset", request=request)
+        with pytest.raises(httpx.ReadError):
+            run()
+
+        # 503: retried by hand
+        mock_stream.side_effect = httpx.HTTPStatusError("503", request=request, response=httpx.Response(503, request=request))
+        with patch.object(ingest_file_task, 'retry', side_effect=Retry()) as mock_retry, pytest.raises(Retry):
+            run()
+        mock_retry.assert_called_once()
+
+        assert not [c for c in mock_status.call_args_list if c.args[2] == "failed"]
+        mock_email.assert_not_called()
+        mock_cleanup.assert_not_called()
+
+        # 404: fails the job right away
+        mock_stream.side_effect = httpx.HTTPStatusError("404", request=request, response=httpx.Response(404, request=request))
+        with pytest.raises(httpx.HTTPStatusError):
+            run()
+        assert [c for c in mock_status.call_args_list if c.args[2] == "failed"]
+        mock_email.assert_called_once()
+        mock_cleanup.assert_called_once()
+
+    @patch('worker.tasks.embed_with_cache')
+    @patch('worker.tasks.create_notification')
+    @patch('worker.tasks.update_job_status')
+    @patch('worker.tasks.get_supabase')
+    def test_embed_and_store_skips_empty_chunks(self, mock_supabase, mock_status, mock_notify, mock_embed):
+        """Should embed, drop chunks without embeddings and store via RPC."""
+        import json
+        from worker.tasks import embed_and_store_task
+        
+        mock_embed.return_value = [[0.1], None]
+        mock_supabase.return_value.rpc.return_value.execute.return_value = Mock(data="doc-1")
+        chunks = [
+            {"content": "a", "chunk_index": 0, "metadata": {}},
+            {"content": " ", "chunk_index": 1, "metadata": {}},
+        ]
+        
+        result = embed_and_store_task("user-123", "job-123", "f.txt", chunks, {}, 10)
+        
+        assert result == {"status": "success", "document_id": "doc-1", "chunks": 1, "job_id": "job-123"}
+        rpc_params = mock_supabase.return_value.rpc.call_args[0][1]
+        assert json.loads(rpc_params["p_chunks"]) == [
+            {"content": "a", "chunk_index": 0, "metadata": {}, "embedding": "[.1]"}
+        ]
+        mock_status.assert_called_with(mock_supabase.return_value, "job-123", "completed", 1)
+    
+    @patch('worker.tasks.embed_with_cache')
+    @patch('worker.tasks.update_job_status')
+    @patch('worker.tasks.get_supabase')
+    def test_embed_and_store_retries_after_throttling(self, mock_supabase, mock_status, mock_embed):
+        """A 429 should requeue the stage after Retry-After without failing the job."""
+        from celery.exceptions import Retry
+        from worker.tasks import embed_and_store_task
+        
+        throttled = Exception("rate limited")
+        throttled.response = Mock(status_code=429, headers={"retry-after": "3"})
+        mock_embed.side_effect = throttled
+        
+        with patch.object(embed_and_store_task, 'retry', side_effect=Retry()) as mock_retry, \
+             pytest.raises(Retry):
+            embed_and_store_task("user-123", "job-123", "f.txt", [{"content": "a"}], {}, 10)
+        
+        assert mock_retry.call_args.kwargs["countdown"] == 3.0
+        mock_status.assert_not_called()
+
+
+class TestStagingCleanup:
+    """Test deferred deletion of staged uploads."""
+    
+    @patch('worker.tasks.get_redis')
+    def test_schedule_queues_path(self, mock_redis):
+        """Should push the path to Redis without calling Storage."""
+        from worker.tasks import schedule_staging_cleanup, STAGING_CLEANUP_KEY
+        
+        mock_supabase = Mock()
+        schedule_staging_cleanup(mock_supabase, "u/f.pdf")
+        
+        mock_redis.return_value.rpush.assert_called_once_with(STAGING_CLEANUP_KEY, "u/f.pdf")
+        mock_supabase.storage.from_.assert_not_called()
+    
+    @patch('worker.tasks.get_redis')
+    def test_schedule_falls_back_to_inline_delete(self, mock_redis):
+        """Should delete inline when Redis is unavailable."""
+        from worker.tasks import schedule_staging_cleanup
+        
+        mock_redis.return_value.rpush.side_effect = Exception("redis down")
+        mock_supabase = Mock()
+        schedule_staging_cleanup(mock_supabase, "u/f.pdf")
+        
+        mock_supabase.storage.from_.return_value.remove.assert_called_once_with(["u/f.pdf"])
+    
+    @patch('worker.tasks.get_redis')
+    @patch('worker.tasks.get_supabase')
+    def test_sweep_removes_in_batches_and_requeues_failures(self, mock_supabase, mock_redis):
+        """Should delete queued paths in batches and put failed ones back."""
+        from worker.tasks import sweep_staging_uploads, STAGING_CLEANUP_KEY
+        
+        client = mock_redis.return_value
+        client.pipeline.return_value.execute.side_effect = [[[b"a", b"b"], True], [[b"c"], True]]
+        remove = mock_supabase.return_value.storage.from_.return_value.remove
+        remove.side_effect = [None, Exception("503")]
+        
+        assert sweep_staging_uploads() == 2
+        
+        assert remove.call_args_list[0][0][0] == ["a", "b"]
+        client.rpush.assert_called_once_with(STAGING_CLEANUP_KEY, "c")
+        client.lpop.assert_not_called()  # LPOP with a count needs Redis >= 6.2
+
+
+class TestStoreDocumentWithChunks:
+    """Test paged document storage."""
+    
+    @patch('worker.tasks.CHUNK_INSERT_BATCH', 2)
+    def test_pages_large_chunk_lists(self):
+        """Should send the first batch via RPC and append the rest in batches."""
+        import json
+        from worker.tasks import store_document_with_chunks
+        
+        mock_supabase = Mock()
+        mock_supabase.rpc.return_value.execute.return_value = Mock(data="doc-1")
+        chunks = [{"content": f"c{i}", "embedding": [0.1], "chunk_index": i, "metadata": {}} for i in range(5)]
+        
+        doc_id = store_document_with_chunks(mock_supabase, "user-1", "big.pdf", "file", None, {}, chunks, 10)
+        
+        assert doc_id == "doc-1"
+        assert len(json.loads(mock_supabase.rpc.call_args[0][1]["p_chunks"])) == 2
+        inserts = mock_supabase.table.return_value.insert.call_args_list
+        assert [len(c[0][0]) for c in inserts] == [2, 1]
+        assert inserts[1][0][0][0] == {"document_id": "doc-1", "content": "c4", "embedding": "[.1]", "chunk_index": 4}
+    
+    @patch('worker.tasks.CHUNK_INSERT_BATCH', 1)
+    def test_rolls_back_on_append_failure(self):
+        """Should delete the document if appending chunks fails."""
+        from worker.tasks import store_document_with_chunks
+        
+        mock_supabase = Mock()
+        mock_supabase.rpc.return_value.execute.return_value = Mock(data="doc-1")
+        mock_supabase.table.return_value.insert.return_value.execute.side_effect = Exception("413")
+        chunks = [{"content": f"c{i}", "embedding": [0.1], "chunk_index": i} for i in range(2)]
+        
+        with pytest.raises(Exception):
+            store_document_with_chunks(mock_supabase, "user-1", "big.pdf", "file", None, {}, chunks, 10)
+        
+        mock_supabase.table.return_value.delete.return_value.eq.assert_called_once_with("id", "doc-1")
+    
+    def test_drops_duplicate_chunks(self):
+        """Should store repeated chunk text only once, keeping the first index."""
+        import json
+        from worker.tasks import store_document_with_chunks
+        
+        mock_supabase = Mock()
+        mock_supabase.rpc.return_value.execute.return_value = Mock(data="doc-1")
+        chunks = [
+            {"content": "Footer", "embedding": [0.1], "chunk_index": 0},
+            {"content": "Body", "embedding": [0.2], "chunk_index": 1},
+            {"content": " Footer\n", "embedding": [0.1], "chunk_index": 2},
+        ]
+        
+        store_document_with_chunks(mock_supabase, "user-1", "a.pdf", "file", None, {}, chunks, 10)
+        
+        sent = json.loads(mock_supabase.rpc.call_args[0][1]["p_chunks"])
+        assert [c["chunk_index"] for c in sent] == [0, 1]
+    
+    def test_sends_embeddings_as_pgvector_text(self):
+        """Should send embeddings in pgvector text form at float16 precision."""
+        import json
+        import struct
+        from worker.tasks import store_document_with_chunks
+        
+        mock_supabase = Mock()
+        mock_supabase.rpc.return_value.execute.return_value = Mock(data="doc-1")
+        value = struct.unpack("<e", struct.pack("<e", -0.0123456789))[0]
+        chunks = [{"content": "c", "embedding": [value, 1e-05, 0.5, 0.0, 10.25], "chunk_index": 0}]
+        
+        store_document_with_chunks(mock_supabase, "user-1", "a.pdf", "file", None, {}, chunks, 10)
+        
+        payload = mock_supabase.rpc.call_args[0][1]["p_chunks"]
+        vector = json.loads(payload)[0]["embedding"]
+        assert vector.startswith("[-.0") and vector.endswith(",1e-05,.5,0,10.25]")
+        sent = [float(x) for x in vector[1:-1].split(",")]
+        assert struct.pack("<e", sent[0]) == struct.pack("<e", value)
+        assert sent[1:] == [1e-05, 0.5, 0.0, 10.25]
+
+
+class TestStoreDocuments:
+    """Test batched multi-document storage."""
+    
+    @patch('worker.tasks.CHUNK_INSERT_BATCH', 2)
+    def test_batches_documents_per_rpc(self):
+        """Should send CHUNK_INSERT_BATCH documents per RPC and keep ID order."""
+        import json
+        from worker.tasks import store_documents
+        
+        mock_supabase = Mock()
+        mock_supabase.rpc.return_value.execute.side_effect = [Mock(data=["d0", "d1"]), Mock(data=["d2"])]
+        docs = [
+            {"title": f"p{i}", "source_url": None, "metadata": {}, "file_size_bytes": 1,
+             "chunks": [{"content": "x", "embedding": [0.5], "chunk_index": 0}]}
+            for i in range(3)
+        ]
+        
+        doc_ids = store_documents(mock_supabase, "user-1", "web", docs)
+        
+        assert doc_ids == ["d0", "d1", "d2"]
+        calls = mock_supabase.rpc.call_args_list
+        assert [c[0][0] for c in calls] == ["ingest_documents_with_chunks"] * 2
+        assert [d["title"] for d in json.loads(calls[1][0][1]["p_docs"])] == ["p2"]
+    
+    @patch('worker.tasks.CHUNK_INSERT_BATCH', 3)
+    def test_batches_by_chunk_count(self):
+        """Should pack multi-chunk documents until CHUNK_INSERT_BATCH chunks per RPC."""
+        import json
+        from worker.tasks import store_documents
+        
+        mock_supabase = Mock()
+        mock_supabase.rpc.return_value.execute.side_effect = [Mock(data=["d0", "d1"]), Mock(data=["d2"])]
+        docs = [
+            {"title": f"p{i}", "source_url": None, "metadata": {}, "file_size_bytes": 1,
+             "chunks": [{"content": f"x{i}-{n}", "embedding": [0.5], "chunk_index": n} for n in range(size)]}
+            for i, size in enumerate([1, 2, 2])
+        ]
+        
+        assert store_documents(mock_supabase, "user-1", "file", docs) == ["d0", "d1", "d2"]
+        sent = [json.loads(c[0][1]["p_docs"]) for c in mock_supabase.rpc.call_args_list]
+        assert [[d["title"] for d in batch] for batch in sent] == [["p0", "p1"], ["p2"]]
+
+
 class TestIngestConnectorTask:
     """Test the connector ingestion task (Drive/Notion)."""
     
@@ -134,6 +454,208 @@ class TestIngestConnectorTask:
         mock_factory.process.assert_called()  # Drive uses generic process
         mock_embeddings.assert_called()
     
+    @patch('worker.tasks.store_document_with_chunks')
+    @patch('worker.tasks.store_documents')
+    @patch('worker.tasks.embed_with_cache')
+    @patch('worker.tasks.DocumentProcessorFactory')
+    @patch('worker.tasks.get_connector')
+    @patch('worker.tasks.get_supabase')
+    def test_embeds_all_documents_in_one_pass(self, mock_supabase, mock_get_connector, mock_factory, mock_embed, mock_store, mock_store_one):
+        """Should embed chunks of every document together and slice vectors back per document."""
+        from worker.tasks import ingest_connector_task
+        from connectors.base import ConnectorDocument
+        
+        async def two_docs():
+            yield ConnectorDocument(page_content="one", metadata={"title": "a"})
+            yield ConnectorDocument(page_content="two", metadata={"title": "b"})
+        
+        mock_connector = Mock()
+        mock_connector.ingest = AsyncMock(return_value=two_docs())
+        mock_get_connector.return_value = mock_connector
+        
+        def parsed(*texts):
+            return Mock(file_type="txt", total_tokens=1, metadata={}, chunks=[
+                Mock(content=t, chunk_index=i, metadata={}, token_count=1) for i, t in enumerate(texts)
+            ])
+        # Documents are parsed on a thread pool, so key results by content rather than call order
+        by_content = {b"one": parsed("a1", "a2"), b"two": parsed("b1")}
+        mock_factory.process.side_effect = lambda content, **kwargs: by_content[content]
+        mock_embed.return_value = [[1.0], [2.0], [3.0]]
+        mock_store.return_value = ["doc-a", "doc-b"]
+        
+        result = ingest_connector_task(
+            user_id="user-123", job_id="job-123",
+            connector_type="drive", item_id="folder-1"
+        )
+        
+        mock_embed.assert_called_once_with(mock_supabase.return_value, ["a1", "a2", "b1"])
+        # Both small documents share one batched RPC
+        mock_store.assert_called_once()
+        stored = mock_store.call_args[0][3]
+        assert [[chunk["embedding"] for chunk in doc["chunks"]] for doc in stored] == [[[1.0], [2.0]], [[3.0]]]
+        mock_store_one.assert_not_called()
+        assert result["ingested_ids"] == ["doc-a", "doc-b"]
+    
+    @patch('worker.tasks.CONNECTOR_STORE_WINDOW_CHUNKS', 2)
+    @patch('worker.tasks.store_documents')
+    @patch('worker.tasks.embed_with_cache')
+    @patch('worker.tasks.DocumentProcessorFactory')
+    @patch('worker.tasks.get_connector')
+    @patch('worker.tasks.get_supabase')
+    def test_stores_large_streams_in_windows(self, mock_supabase, mock_get_connector, mock_factory, mock_embed, mock_store):
+        """Should embed and store each window of chunks instead of holding every document."""
+        from worker.tasks import ingest_connector_task
+        from connectors.base import ConnectorDocument
+
+        async def three_docs():
+            for text in ("one", "two", "three"):
+                yield ConnectorDocument(page_content=text, metadata={"title": text})
+
+        mock_connector = Mock()
+        mock_connector.ingest = AsyncMock(return_value=three_docs())
+        mock_get_connector.return_value = mock_connector
+        mock_factory.process.side_effect = lambda content, **kwargs: Mock(
+            file_type="txt", total_tokens=1, metadata={},
+            chunks=[Mock(content=f"{content.decode()}-{i}", chunk_index=i, metadata={}, token_count=1) for i in range(2)]
+        )
+        mock_embed.side_effect = lambda supabase, texts: [[1.0]] * len(texts)
+        mock_store.side_effect = lambda supabase, user_id, source_type, docs: [d["title"] for d in docs]
+
+        result = ingest_connector_task(
+            user_id="user-123", job_id="job-123",
+            connector_type="drive", item_id="folder-1"
+        )
+
+        # Every document fills a window on its own
+        assert [len(c[0][1]) for c in mock_embed.call_args_list] == [2, 2, 2]
+        assert result["ingested_ids"] == ["one", "two", "three"]
+
+    @patch('worker.tasks.find_existing_documents')
+    @patch('worker.tasks.store_documents')
+    @patch('worker.tasks.embed_with_cache')
+    @patch('worker.tasks.DocumentProcessorFactory')
+    @patch('worker.tasks.get_connector')
+    @patch('worker.tasks.get_supabase')
+    def test_skips_already_ingested_documents(self, mock_supabase, mock_get_connector, mock_factory, mock_embed, mock_store, mock_existing):
+        """Unchanged documents should keep their IDs without being embedded or stored again."""
+        from worker.tasks import ingest_connector_task, document_content_hash
+        from connectors.base import ConnectorDocument
+
+        async def two_docs():
+            for text in ("old", "new"):
+                yield ConnectorDocument(page_content=text, metadata={"title": text})
+
+        mock_connector = Mock()
+        mock_connector.ingest = AsyncMock(return_value=two_docs())
+        mock_get_connector.return_value = mock_connector
+        mock_factory.process.side_effect = lambda content, **kwargs: Mock(
+            file_type="txt", total_tokens=1, metadata={},
+            chunks=[Mock(content=content.decode(), chunk_index=0, metadata={}, token_count=1)]
+        )
+        old_hash = document_content_hash("old")
+        mock_existing.side_effect = lambda supabase, user_id, keys: {k: "doc-old" for k in keys if k == ("old", old_hash)}
+        mock_embed.side_effect = lambda supabase, texts: [[1.0]] * len(texts)
+        mock_store.side_effect = lambda supabase, user_id, source_type, docs: [d["title"] for d in docs]
+
+        result = ingest_connector_task(
+            user_id="user-123", job_id="job-123",
+            connector_type="drive", item_id="folder-1"
+        )
+
+        mock_embed.assert_called_once_with(mock_supabase.return_value, ["new"])
+        stored = mock_store.call_args[0][3]
+        assert [d["metadata"]["content_hash"] for d in stored] == [document_content_hash("new")]
+        assert result["ingested_ids"] == ["doc-old", "new"]
+
+    @patch('worker.tasks.create_notification')
+    @patch('worker.tasks.update_job_status')
+    @patch('worker.tasks.get_connector')
+    @patch('worker.tasks.get_supabase')
+    def test_only_final_attempt_marks_job_failed(self, mock_supabase, mock_get_connector, mock_status, mock_notify):
+        """A transient error that autoretry will retry should not fail the job or notify."""
+        from worker.tasks import ingest_connector_task
+
+        mock_get_connector.return_value.ingest = AsyncMock(side_effect=ConnectionError("reset"))
+
+        with pytest.raises(ConnectionError):
+            ingest_connector_task(user_id="user-123", job_id="job-123", connector_type="drive", item_id="folder-1")
+        assert not [c for c in mock_status.call_args_list if c.args[2] == "failed"]
+        assert not [c for c in mock_notify.call_args_list if c.args[4] == "error"]
+
+        ingest_connector_task.push_request(retries=ingest_connector_task.max_retries)
+        try:
+            with pytest.raises(ConnectionError):
+                ingest_connector_task(user_id="user-123", job_id="job-123", connector_type="drive", item_id="folder-1")
+        finally:
+            ingest_connector_task.pop_request()
+        assert [c for c in mock_status.call_args_list if c.args[2] == "failed"]
+        assert [c for c in mock_notify.call_args_list if c.args[4] == "error"]
+
+    @patch('worker.tasks.store_documents')
+    @patch('worker.tasks.embed_with_cache')
+    @patch('worker.tasks.DocumentProcessorFactory')
+    @patch('worker.tasks.get_connector')
+    @patch('worker.tasks.get_supabase')
+    def test_same_content_at_another_source_url_is_ingested(self, mock_supabase, mock_get_connector, mock_factory, mock_embed, mock_store):
+        """Dedup is per source: identical content at a new source_url gets its own document."""
+        from worker.tasks import ingest_connector_task, document_content_hash
+        from connectors.base import ConnectorDocument
+
+        async def two_copies():
+            for url in ("https://a.example/doc", "https://b.example/doc"):
+                yield ConnectorDocument(page_content="same", metadata={"title": "Doc", "source_url": url})
+
+        mock_connector = Mock()
+        mock_connector.ingest = AsyncMock(return_value=two_copies())
+        mock_get_connector.return_value = mock_connector
+        mock_factory.process.side_effect = lambda content, **kwargs: Mock(
+            file_type="txt", total_tokens=1, metadata={},
+            chunks=[Mock(content=content.decode(), chunk_index=0, metadata={}, token_count=1)]
+        )
+        # Only the copy at a.example is already stored
+        mock_supabase.return_value.table.return_value.select.return_value.eq.return_value.in_.return_value.execute.return_value = Mock(
+            data=[{"id": "doc-a", "content_hash": document_content_hash("same"), "source_url": "https://a.example/doc", "title": "Doc"}]
+        )
+        mock_embed.side_effect = lambda supabase, texts: [[1.0]] * len(texts)
+        mock_store.side_effect = lambda supabase, user_id, source_type, docs: [d["source_url"] for d in docs]
+
+        result = ingest_connector_task(
+            user_id="user-123", job_id="job-123",
+            connector_type="drive", item_id="folder-1"
+        )
+
+        stored = mock_store.call_args[0][3]
+        assert [d["source_url"] for d in stored] == ["https://b.example/doc"]
+        assert result["ingested_ids"] == ["doc-a", "https://b.example/doc"]
+
+    @patch('worker.tasks.store_document_with_chunks')
+    @patch('worker.tasks.embed_with_cache')
+    @patch('worker.tasks.DocumentProcessorFactory')
+    @patch('worker.tasks.get_connector')
+    @patch('worker.tasks.get_supabase')
+    def test_routes_drive_files_by_extension(self, mock_supabase, mock_get_connector, mock_factory, mock_embed, mock_store):
+        """Should keep known extensions and derive missing ones from the mime type."""
+        from worker.tasks import ingest_connector_task
+        from connectors.base import ConnectorDocument
+        
+        async def docs():
+            yield ConnectorDocument(page_content="x", metadata={"title": "Report.PDF", "mime_type": "application/pdf"})
+            yield ConnectorDocument(page_content="y", metadata={"title": "Notes", "mime_type": "text/markdown"})
+            yield ConnectorDocument(page_content="z", metadata={"title": "Spec", "mime_type": "application/vnd.google-apps.document"})
+        
+        mock_connector = Mock()
+        mock_connector.ingest = AsyncMock(return_value=docs())
+        mock_get_connector.return_value = mock_connector
+        mock_factory.process.return_value = Mock(chunks=[])
+        
+        ingest_connector_task(
+            user_id="user-123", job_id="job-123",
+            connector_type="drive", item_id="folder-1"
+        )
+        
+        filenames = [c.kwargs["filename"] for c in mock_factory.process.call_args_list]
+        assert sorted(filenames) == ["Notes.md", "Report.PDF", "Spec.docx"]
+    
     # helper _async_return removed as it is replaced by async_gen closure
 
     def test_drive_ingestion(self):
@@ -155,6 +677,33 @@ class TestIngestConnectorTask:
         """Should decrypt OAuth credentials before use."""
         from worker.tasks import decrypt_token
         assert callable(decrypt_token)
+    
+    @patch('worker.tasks.decrypt_token', side_effect=lambda v: f"plain-{v}")
+    @patch('worker.tasks.get_connector')
+    @patch('worker.tasks.get_supabase')
+    def test_only_decrypts_token_keys(self, mock_supabase, mock_get_connector, mock_decrypt):
+        """Should decrypt token fields and pass other credential fields through."""
+        from worker.tasks import ingest_connector_task
+        
+        async def empty_gen():
+            return
+            yield
+        
+        mock_connector = Mock()
+        mock_connector.ingest = AsyncMock(return_value=empty_gen())
+        mock_get_connector.return_value = mock_connector
+        
+        ingest_connector_task(
+            user_id="user-123",
+            job_id="job-123",
+            connector_type="notion",
+            item_id="page-1",
+            credentials={"access_token": "enc", "workspace_id": "ws-1"}
+        )
+        
+        passed_creds = mock_connector.ingest.call_args[0][0]["credentials"]
+        assert passed_creds == {"access_token": "plain-enc", "workspace_id": "ws-1"}
+        mock_decrypt.assert_called_once_with("enc")
 
 
 class TestStorageOperations:
@@ -271,11 +820,8 @@ class TestEmailNotification:
         from worker.tasks import send_email_notification
         
         mock_supabase_instance = Mock()
-        mock_supabase_instance.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value = Mock(
-            data={"email": "test@example.com", "display_name": "Test User"}
-        )
-        mock_supabase_instance.table.return_value.select.return_value.eq.return_value.eq.return_value.maybeSingle.return_value.execute.return_value = Mock(
-            data={"enabled": True}
+        mock_supabase_instance.table.return_value.select.return_value.eq.return_value.maybe_single.return_value.execute.return_value = Mock(
+            data={"email": "test@example.com", "display_name": "Test User", "email_enabled": True}
         )
         
         send_email_notification(mock_supabase_instance, "user-id", 5)
@@ -290,14 +836,116 @@ class TestEmailNotification:
         from worker.tasks import send_email_notification
         
         mock_supabase_instance = Mock()
-        mock_supabase_instance.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value = Mock(
-            data={"email": "test@example.com"}
-        )
-        mock_supabase_instance.table.return_value.select.return_value.eq.return_value.eq.return_value.maybeSingle.return_value.execute.return_value = Mock(
-            data={"enabled": False}
+        mock_supabase_instance.table.return_value.select.return_value.eq.return_value.maybe_single.return_value.execute.return_value = Mock(
+            data={"email": "test@example.com", "email_enabled": False}
         )
         
         send_email_notification(mock_supabase_instance, "user-id", 5)
         
         # Email service should NOT be called
         mock_email.send_ingestion_complete.assert_not_called()
+
+
+class TestEmbeddingCache:
+    """Test the content-hash embedding cache."""
+    
+    @pytest.fixture(autouse=True)
+    def redis_tier(self):
+        """Empty Redis tier unless a test fills it."""
+        with patch('worker.tasks.get_redis') as mock_redis:
+            mock_redis.return_value.mget.side_effect = lambda keys: [None] * len(keys)
+            yield mock_redis.return_value
+    
+    @patch('worker.tasks.generate_embeddings_batch')
+    def test_serves_redis_hits_without_table_lookup(self, mock_embeddings, redis_tier):
+        """Should return Redis hits directly and warm Redis with table hits."""
+        from worker.tasks import embed_with_cache, _content_hash, _pack_vector, EMBEDDING_REDIS_PREFIX
+        
+        hot = _content_hash("hot")
+        redis_tier.mget.side_effect = lambda keys: [
+            _pack_vector([0.5, 0.25]) if key == EMBEDDING_REDIS_PREFIX + hot else None for key in keys
+        ]
+        mock_supabase = Mock()
+        mock_supabase.table.return_value.select.return_value.in_.return_value.execute.return_value = Mock(
+            data=[{"hash": _content_hash("warm"), "embedding": "[1.0]"}]
+        )
+        
+        result = embed_with_cache(mock_supabase, ["hot", "warm"])
+        
+        assert result == [[0.5, 0.25], [1.0]]
+        mock_embeddings.assert_not_called()
+        mock_supabase.table.return_value.select.return_value.in_.assert_called_once_with("hash", [_content_hash("warm")])
+        writes = redis_tier.pipeline.return_value.set.call_args_list
+        assert [c[0][0] for c in writes] == [EMBEDDING_REDIS_PREFIX + _content_hash("warm")]
+    
+    def test_redis_vectors_are_packed_as_half_precision(self):
+        """Redis entries should take 2 bytes per dimension and round-trip closely."""
+        from worker.tasks import _pack_vector, _unpack_vector
+        
+        vector = [0.0123456, -0.5, 0.333333]
+        blob = _pack_vector(vector)
+        
+        assert len(blob) == 2 * len(vector)
+        assert _unpack_vector(blob) == pytest.approx(vector, abs=1e-3)
+    
+    @patch('worker.tasks.generate_embeddings_batch')
+    def test_only_embeds_cache_misses(self, mock_embeddings):
+        """Should only send uncached chunk texts to OpenAI."""
+        from worker.tasks import embed_with_cache, _content_hash
+        
+        mock_supabase = Mock()
+        mock_supabase.table.return_value.select.return_value.in_.return_value.execute.return_value = Mock(
+            data=[{"hash": _content_hash("cached text"), "embedding": "[0.5,0.5]"}]
+        )
+        mock_embeddings.return_value = [[0.1, 0.2]]
+        
+        result = embed_with_cache(mock_supabase, ["cached text", "new text"])
+        
+        mock_embeddings.assert_called_once_with(["new text"])
+        assert result == [[0.5, 0.5], [0.1, 0.2]]
+        mock_supabase.table.return_value.upsert.assert_called_once()
+    
+    @patch('worker.tasks.generate_embeddings_batch')
+    def test_embeds_repeated_texts_once(self, mock_embeddings):
+        """Should send each distinct uncached text once and reuse its vector."""
+        from worker.tasks import embed_with_cache
+
+        mock_supabase = Mock()
+        mock_supabase.table.return_value.select.return_value.in_.return_value.execute.return_value = Mock(data=[])
+        mock_embeddings.return_value = [[0.1], [0.2]]
+
+        result = embed_with_cache(mock_supabase, ["footer", "body", "footer"])
+
+        mock_embeddings.assert_called_once_with(["footer", "body"])
+        assert result == [[0.1], [0.2], [0.1]]
+
+    @patch('worker.tasks.generate_embeddings_batch')
+    def test_falls_back_when_lookup_fails(self, mock_embeddings):
+        """Should embed everything when the cache lookup errors (fail-open)."""
+        from worker.tasks import embed_with_cache
+        
+        mock_supabase = Mock()
+        mock_supabase.table.return_value.select.side_effect = Exception("DB error")
+        mock_embeddings.return_value = [[0.1], [0.2]]
+        
+        result = embed_with_cache(mock_supabase, ["a", "b"])
+        
+        mock_embeddings.assert_called_once_with(["a", "b"])
+        assert result == [[0.1], [0.2]]
+    
+    @patch('worker.tasks.generate_embeddings_batch')
+    def test_skips_empty_texts(self, mock_embeddings):
+        """Should keep whitespace-only chunks out of the lookup and the OpenAI batch."""
+        from worker.tasks import embed_with_cache, _content_hash
+        
+        mock_supabase = Mock()
+        mock_supabase.table.return_value.select.return_value.in_.return_value.execute.return_value = Mock(data=[])
+        mock_embeddings.return_value = [[0.1]]
+        
+        result = embed_with_cache(mock_supabase, ["", "text", "  \n"])
+        
+        mock_supabase.table.return_value.select.return_value.in_.assert_called_once_with(
+            "hash", [_content_hash("text")]
+        )
+        mock_embeddings.assert_called_once_with(["text"])
+        assert result == [None, [0.1], None]
@@ -384,7 +384,7 @@ class TestCreateNotificationHelper:
         insert_data = mock_table.insert.call_args[0][0]
         # The implementation stores metadata as JSON in 'extra_data'
         import json
-        assert insert_data["extra_data"] == json.dumps(metadata)
+        assert json.loads(insert_data["extra_data"]) == metadata
     
     @pytest.mark.unit
     def test_handles_none_metadata(self):
@@ -410,6 +410,25 @@ class TestCreateNotificationHelper:
         # The implementation sets extra_data to None when metadata is None
         assert insert_data["extra_data"] is None
     
+    @pytest.mark.unit
+    def test_deferred_notifications_are_inserted_in_bulk(self):
+        """Deferred notifications should be buffered and written with one insert."""
+        from worker.tasks import create_notification, NotificationBatcher
+        
+        mock_supabase = MagicMock()
+        batcher = NotificationBatcher(interval=60)
+        with patch('worker.tasks._notification_batcher', batcher), \
+             patch('worker.tasks.get_supabase') as mock_get_supabase:
+            for title in ("One", "Two"):
+                create_notification(mock_supabase, "user-123", title, None, "info", deferred=True)
+            mock_supabase.table.assert_not_called()
+            
+            batcher.close()
+        
+        insert = mock_get_supabase.return_value.table.return_value.insert
+        insert.assert_called_once()
+        assert [row["title"] for row in insert.call_args[0][0]] == ["One", "Two"]
+    
     @pytest.mark.unit
     def test_handles_database_errors_gracefully(self):
         """Should not raise exception on database error."""
@@ -21,6 +21,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspa
 from core.resilience import (
     with_retry_sync,
     is_retryable_error,
+    throttle_retry_delay,
     CircuitBreaker,
     CircuitBreakerOpen,
     TRANSIENT_EXCEPTIONS,
@@ -46,6 +47,39 @@ class TestRetryableErrors:
         assert is_retryable_error(error) is False
 
 
+class TestThrottleRetryDelay:
+    """Test the throttle_retry_delay function."""
+    
+    def _error(self, status_code, headers=None):
+        error = Exception("upstream")
+        error.response = Mock(status_code=status_code, headers=headers or {})
+        return error
+    
+    def test_honours_retry_after_header(self):
+        """A 429 with Retry-After should wait exactly that long (capped)."""
+        assert throttle_retry_delay(self._error(429, {"retry-after": "3"}), attempt=0) == 3.0
+        assert throttle_retry_delay(self._error(429, {"retry-after": "9999"}), attempt=0) == 300
+    
+    def test_backs_off_without_header(self):
+        """Without Retry-After the delay should be jittered exponential backoff."""
+        delay = throttle_retry_delay(self._error(503), attempt=3)
+        assert 0 <= delay <= 16
+    
+    def test_supabase_api_errors_are_matched_by_code(self):
+        """postgrest APIError has no response; gateway statuses and overload codes still count."""
+        from postgrest.exceptions import APIError
+
+        assert 0 <= throttle_retry_delay(APIError({"code": 503, "message": "JSON could not be generated"}), attempt=2) <= 8
+        assert throttle_retry_delay(APIError({"code": "PGRST003", "message": "Timed out acquiring connection"}), attempt=0) is not None
+        assert throttle_retry_delay(APIError({"code": "23505", "message": "duplicate key"}), attempt=0) is None
+        assert throttle_retry_delay(APIError({"code": 400, "message": "bad"}), attempt=0) is None
+    
+    def test_other_errors_are_not_throttling(self):
+        """Non-throttling statuses and plain errors should return None."""
+        assert throttle_retry_delay(self._error(400), attempt=0) is None
+        assert throttle_retry_delay(ValueError("bad"), attempt=0) is None
+
+
 class TestSyncRetryDecorator:
     """Test the synchronous retry decorator."""
     
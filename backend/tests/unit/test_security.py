@@ -87,6 +87,22 @@ class TestTokenEncryption:
         # assert decrypted == legacy_token  # Returns as-is if not encrypted
         pass
     
+    @pytest.mark.unit
+    def test_decrypt_skips_cipher_for_non_fernet_tokens(self, encryption_key):
+        """Legacy tokens should be returned without attempting decryption."""
+        from cryptography.fernet import Fernet
+        import core.security as security
+        
+        cipher = Mock(wraps=Fernet(encryption_key.encode()))
+        with patch.object(security, 'cipher_suite', cipher), \
+             patch.object(security, 'HAS_ENCRYPTION', True):
+            assert security.decrypt_token("ya29.legacy-oauth-token") == "ya29.legacy-oauth-token"
+            cipher.decrypt.assert_not_called()
+            
+            encrypted = cipher.encrypt(b"secret").decode()
+            assert encrypted.startswith(security.FERNET_TOKEN_PREFIX)
+            assert security.decrypt_token(encrypted) == "secret"
+    
     @pytest.mark.unit
     def test_encrypt_handles_special_characters(self, encryption_key):
         """Tokens with special characters should work."""
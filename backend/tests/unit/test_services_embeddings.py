@@ -56,3 +56,115 @@ class TestEmbeddingsService:
 
             # Verify specifically what was sent to the model (optimization check)
             mock_model.embed_documents.assert_called_once_with(["hello", "world"])
+
+    @pytest.mark.unit
+    def test_embeddings_model_is_built_once_across_threads(self):
+        """Concurrent first calls should share a single client."""
+        from concurrent.futures import ThreadPoolExecutor
+        import services.embeddings as embeddings
+
+        with patch.object(embeddings, '_embeddings_model', None), \
+             patch('services.embeddings.OpenAIEmbeddings') as mock_cls:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                models = list(pool.map(lambda _: embeddings.get_embeddings_model(), range(8)))
+
+            mock_cls.assert_called_once()
+            assert all(m is models[0] for m in models)
+
+    @pytest.mark.unit
+    def test_embeddings_model_uses_pooled_http_client(self):
+        """The model should be built on one explicitly pooled httpx client."""
+        import httpx
+        import services.embeddings as embeddings
+
+        with patch.object(embeddings, '_embeddings_model', None), \
+             patch('services.embeddings.OpenAIEmbeddings') as mock_cls:
+            embeddings.get_embeddings_model()
+
+        http_client = mock_cls.call_args.kwargs["http_client"]
+        assert isinstance(http_client, httpx.Client)
+        http_client.close()
+
+    @pytest.mark.unit
+    def test_generate_embeddings_batch_preserves_order_across_sub_batches(self):
+        """Concurrent sub-batches should be reassembled in input order."""
+        texts = [f"text-{i}" for i in range(45)]
+
+        with patch('services.embeddings.EMBEDDING_BATCH_SIZE', 20), \
+             patch('services.embeddings.get_embeddings_model') as mock_get_model:
+            mock_model = Mock()
+            mock_model.embed_documents.side_effect = lambda batch: [[float(t.split("-")[1])] for t in batch]
+            mock_get_model.return_value = mock_model
+
+            results = generate_embeddings_batch(texts)
+
+            assert mock_model.embed_documents.call_count == 3
+            assert results == [[float(i)] for i in range(45)]
+
+    @pytest.mark.unit
+    def test_sub_batches_are_capped_by_tokens(self):
+        """Long texts should be split into smaller requests than short ones."""
+        from services.embeddings import _iter_embedding_batches
+
+        # Without tiktoken the cap falls back to UTF-8 bytes, so multi-byte
+        # text fills a sub-batch faster than its character count suggests
+        with patch('services.embeddings.EMBEDDING_BATCH_MAX_TOKENS', 10), \
+             patch('services.embeddings.TIKTOKEN_ENCODER', None):
+            batches = list(_iter_embedding_batches(["aaaa", "bbbb", "cccc", "x" * 20, "é" * 5, "d"]))
+
+        assert batches == [["aaaa", "bbbb"], ["cccc"], ["x" * 20], ["é" * 5], ["d"]]
+
+    @pytest.mark.unit
+    def test_sub_batches_count_tiktoken_tokens(self):
+        """With tiktoken, the cap should use the encoder's token counts."""
+        from services.embeddings import _iter_embedding_batches
+
+        encoder = Mock()
+        encoder.encode_ordinary_batch.side_effect = lambda texts: [[0] * len(t.split()) for t in texts]
+        with patch('services.embeddings.EMBEDDING_BATCH_MAX_TOKENS', 4), \
+             patch('services.embeddings.TIKTOKEN_ENCODER', encoder):
+            batches = list(_iter_embedding_batches(["a b", "c d", "e"]))
+
+        assert batches == [["a b", "c d"], ["e"]]
+
+    @pytest.mark.unit
+    def test_rate_limiter_waits_for_token_budget(self):
+        """Should pass within budget and sleep until the bucket refills past it."""
+        from services.embeddings import TokenBucketLimiter
+
+        clock = [100.0]
+        with patch('services.embeddings.time') as mock_time:
+            mock_time.monotonic.side_effect = lambda: clock[0]
+            mock_time.sleep.side_effect = lambda s: clock.__setitem__(0, clock[0] + s)
+
+            limiter = TokenBucketLimiter(rpm=60, tpm=600)
+            assert limiter.acquire(600) == 0
+            # 300 tokens refill in 30s at 600 tokens/minute
+            assert limiter.acquire(300) == pytest.approx(30.0)
+            # Requests larger than the bucket wait for a full bucket instead of forever
+            assert limiter.acquire(10_000) == pytest.approx(60.0)
+
+    @pytest.mark.unit
+    def test_sub_batches_wait_for_rate_limit_budget(self):
+        """Every embeddings request should be counted against the limiter."""
+        with patch('services.embeddings.get_embeddings_model') as mock_get_model, \
+             patch('services.embeddings._rate_limiter') as mock_limiter:
+            mock_limiter.acquire.return_value = 0
+            mock_get_model.return_value.embed_documents.return_value = [[1.0]]
+
+            generate_embeddings_batch(["hello world"])
+
+            mock_limiter.acquire.assert_called_once()
+            assert mock_limiter.acquire.call_args[0][0] > 0
+
+    @pytest.mark.unit
+    def test_worker_warm_up_builds_client_and_fails_open(self):
+        """Pool children should build the embeddings client at start without crashing on errors."""
+        from core.celery_app import warm_worker_process
+
+        with patch('services.embeddings.get_embeddings_model') as mock_get_model:
+            warm_worker_process()
+            mock_get_model.assert_called_once()
+
+            mock_get_model.side_effect = Exception("no network")
+            warm_worker_process()
@@ -23,17 +23,18 @@ class TestSendEmailNotification:
         mock = Mock()
         return mock
     
+    @staticmethod
+    def _set_context(mock_supabase, data):
+        """Stub the single user_notification_context lookup."""
+        mock_supabase.table.return_value.select.return_value.eq.return_value.maybe_single.return_value.execute.return_value = Mock(
+            data=data
+        )
+    
     def test_sends_email_when_preference_enabled(self, mock_supabase):
         """Should send email when user has enabled email notifications."""
-        # Setup mock responses
-        mock_supabase.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value = Mock(
-            data={"email": "user@example.com", "display_name": "John Doe"}
-        )
-        
-        # Settings query
-        settings_mock = Mock()
-        settings_mock.data = {"enabled": True}
-        mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.maybeSingle.return_value.execute.return_value = settings_mock
+        self._set_context(mock_supabase, {
+            "email": "user@example.com", "display_name": "John Doe", "email_enabled": True
+        })
         
         with patch('worker.tasks.email_service') as mock_email:
             mock_email.send_ingestion_complete.return_value = True
@@ -43,17 +44,23 @@ class TestSendEmailNotification:
             
             mock_email.send_ingestion_complete.assert_called_once()
     
+    def test_reads_profile_and_setting_in_one_query(self, mock_supabase):
+        """Should fetch profile and preference from the joined view only."""
+        self._set_context(mock_supabase, {
+            "email": "user@example.com", "display_name": "John Doe", "email_enabled": True
+        })
+        
+        with patch('worker.tasks.email_service'):
+            from worker.tasks import send_email_notification
+            send_email_notification(mock_supabase, "user-123", 5)
+        
+        mock_supabase.table.assert_called_once_with("user_notification_context")
+    
     def test_skips_email_when_preference_disabled(self, mock_supabase):
         """Should not send email when user has disabled email notifications."""
-        # Setup mock responses
-        mock_supabase.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value = Mock(
-            data={"email": "user@example.com", "display_name": "John Doe"}
-        )
-        
-        # Settings query - disabled
-        settings_mock = Mock()
-        settings_mock.data = {"enabled": False}
-        mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.maybeSingle.return_value.execute.return_value = settings_mock
+        self._set_context(mock_supabase, {
+            "email": "user@example.com", "display_name": "John Doe", "email_enabled": False
+        })
         
         with patch('worker.tasks.email_service') as mock_email:
             from worker.tasks import send_email_notification
@@ -63,24 +70,8 @@ class TestSendEmailNotification:
     
     def test_defaults_to_enabled_when_no_setting_exists(self, mock_supabase):
         """Should default to sending email when no explicit setting exists."""
-        # Profile query
-        profile_mock = Mock()
-        profile_mock.data = {"email": "user@example.com", "display_name": "John"}
-        
-        # Settings query - no data (setting doesn't exist)
-        settings_mock = Mock()
-        settings_mock.data = None
-        
-        # Configure mock chain
-        def table_side_effect(table_name):
-            table_mock = Mock()
-            if table_name == "profiles":
-                table_mock.select.return_value.eq.return_value.single.return_value.execute.return_value = profile_mock
-            elif table_name == "user_notification_settings":
-                table_mock.select.return_value.eq.return_value.eq.return_value.maybeSingle.return_value.execute.return_value = settings_mock
-            return table_mock
-        
-        mock_supabase.table.side_effect = table_side_effect
+        # Row without email_enabled (view COALESCEs, but be defensive)
+        self._set_context(mock_supabase, {"email": "user@example.com", "display_name": "John"})
         
         with patch('worker.tasks.email_service') as mock_email:
             mock_email.send_ingestion_complete.return_value = True
@@ -93,10 +84,7 @@ class TestSendEmailNotification:
     
     def test_handles_missing_user_profile(self, mock_supabase):
         """Should handle missing user profile gracefully."""
-        # Profile query returns no data
-        profile_mock = Mock()
-        profile_mock.data = None
-        mock_supabase.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value = profile_mock
+        self._set_context(mock_supabase, None)
         
         with patch('worker.tasks.email_service') as mock_email:
             from worker.tasks import send_email_notification
@@ -107,10 +95,7 @@ class TestSendEmailNotification:
     
     def test_handles_missing_email_in_profile(self, mock_supabase):
         """Should handle profile without email gracefully."""
-        # Profile has no email
-        profile_mock = Mock()
-        profile_mock.data = {"display_name": "John", "email": None}
-        mock_supabase.table.return_value.select.return_value.eq.return_value.single.return_value.execute.return_value = profile_mock
+        self._set_context(mock_supabase, {"display_name": "John", "email": None, "email_enabled": True})
         
         with patch('worker.tasks.email_service') as mock_email:
             from worker.tasks import send_email_notification
@@ -120,22 +105,9 @@ class TestSendEmailNotification:
     
     def test_uses_fallback_name_when_display_name_missing(self, mock_supabase):
         """Should use 'there' as fallback when no name is available."""
-        # Profile with no names
-        profile_mock = Mock()
-        profile_mock.data = {"email": "user@example.com", "display_name": None, "full_name": None}
-        
-        settings_mock = Mock()
-        settings_mock.data = {"enabled": True}
-        
-        def table_side_effect(table_name):
-            table_mock = Mock()
-            if table_name == "profiles":
-                table_mock.select.return_value.eq.return_value.single.return_value.execute.return_value = profile_mock
-            elif table_name == "user_notification_settings":
-                table_mock.select.return_value.eq.return_value.eq.return_value.maybeSingle.return_value.execute.return_value = settings_mock
-            return table_mock
-        
-        mock_supabase.table.side_effect = table_side_effect
+        self._set_context(mock_supabase, {
+            "email": "user@example.com", "display_name": None, "full_name": None, "email_enabled": True
+        })
         
         with patch('worker.tasks.email_service') as mock_email:
             mock_email.send_ingestion_complete.return_value = True
@@ -149,21 +121,9 @@ class TestSendEmailNotification:
     
     def test_prefers_display_name_over_full_name(self, mock_supabase):
         """Should prefer display_name when both are available."""
-        profile_mock = Mock()
-        profile_mock.data = {"email": "user@example.com", "display_name": "Johnny", "full_name": "John Smith"}
-        
-        settings_mock = Mock()
-        settings_mock.data = {"enabled": True}
-        
-        def table_side_effect(table_name):
-            table_mock = Mock()
-            if table_name == "profiles":
-                table_mock.select.return_value.eq.return_value.single.return_value.execute.return_value = profile_mock
-            elif table_name == "user_notification_settings":
-                table_mock.select.return_value.eq.return_value.eq.return_value.maybeSingle.return_value.execute.return_value = settings_mock
-            return table_mock
-        
-        mock_supabase.table.side_effect = table_side_effect
+        self._set_context(mock_supabase, {
+            "email": "user@example.com", "display_name": "Johnny", "full_name": "John Smith", "email_enabled": True
+        })
         
         with patch('worker.tasks.email_service') as mock_email:
             mock_email.send_ingestion_complete.return_value = True
@@ -184,21 +144,9 @@ class TestSendEmailNotification:
     
     def test_does_not_raise_on_email_service_error(self, mock_supabase):
         """Should not raise exception when email service fails."""
-        profile_mock = Mock()
-        profile_mock.data = {"email": "user@example.com", "display_name": "John"}
-        
-        settings_mock = Mock()
-        settings_mock.data = {"enabled": True}
-        
-        def table_side_effect(table_name):
-            table_mock = Mock()
-            if table_name == "profiles":
-                table_mock.select.return_value.eq.return_value.single.return_value.execute.return_value = profile_mock
-            elif table_name == "user_notification_settings":
-                table_mock.select.return_value.eq.return_value.eq.return_value.maybeSingle.return_value.execute.return_value = settings_mock
-            return table_mock
-        
-        mock_supabase.table.side_effect = table_side_effect
+        self._set_context(mock_supabase, {
+            "email": "user@example.com", "display_name": "John", "email_enabled": True
+        })
         
         with patch('worker.tasks.email_service') as mock_email:
             mock_email.send_ingestion_complete.side_effect = Exception("SMTP Error")
@@ -278,3 +226,77 @@ class TestSettingKeyConsistency:
         )
         
         assert email_setting["enabled"] == True
+
+
+class TestQueuedEmail:
+    """Tests for fire-and-forget email tasks."""
+
+    def test_queue_email_publishes_task(self):
+        """Should hand the email to a Celery task instead of sending inline."""
+        from worker.tasks import queue_email
+
+        task = Mock()
+        queue_email(task, "user-123", 5)
+
+        task.delay.assert_called_once_with("user-123", 5)
+
+    def test_queue_email_is_fail_safe(self):
+        """A broker error should be logged, never raised into the ingest task."""
+        from worker.tasks import queue_email
+
+        task = Mock()
+        task.delay.side_effect = Exception("broker down")
+
+        queue_email(task, "user-123", 5)  # Should not raise
+
+    def test_send_email_task_sends_notification(self):
+        """The queued task should run the fail-safe email helper."""
+        from worker.tasks import send_email_task
+
+        with patch('worker.tasks.get_supabase') as mock_get_supabase, \
+             patch('worker.tasks.send_email_notification') as mock_send_email:
+            send_email_task("user-123", 5)
+
+        mock_send_email.assert_called_once_with(mock_get_supabase.return_value, "user-123", 5)
+
+
+class TestCoalescedCompletionEmail:
+    """Tests for per-user coalescing of completion emails."""
+
+    def test_queue_completion_email_adds_to_pending_count(self):
+        """Should count the files in Redis instead of sending an email."""
+        from worker.tasks import queue_completion_email, PENDING_EMAIL_COUNT_PREFIX, PENDING_EMAIL_USERS_KEY
+
+        with patch('worker.tasks.get_redis') as mock_redis, \
+             patch('worker.tasks.queue_email') as mock_queue_email:
+            queue_completion_email("user-123", 3)
+
+        pipe = mock_redis.return_value.pipeline.return_value
+        pipe.incrby.assert_called_once_with(PENDING_EMAIL_COUNT_PREFIX + "user-123", 3)
+        pipe.sadd.assert_called_once_with(PENDING_EMAIL_USERS_KEY, "user-123")
+        mock_queue_email.assert_not_called()
+
+    def test_queue_completion_email_falls_back_without_redis(self):
+        """A Redis error should queue the email directly rather than drop it."""
+        from worker.tasks import queue_completion_email, send_email_task
+
+        with patch('worker.tasks.get_redis', side_effect=Exception("redis down")), \
+             patch('worker.tasks.queue_email') as mock_queue_email:
+            queue_completion_email("user-123", 3)
+
+        mock_queue_email.assert_called_once_with(send_email_task, "user-123", 3)
+
+    def test_flush_sends_one_email_per_user(self):
+        """Should send each pending user a single email with their summed count."""
+        from worker.tasks import flush_completion_emails, send_email_task
+
+        with patch('worker.tasks.get_redis') as mock_redis, \
+             patch('worker.tasks.queue_email') as mock_queue_email:
+            mock_redis.return_value.spop.side_effect = [[b"user-1", b"user-2"], []]
+            # (get, delete) per user; user-2's count already flushed
+            mock_redis.return_value.pipeline.return_value.execute.return_value = [b"7", 1, None, 0]
+
+            sent = flush_completion_emails()
+
+        assert sent == 1
+        mock_queue_email.assert_called_once_with(send_email_task, "user-1", 7)
@@ -113,6 +113,55 @@ class TestUpdateJobStatus:
         mock_table.eq.assert_called_with("id", "job-456")
 
 
+class TestRunConcurrently:
+    """Tests for parallel metadata writes."""
+    
+    @pytest.mark.unit
+    def test_runs_every_call_before_returning(self):
+        """Should wait for all independent writes to finish."""
+        import threading
+        from worker.tasks import run_concurrently
+        
+        barrier = threading.Barrier(2, timeout=5)
+        done = []
+        
+        def write(name):
+            barrier.wait()  # Deadlocks unless both run at the same time
+            done.append(name)
+        
+        run_concurrently(lambda: write("status"), lambda: write("notification"))
+        
+        assert sorted(done) == ["notification", "status"]
+
+
+class TestStatusPublisher:
+    """Tests for coalesced background progress writes."""
+
+    @pytest.mark.unit
+    def test_coalesces_updates_into_final_flush(self):
+        """Should write only the latest fields once the publisher closes."""
+        from worker.tasks import StatusPublisher
+
+        write = Mock()
+        with StatusPublisher(write, interval=60) as progress:
+            for n in range(1, 101):
+                progress.update(processed_files=n)
+
+        write.assert_called_once_with(processed_files=100)
+
+    @pytest.mark.unit
+    def test_write_errors_are_swallowed(self):
+        """Should log and drop fields when the write fails."""
+        from worker.tasks import StatusPublisher
+
+        write = Mock(side_effect=Exception("DB error"))
+        progress = StatusPublisher(write, interval=60)
+        progress.update(pages_ingested=3)
+        progress.close()
+
+        write.assert_called_once_with(pages_ingested=3)
+
+
 class TestIngestFileTaskProgress:
     """Tests for progress tracking in ingest_file_task."""
     
@@ -5,18 +5,38 @@ Background tasks for heavy file processing (ingestion, parsing, embedding).
 These run in a separate worker process to avoid blocking the FastAPI server.
 """
 
+import asyncio
 import logging
-import json
-from datetime import datetime, timezone
-from typing import Dict, Any, List, Optional
+import hashlib
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+import orjson
+import redis
+from celery import chain, chord, group
+from celery.utils.time import get_exponential_backoff_interval
 
 from core.celery_app import celery_app
 from core.db import get_supabase
 from core.config import settings
+from core.resilience import throttle_retry_delay
 from core.security import decrypt_token
 from services.parsers import DocumentParser, DocumentProcessorFactory
 from services.email import email_service
 from connectors.factory import get_connector
+from connectors.web import WebConnector, canonicalize_url, create_http_session
 from services.embeddings import generate_embeddings_batch
 
 logger = logging.getLogger(__name__)
@@ -26,6 +46,200 @@ logger = logging.getLogger(__name__)
 # JOB PROGRESS HELPERS
 # ============================================================
 
+# Shared pool for independent status/notification writes. The supabase-py
+# client is synchronous, so running N unrelated writes side by side costs
+# one round-trip instead of N. Threads start lazily (after the prefork fork).
+_metadata_writer = ThreadPoolExecutor(max_workers=4, thread_name_prefix="supabase-write")
+
+
+def run_concurrently(*calls: Callable[[], Any]) -> None:
+    """
+    Run independent, fail-safe Supabase writes in parallel and wait for all.
+    
+    Only pass helpers that swallow their own errors (update_job_status,
+    create_notification, email helpers); ordering between them is not kept.
+    """
+    futures = [_metadata_writer.submit(call) for call in calls]
+    for future in futures:
+        future.result()
+
+
+# Seconds between coalesced ingestion-job progress writes
+JOB_PROGRESS_INTERVAL_SECONDS = 1.0
+
+
+class StatusPublisher:
+    """
+    Coalesce frequent progress writes into at most one per interval.
+    
+    update() only merges the latest fields under a lock; a background
+    thread writes whatever is pending every `interval` seconds, so the
+    Supabase round-trip never sits on the caller's hot path. close()
+    (or leaving the `with` block) stops the thread and flushes the rest.
+    
+    `write(**fields)` must be fail-safe like update_job_status /
+    update_crawl_status; errors are logged and the fields dropped.
+    """
+    
+    def __init__(self, write: Callable[..., Any], interval: float):
+        self._write = write
+        self._interval = interval
+        self._pending: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="status-publisher", daemon=True)
+        self._thread.start()
+    
+    def update(self, **fields) -> None:
+        with self._lock:
+            self._pending.update(fields)
+    
+    def flush(self) -> None:
+        with self._lock:
+            fields, self._pending = self._pending, {}
+        if not fields:
+            return
+        try:
+            self._write(**fields)
+        except Exception as e:
+            logger.warning(f"⚠️ [Progress] Status write failed: {e}")
+    
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.flush()
+    
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+    
+    def __enter__(self) -> "StatusPublisher":
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# Deferred (info/success) notifications are inserted in bulk at most this
+# often, up to NOTIFICATION_INSERT_BATCH rows per request
+NOTIFICATION_FLUSH_INTERVAL_SECONDS = 0.5
+NOTIFICATION_INSERT_BATCH = 500
+
+
+class NotificationBatcher:
+    """
+    Buffer notification rows and insert them in bulk.
+    
+    add() only appends under a lock; a background thread inserts whatever
+    is queued every `interval` seconds with one request per
+    NOTIFICATION_INSERT_BATCH rows. The thread is started on first use, so
+    each forked pool child gets its own. close() stops it and flushes the
+    rest. Insert errors are logged and the rows dropped, as in
+    create_notification.
+    """
+    
+    def __init__(self, interval: float):
+        self._interval = interval
+        self._rows: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def add(self, row: Dict[str, Any]) -> None:
+        with self._lock:
+            self._rows.append(row)
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="notification-batcher", daemon=True)
+                self._thread.start()
+    
+    def flush(self) -> None:
+        with self._lock:
+            rows, self._rows = self._rows, []
+        for batch in _iter_batches(rows, NOTIFICATION_INSERT_BATCH):
+            try:
+                get_supabase().table("notifications").insert(batch).execute()
+                logger.info(f"🔔 [Notification] Created {len(batch)} notifications")
+            except Exception as e:
+                logger.error(f"❌ [Notification] Failed to create {len(batch)} notifications: {e}")
+    
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.flush()
+    
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+
+_notification_batcher = NotificationBatcher(NOTIFICATION_FLUSH_INTERVAL_SECONDS)
+
+
+def close_notifications() -> None:
+    """Insert any buffered notifications (worker process shutdown)."""
+    _notification_batcher.close()
+
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Shared Redis client for this worker process.
+    
+    The client owns a connection pool, connects lazily and re-creates its
+    connections after a fork, so it is safe to build once and reuse.
+    """
+    global _redis_client
+    if _redis_client is None:
+        # Binary-safe: the embedding cache stores packed float16 vectors
+        _redis_client = redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def close_redis() -> None:
+    """Disconnect the shared Redis pool (worker process shutdown)."""
+    global _redis_client
+    if _redis_client is not None:
+        _redis_client.close()
+        _redis_client = None
+
+
+_web_connector: Optional[WebConnector] = None
+_web_connector_pid: Optional[int] = None
+_web_connector_lock = threading.Lock()
+
+
+def get_web_connector() -> WebConnector:
+    """
+    Shared WebConnector (and its pooled keep-alive session) for this process.
+    
+    Page tasks reuse it so repeat requests to a host skip the TCP+TLS
+    handshake. Keyed by PID: a forked pool child never reuses sockets
+    inherited from its parent and builds its own connector instead.
+    """
+    global _web_connector, _web_connector_pid
+    pid = os.getpid()
+    if _web_connector is None or _web_connector_pid != pid:
+        with _web_connector_lock:
+            if _web_connector is None or _web_connector_pid != pid:
+                _web_connector = WebConnector(session=create_http_session())
+                _web_connector_pid = pid
+    return _web_connector
+
+
+def close_web_connector() -> None:
+    """Close the shared connector's session (worker process shutdown)."""
+    global _web_connector, _web_connector_pid
+    with _web_connector_lock:
+        if _web_connector is not None and _web_connector_pid == os.getpid():
+            _web_connector.session.close()
+        _web_connector = None
+        _web_connector_pid = None
+
+
 def update_job_status(supabase, job_id: str, status: str, processed_files: int = None, error_message: str = None):
     """Helper to update ingestion job status in the database."""
     try:
@@ -52,7 +266,8 @@ def create_notification(
     notification_type: str = "info",
     metadata: dict = None,
     action_url: str = None,
-    check_setting_key: str = None
+    check_setting_key: str = None,
+    deferred: bool = False
 ):
     """
     Create a notification for the user.
@@ -67,6 +282,9 @@ def create_notification(
         action_url: Optional URL to navigate to when clicked (e.g., '/dashboard/chat')
         check_setting_key: Optional setting key to check. If user has this
                           setting disabled, notification will not be created.
+        deferred: Buffer the row for a bulk insert (NotificationBatcher)
+                  instead of inserting now. For info/success notifications;
+                  errors should stay immediate.
     """
     try:
         # Check user preference if setting key provided
@@ -76,11 +294,11 @@ def create_notification(
                     .select("enabled")\
                     .eq("user_id", user_id)\
                     .eq("setting_key", check_setting_key)\
-                    .maybeSingle()\
+                    .maybe_single()\
                     .execute()
                 
                 # If preference exists and is explicitly False, skip notification
-                if pref.data and pref.data.get("enabled") is False:
+                if pref and pref.data and pref.data.get("enabled") is False:
                     logger.info(f"🔕 [Notification] Skipped for {user_id}: {check_setting_key} is disabled")
                     return
             except Exception as e:
@@ -99,16 +317,36 @@ def create_notification(
             "type": notification_type,
             "is_read": False,
             # Serialize dict as JSON string for extra_data column
-            "extra_data": json.dumps(meta) if meta else None,
+            "extra_data": dumps_json(meta) if meta else None,
             "created_at": datetime.now(timezone.utc).isoformat()
         }
         
+        if deferred:
+            _notification_batcher.add(notification_data)
+            return
+        
         supabase.table("notifications").insert(notification_data).execute()
         logger.info(f"🔔 [Notification] Created {notification_type}: {title}")
     except Exception as e:
         logger.error(f"❌ [Notification] Failed to create: {e}")
 
 
+def get_notification_context(supabase, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Fetch email, names and the email_on_ingestion_complete flag in one query.
+    
+    Reads the user_notification_context view (profiles LEFT JOIN
+    user_notification_settings), so each email costs one round-trip.
+    
+    Returns:
+        Row dict with email, display_name, full_name, email_enabled, or None
+    """
+    response = supabase.table("user_notification_context").select(
+        "email, display_name, full_name, email_enabled"
+    ).eq("id", user_id).maybe_single().execute()
+    return response.data if response else None
+
+
 def send_email_notification(
     supabase,
     user_id: str,
@@ -126,14 +364,12 @@ def send_email_notification(
         total_files: Number of processed files
     """
     try:
-        # Fetch user profile for email and name
-        user_response = supabase.table("profiles").select("email, display_name, full_name").eq("id", user_id).single().execute()
+        user_data = get_notification_context(supabase, user_id)
         
-        if not user_response.data:
+        if not user_data:
             logger.warning(f"📧 [Email] User profile not found for {user_id}")
             return
         
-        user_data = user_response.data
         email = user_data.get("email")
         name = user_data.get("display_name") or user_data.get("full_name") or "there"
         
@@ -141,15 +377,8 @@ def send_email_notification(
             logger.warning(f"📧 [Email] No email found for user {user_id}")
             return
         
-        # Check user preference in user_notification_settings (key-value table)
-        # Default to True if no explicit setting exists
-        settings_response = supabase.table("user_notification_settings").select("enabled").eq("user_id", user_id).eq("setting_key", "email_on_ingestion_complete").maybeSingle().execute()
-        
-        email_enabled = True  # Default if no setting exists
-        if settings_response.data:
-            email_enabled = settings_response.data.get("enabled", True)
-        
-        if not email_enabled:
+        # email_on_ingestion_complete preference (view defaults to True when unset)
+        if not user_data.get("email_enabled", True):
             logger.info(f"📧 [Email] User {user_id} has email notifications disabled")
             return
         
@@ -183,14 +412,12 @@ def send_failure_email_notification(
         error_message: Error details
     """
     try:
-        # Fetch user profile for email and name
-        user_response = supabase.table("profiles").select("email, display_name, full_name").eq("id", user_id).single().execute()
+        user_data = get_notification_context(supabase, user_id)
         
-        if not user_response.data:
+        if not user_data:
             logger.warning(f"📧 [Email] User profile not found for {user_id}")
             return
         
-        user_data = user_response.data
         email = user_data.get("email")
         name = user_data.get("display_name") or user_data.get("full_name") or "there"
         
@@ -198,14 +425,8 @@ def send_failure_email_notification(
             logger.warning(f"📧 [Email] No email found for user {user_id}")
             return
         
-        # Check user preference (respect opt-out for error emails too)
-        settings_response = supabase.table("user_notification_settings").select("enabled").eq("user_id", user_id).eq("setting_key", "email_on_ingestion_complete").maybeSingle().execute()
-        
-        email_enabled = True
-        if settings_response.data:
-            email_enabled = settings_response.data.get("enabled", True)
-        
-        if not email_enabled:
+        # Respect email_on_ingestion_complete opt-out for error emails too
+        if not user_data.get("email_enabled", True):
             logger.info(f"📧 [Email] User {user_id} has email notifications disabled")
             return
         
@@ -220,15 +441,418 @@ def send_failure_email_notification(
     except Exception as e:
         logger.error(f"📧 [Email] Failed to send failure notification: {e}")
 
+
+# ============================================================
+# EMBEDDING CACHE HELPERS
+# ============================================================
+
+EMBEDDING_CACHE_TABLE = "embedding_cache"
+EMBEDDING_CACHE_LOOKUP_BATCH = 100  # Keep `in.(...)` filter URLs short
+
+# Hot tier in Redis in front of the table: one MGET round-trip per call.
+# Vectors are stored as packed little-endian float16 (3 KB for 1536 dims);
+# half precision is plenty for cosine search on unit-normalised embeddings.
+# The "f16" segment keeps old float32 entries from being misread.
+EMBEDDING_REDIS_PREFIX = "emb:text-embedding-3-small:f16:"
+EMBEDDING_REDIS_TTL_SECONDS = 30 * 86400
+
+
+def _content_hash(text: str) -> str:
+    """SHA-256 hex digest of chunk text (embedding cache key)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _pack_vector(embedding: List[float]) -> bytes:
+    return struct.pack(f"<{len(embedding)}e", *embedding)
+
+
+def _unpack_vector(blob: bytes) -> List[float]:
+    return list(struct.unpack(f"<{len(blob) // 2}e", blob))
+
+
+def _cache_vectors_in_redis(vectors: Dict[str, List[float]]) -> None:
+    """Write vectors to the Redis tier (fail-open)."""
+    if not vectors:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for content_hash, embedding in vectors.items():
+            pipe.set(EMBEDDING_REDIS_PREFIX + content_hash, _pack_vector(embedding), ex=EMBEDDING_REDIS_TTL_SECONDS)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"⚠️ [EmbeddingCache] Redis write failed: {e}")
+
+
+def embed_with_cache(supabase, texts: List[str]) -> List[Optional[List[float]]]:
+    """
+    Embed texts, reusing vectors already stored in the embedding cache.
+
+    Looks up SHA-256(text) in Redis first, then in `embedding_cache`,
+    sends each distinct missing text to OpenAI once and writes the new
+    vectors to both tiers (table hits are copied into Redis too). Results
+    keep the input order (None for empty texts, same as
+    generate_embeddings_batch).
+
+    Cache errors are fail-open: lookups/writes that fail just fall back
+    to the next tier or to embedding everything.
+
+    Args:
+        supabase: Supabase client
+        texts: Chunk texts to embed
+
+    Returns:
+        List of embedding vectors aligned with `texts`
+    """
+    if not texts:
+        return []
+
+    # Whitespace-only chunks never get an embedding: keep them out of the
+    # cache lookup and the OpenAI batch entirely (their hash stays None).
+    hashes = [_content_hash(t) if t and t.strip() else None for t in texts]
+    unique_hashes = [h for h in dict.fromkeys(hashes) if h is not None]
+
+    # 1. Redis tier
+    cached: Dict[str, List[float]] = {}
+    if unique_hashes:
+        try:
+            blobs = get_redis().mget([EMBEDDING_REDIS_PREFIX + h for h in unique_hashes])
+            for content_hash, blob in zip(unique_hashes, blobs):
+                if blob:
+                    cached[content_hash] = _unpack_vector(blob)
+        except Exception as e:
+            logger.warning(f"⚠️ [EmbeddingCache] Redis lookup failed: {e}")
+    redis_hits = len(cached)
+
+    # 2. Table tier for whatever Redis did not have
+    table_hits: Dict[str, List[float]] = {}
+    try:
+        remaining = [h for h in unique_hashes if h not in cached]
+        for start in range(0, len(remaining), EMBEDDING_CACHE_LOOKUP_BATCH):
+            batch = remaining[start:start + EMBEDDING_CACHE_LOOKUP_BATCH]
+            res = supabase.table(EMBEDDING_CACHE_TABLE)\
+                .select("hash, embedding")\
+                .in_("hash", batch)\
+                .execute()
+            for row in res.data or []:
+                embedding = row["embedding"]
+                # pgvector is returned in its text form "[0.1,0.2,...]"
+                if isinstance(embedding, str):
+                    embedding = orjson.loads(embedding)
+                table_hits[row["hash"]] = embedding
+    except Exception as e:
+        logger.warning(f"⚠️ [EmbeddingCache] Lookup failed, embedding all chunks: {e}")
+        table_hits = {}
+    cached.update(table_hits)
+
+    # 3. Embed misses only, each distinct text once (repeated boilerplate
+    # chunks share the first occurrence's vector)
+    first_text = {}
+    for h, text in zip(hashes, texts):
+        if h is not None and h not in cached and h not in first_text:
+            first_text[h] = text
+    missing_count = sum(1 for h in hashes if h in first_text)
+    new_vectors: Dict[str, List[float]] = {}
+    if first_text:
+        new_embeddings = generate_embeddings_batch(list(first_text.values()))
+        for content_hash, embedding in zip(first_text, new_embeddings):
+            if embedding is None:
+                continue
+            cached[content_hash] = embedding
+            new_vectors[content_hash] = embedding
+
+        # 4. Store new vectors for future re-ingests
+        if new_vectors:
+            try:
+                supabase.table(EMBEDDING_CACHE_TABLE)\
+                    .upsert([{"hash": h, "embedding": e} for h, e in new_vectors.items()], on_conflict="hash")\
+                    .execute()
+            except Exception as e:
+                logger.warning(f"⚠️ [EmbeddingCache] Failed to store {len(new_vectors)} embeddings: {e}")
+
+    _cache_vectors_in_redis({**table_hits, **new_vectors})
+
+    non_empty = len(texts) - hashes.count(None)
+    logger.info(
+        f"🔢 [EmbeddingCache] {non_empty - missing_count}/{non_empty} chunks served from cache "
+        f"({redis_hits} unique from Redis), {len(first_text)} embedded"
+    )
+    return [cached.get(h) for h in hashes]
+
+# ============================================================
+# DOCUMENT STORAGE HELPERS
+# ============================================================
+
+# Max chunks per write. A 1536-dim embedding is ~14 KB of vector text, so
+# 500 chunks keep each request well under PostgREST's body limit.
+CHUNK_INSERT_BATCH = 500
+
+# Vectors are uploaded at float16 precision: 5 significant digits round-trip
+# any half-precision value, and cosine similarity is unaffected in practice,
+# while the request body is about a third smaller than full float4 text.
+_format_vector_component = "{:.5g}".format
+
+
+def dumps_json(obj: Any) -> str:
+    """Serialize an RPC argument with orjson (compact, much faster on float lists)."""
+    return orjson.dumps(obj).decode()
+
+
+def format_vector(embedding: List[float]) -> str:
+    """
+    Format an embedding as pgvector text ("[.1,-.2,...]").
+    
+    The RPCs cast `chunk->>'embedding'` straight to vector, so sending the
+    text form skips JSON float encoding and keeps only float16 precision.
+    Embedding components are all below 1, so the leading "0" of each one is
+    dropped too (pgvector parses ".1"), another ~10% off the request body.
+    """
+    text = "," + ",".join(map(_format_vector_component, embedding))
+    return "[" + text.replace(",0.", ",.").replace(",-0.", ",-.")[1:] + "]"
+
+
+def drop_duplicate_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Keep only the first chunk for each distinct (whitespace-trimmed) text.
+    
+    Repeated boilerplate (headers, footers, license blocks) would otherwise
+    be stored and returned by search several times with the same vector.
+    """
+    seen = set()
+    unique = []
+    for chunk in chunks:
+        key = chunk["content"].strip()
+        if key not in seen:
+            seen.add(key)
+            unique.append(chunk)
+    return unique
+
+
+def _iter_batches(items: List[Any], size: int):
+    """Yield consecutive slices of `items` with at most `size` elements."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def store_document_with_chunks(
+    supabase,
+    user_id: str,
+    title: str,
+    source_type: str,
+    source_url: Optional[str],
+    metadata: Dict[str, Any],
+    chunks: List[Dict[str, Any]],
+    file_size_bytes: int
+) -> Optional[str]:
+    """
+    Store a document and its embedded chunks.
+    
+    The document and the first CHUNK_INSERT_BATCH chunks go through the
+    atomic `ingest_document_with_chunks` RPC. Any further chunks are
+    appended to `document_chunks` in batches. If an append fails, the
+    document is deleted (chunks cascade) so a retry starts from scratch
+    instead of leaving a half-indexed document behind.
+    
+    Chunks repeating an earlier chunk's text are dropped first.
+    
+    Args:
+        chunks: [{content, embedding, chunk_index, metadata}]
+    
+    Returns:
+        New document ID, or None if the RPC returned no data
+    """
+    unique_chunks = drop_duplicate_chunks(chunks)
+    if len(unique_chunks) < len(chunks):
+        logger.info(f"✂️ [Store] {title}: dropped {len(chunks) - len(unique_chunks)} duplicate chunks")
+    chunks = [{**chunk, "embedding": format_vector(chunk["embedding"])} for chunk in unique_chunks]
+    batches = _iter_batches(chunks, CHUNK_INSERT_BATCH)
+    first_batch = dumps_json(next(batches, []))
+    logger.info(f"📦 [Store] {title}: RPC with {min(len(chunks), CHUNK_INSERT_BATCH)}/{len(chunks)} chunks ({len(first_batch)} bytes)")
+    
+    rpc_result = supabase.rpc("ingest_document_with_chunks", {
+        "p_user_id": user_id,
+        "p_doc_title": title,
+        "p_source_type": source_type,
+        "p_source_url": source_url,
+        "p_metadata": dumps_json(metadata),
+        "p_chunks": first_batch,
+        "p_file_size_bytes": file_size_bytes
+    }).execute()
+    
+    if not rpc_result.data:
+        return None
+    doc_id = rpc_result.data
+    
+    try:
+        for batch in batches:
+            rows = [
+                {
+                    "document_id": doc_id,
+                    "content": chunk["content"],
+                    "embedding": chunk["embedding"],
+                    "chunk_index": chunk["chunk_index"],
+                }
+                for chunk in batch
+            ]
+            logger.info(f"📦 [Store] {title}: appending {len(rows)} chunks")
+            supabase.table("document_chunks").insert(rows).execute()
+    except Exception:
+        logger.error(f"❌ [Store] Chunk append failed, rolling back document {doc_id}")
+        supabase.table("documents").delete().eq("id", doc_id).execute()
+        raise
+    
+    return doc_id
+
+
+def _iter_document_batches(documents: List[Dict[str, Any]]):
+    """
+    Yield consecutive runs of documents with at most CHUNK_INSERT_BATCH
+    chunks between them (a larger document is yielded on its own).
+    """
+    batch: List[Dict[str, Any]] = []
+    batch_chunks = 0
+    for doc in documents:
+        if batch and batch_chunks + len(doc["chunks"]) > CHUNK_INSERT_BATCH:
+            yield batch
+            batch, batch_chunks = [], 0
+        batch.append(doc)
+        batch_chunks += len(doc["chunks"])
+    if batch:
+        yield batch
+
+
+def store_documents(
+    supabase,
+    user_id: str,
+    source_type: str,
+    documents: List[Dict[str, Any]]
+) -> List[str]:
+    """
+    Store many small documents with one `ingest_documents_with_chunks` RPC
+    per CHUNK_INSERT_BATCH chunks instead of one round-trip each.
+    
+    Meant for web pages and other documents of up to CHUNK_INSERT_BATCH
+    chunks; each batch is a single transaction. Larger files should use
+    store_document_with_chunks. Repeated chunk texts within a document are
+    dropped, as in store_document_with_chunks.
+    
+    Args:
+        documents: [{title, source_url, metadata, file_size_bytes, chunks}]
+    
+    Returns:
+        New document IDs in input order
+    """
+    doc_ids: List[str] = []
+    for batch in _iter_document_batches(documents):
+        payload = [
+            {
+                **doc,
+                "chunks": [
+                    {**chunk, "embedding": format_vector(chunk["embedding"])}
+                    for chunk in drop_duplicate_chunks(doc["chunks"])
+                ],
+            }
+            for doc in batch
+        ]
+        rpc_result = supabase.rpc("ingest_documents_with_chunks", {
+            "p_user_id": user_id,
+            "p_source_type": source_type,
+            "p_docs": dumps_json(payload)
+        }).execute()
+        doc_ids.extend(rpc_result.data or [])
+    return doc_ids
+
+
+# ============================================================
+# DOCUMENT DEDUPLICATION
+# ============================================================
+
+# Hashes per `in.(...)` filter (32-char digests keep the URL short)
+DOCUMENT_HASH_LOOKUP_BATCH = 100
+
+
+def new_content_hasher():
+    """Incremental hasher for documents.content_hash (BLAKE2b-128 of the raw content)."""
+    return hashlib.blake2b(digest_size=16)
+
+
+def document_content_hash(content: str) -> str:
+    """documents.content_hash of connector text content."""
+    hasher = new_content_hasher()
+    hasher.update(content.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def find_existing_documents(supabase, user_id: str, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+    """
+    Map the (source, content_hash) pairs a user already has stored to their
+    document IDs, so identical content from the same source is not parsed,
+    embedded and inserted again.
+    
+    The source is the document's source_url, or its title when it has none
+    (file uploads), so the same bytes under another name or URL still get
+    their own document.
+    
+    Fail-open: a lookup error just means everything is ingested as new.
+    """
+    wanted = set(keys)
+    existing: Dict[Tuple[str, str], str] = {}
+    try:
+        hashes = list(dict.fromkeys(content_hash for _, content_hash in keys))
+        for batch in _iter_batches(hashes, DOCUMENT_HASH_LOOKUP_BATCH):
+            response = supabase.table("documents").select("id, content_hash, source_url, title").eq(
+                "user_id", user_id
+            ).in_("content_hash", batch).execute()
+            for row in response.data or []:
+                key = (row.get("source_url") or row.get("title"), row["content_hash"])
+                if key in wanted:
+                    existing[key] = str(row["id"])
+    except Exception as e:
+        logger.warning(f"⚠️ [Dedup] Existing-document lookup failed: {e}")
+    return existing
+
+
 # ============================================================
 # ZERO-COPY FILE INGESTION TASK
 # ============================================================
 
 STAGING_BUCKET = "ephemeral-staging"
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+# Staged uploads waiting to be deleted by sweep_staging_uploads (Redis list)
+STAGING_CLEANUP_KEY = "staging:cleanup"
+# Paths per storage.remove() call (the Storage API takes a list)
+STAGING_CLEANUP_BATCH = 100
+
+
+def schedule_staging_cleanup(supabase, storage_path: str) -> None:
+    """
+    Queue a staged upload for deletion instead of blocking the task on it.
+    
+    Falls back to deleting inline if Redis is unavailable, so files are
+    never left behind because of a queueing error.
+    """
+    try:
+        get_redis().rpush(STAGING_CLEANUP_KEY, storage_path)
+        return
+    except Exception as e:
+        logger.warning(f"⚠️ [Cleanup] Could not queue {storage_path}, deleting inline: {e}")
+    
+    try:
+        supabase.storage.from_(STAGING_BUCKET).remove([storage_path])
+    except Exception as e:
+        logger.warning(f"⚠️ [Cleanup] Failed to delete from storage: {e}")
+
+
+def is_retryable_download_error(exc: BaseException) -> bool:
+    """5xx from the staging download is worth retrying; 4xx is not."""
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code >= 500
+
 
 @celery_app.task(
     bind=True,
-    autoretry_for=(ConnectionError, TimeoutError, OSError, Exception),
+    # Transient I/O only: a file that fails to parse fails the same way again.
+    # 5xx download responses are retried by hand (see is_retryable_download_error)
+    autoretry_for=(ConnectionError, TimeoutError, OSError, httpx.TransportError),
     retry_backoff=True,
     retry_backoff_max=600,
     max_retries=3,
@@ -246,9 +870,10 @@ def ingest_file_task(
     Zero-Copy File Ingestion Task.
     
     Architecture: Store-Forward-Process-Delete
-    1. Download file from Supabase Storage to /tmp
+    1. Stream file from Supabase Storage (signed URL) to /tmp
     2. Parse and chunk the file
-    3. Embed and store via atomic RPC
+    3. Chain embed_and_store_task -> notify_ingestion_task
+       (embed and store via atomic RPC, then email)
     4. Delete file from /tmp AND Storage (zero-copy cleanup)
     
     Args:
@@ -258,44 +883,60 @@ def ingest_file_task(
         filename: Original filename
         metadata: Optional metadata dict
     """
-    import os
-    import tempfile
     
     task_id = self.request.id
     logger.info(f"📥 [Worker:{task_id}] Starting zero-copy ingestion for {filename}")
     
     supabase = get_supabase()
     local_path = None
+    retrying = False  # Keep the staged upload for the next attempt
     
     try:
         # Update job to processing
-        update_job_status(supabase, job_id, "processing", 0)
-        
-        create_notification(
-            supabase, user_id,
-            "Processing File",
-            f"Ingesting {filename}",
-            "info",
-            {"job_id": job_id, "filename": filename}
+        run_concurrently(
+            lambda: update_job_status(supabase, job_id, "processing", 0),
+            lambda: create_notification(
+                supabase, user_id,
+                "Processing File",
+                f"Ingesting {filename}",
+                "info",
+                {"job_id": job_id, "filename": filename},
+                deferred=True
+            )
         )
         
         # ========== STEP 1: Download from Storage ==========
         logger.info(f"📦 [Worker:{task_id}] Downloading from storage: {storage_path}")
         
-        file_data = supabase.storage.from_(STAGING_BUCKET).download(storage_path)
-        file_size_bytes = len(file_data)  # Track for quota
+        # Stream straight into the temp file: peak memory stays at one
+        # 64 KB buffer instead of holding (and copying) the whole file.
+        signed = supabase.storage.from_(STAGING_BUCKET).create_signed_url(storage_path, 300)
+        signed_url = signed.get("signedURL") or signed.get("signedUrl")
         
-        # Write to temp file
         file_ext = os.path.splitext(filename)[1] if filename else ""
+        file_size_bytes = 0  # Track for quota
+        hasher = new_content_hasher()  # Hashed while streaming, no second read
         with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp:
-            tmp.write(file_data)
-            local_path = tmp.name
+            local_path = tmp.name  # Set first so a failed download is still cleaned up
+            with httpx.stream("GET", signed_url, timeout=60) as response:
+                response.raise_for_status()
+                for block in response.iter_bytes(DOWNLOAD_CHUNK_BYTES):
+                    tmp.write(block)
+                    hasher.update(block)
+                    file_size_bytes += len(block)
         
         logger.info(f"📦 [Worker:{task_id}] Downloaded to: {local_path} ({file_size_bytes} bytes)")
         
-        # ========== STEP 2: Smart Parse & Chunk (Format-Specific) ==========
-        from services.parsers import DocumentProcessorFactory
+        # Same bytes already ingested under this filename: skip parse, embed and insert
+        content_hash = hasher.hexdigest()
+        dedup_key = (filename, content_hash)
+        existing_id = find_existing_documents(supabase, user_id, [dedup_key]).get(dedup_key)
+        if existing_id:
+            logger.info(f"♻️ [Worker:{task_id}] {filename} already ingested as {existing_id}, skipping")
+            update_job_status(supabase, job_id, "completed", 1)
+            return {"status": "skipped", "message": "Duplicate content", "document_id": existing_id, "job_id": job_id}
         
+        # ========== STEP 2: Smart Parse & Chunk (Format-Specific) ==========
         # Process file with format-specific strategy
         result = DocumentProcessorFactory.process(
             file_path=local_path,
@@ -309,32 +950,21 @@ def ingest_file_task(
         
         logger.info(f"📄 [Worker:{task_id}] {result.file_type}: {len(result.chunks)} chunks, {result.total_tokens} tokens")
         
-        # ========== STEP 3: Embed ==========
-        from services.embeddings import generate_embeddings_batch
-        
-        # Get chunk texts for embedding
-        chunk_texts = [chunk.content for chunk in result.chunks]
-        chunk_embeddings = generate_embeddings_batch(chunk_texts)
-        logger.info(f"🔢 [Worker:{task_id}] Embedded {len(chunk_texts)} chunks")
-        
-        # ========== STEP 4: Atomic RPC Insert ==========
-        # Prepare chunks payload with enriched metadata
-        chunks_payload = []
-        for chunk, embedding in zip(result.chunks, chunk_embeddings):
-            if embedding is None:
-                logger.warning(f"⚠️ [Worker:{task_id}] Skipping empty chunk {chunk.chunk_index}")
-                continue
-
-            chunks_payload.append({
+        # ========== STEP 3: Hand off to embed -> store -> notify ==========
+        # Only chunk texts travel through the broker; embeddings are computed
+        # by the next stage so this worker slot is freed before the OpenAI call.
+        chunks = [
+            {
                 "content": chunk.content,
-                "embedding": embedding,
                 "chunk_index": chunk.chunk_index,
                 # Extended metadata from factory
                 "metadata": {
                     **chunk.metadata,
                     "token_count": chunk.token_count,
                 }
-            })
+            }
+            for chunk in result.chunks
+        ]
         
         # Merge document metadata
         doc_metadata = {
@@ -344,57 +974,46 @@ def ingest_file_task(
             "total_chunks": len(result.chunks),
             "file_size": file_size_bytes,  # CRITICAL: Persist size in metadata
             "size": file_size_bytes,       # CRITICAL: Alias for frontend
+            "content_hash": content_hash,  # Stored on documents.content_hash
             **(result.metadata or {}),
         }
         
-        # Call atomic ingestion RPC with file size for quota tracking
-        rpc_result = supabase.rpc("ingest_document_with_chunks", {
-            "p_user_id": user_id,
-            "p_doc_title": filename,
-            "p_source_type": "file",
-            "p_source_url": None,
-            "p_metadata": json.dumps(doc_metadata),
-            "p_chunks": json.dumps(chunks_payload),
-            "p_file_size_bytes": file_size_bytes
-        }).execute()
-        
-        if rpc_result.data:
-            doc_id = rpc_result.data
-            logger.info(f"✅ [Worker:{task_id}] Document stored: {doc_id}")
-        else:
-            raise Exception("RPC returned no document ID")
-        
-        # Update job to completed
-        update_job_status(supabase, job_id, "completed", 1)
-        
-        create_notification(
-            supabase, user_id,
-            "Ingestion Complete",
-            f"Successfully processed {filename} ({len(chunks)} chunks)",
-            "success",
-            {"job_id": job_id, "document_id": str(doc_id)}
-        )
-        
-        send_email_notification(supabase, user_id, 1)
+        pipeline = chain(
+            embed_and_store_task.s(user_id, job_id, filename, chunks, doc_metadata, file_size_bytes),
+            notify_ingestion_task.s(user_id)
+        ).apply_async()
         
-        return {"status": "success", "document_id": str(doc_id), "chunks": len(chunks)}
+        logger.info(f"➡️ [Worker:{task_id}] Queued embedding pipeline {pipeline.id} for {len(chunks)} chunks")
+        return {"status": "queued", "pipeline_id": pipeline.id, "chunks": len(chunks), "job_id": job_id}
         
     except Exception as e:
-        logger.error(f"❌ [Worker:{task_id}] Failed: {e}")
+        # Let autoretry (or a manual retry for 5xx downloads) run before failing the job
+        if self.request.retries < self.max_retries:
+            if isinstance(e, self.autoretry_for):
+                retrying = True
+                raise
+            if is_retryable_download_error(e):
+                retrying = True
+                raise self.retry(exc=e, countdown=get_exponential_backoff_interval(
+                    factor=1, retries=self.request.retries, maximum=600, full_jitter=True
+                ))
         
-        update_job_status(supabase, job_id, "failed", 0, str(e))
+        logger.error(f"❌ [Worker:{task_id}] Failed: {e}")
         
-        create_notification(
-            supabase, user_id,
-            "Ingestion Failed",
-            f"Failed to process {filename}: {str(e)[:200]}",
-            "error",
-            {"job_id": job_id, "error": str(e)}
+        error = str(e)
+        # Failure email is fail-safe and respects user preferences
+        run_concurrently(
+            lambda: update_job_status(supabase, job_id, "failed", 0, error),
+            lambda: create_notification(
+                supabase, user_id,
+                "Ingestion Failed",
+                f"Failed to process {filename}: {error[:200]}",
+                "error",
+                {"job_id": job_id, "error": error}
+            ),
+            lambda: queue_email(send_failure_email_task, user_id, filename, error)
         )
         
-        # Send failure email (fail-safe, respects user preferences)
-        send_failure_email_notification(supabase, user_id, filename, str(e))
-        
         raise
         
     finally:
@@ -407,18 +1026,18 @@ def ingest_file_task(
             except Exception as e:
                 logger.warning(f"⚠️ [Worker:{task_id}] Failed to delete temp: {e}")
         
-        # Delete from Supabase Storage
-        try:
-            supabase.storage.from_(STAGING_BUCKET).remove([storage_path])
-            logger.info(f"🗑️ [Worker:{task_id}] Deleted from storage: {storage_path}")
-            logger.info(f"🔒 [Worker:{task_id}] File destroyed securely after processing")
-        except Exception as e:
-            logger.warning(f"⚠️ [Worker:{task_id}] Failed to delete from storage: {e}")
+        # Delete from Supabase Storage (batched by sweep_staging_uploads),
+        # unless a retry still needs to download it
+        if not retrying:
+            schedule_staging_cleanup(supabase, storage_path)
+            logger.info(f"🗑️ [Worker:{task_id}] Queued storage deletion: {storage_path}")
 
 
-# ============================================================
-# CONNECTOR INGESTION TASK (Drive, Notion)
-# ============================================================
+# Upstream throttling (an OpenAI 429 that outlasts the client's own retries,
+# a Supabase 503) requeues the stage after the server's Retry-After instead
+# of failing the job; plain transient I/O keeps the autoretry backoff
+UPSTREAM_THROTTLE_MAX_RETRIES = 5
+
 
 @celery_app.task(
     bind=True,
@@ -428,24 +1047,214 @@ def ingest_file_task(
     max_retries=3,
     acks_late=True
 )
-def ingest_connector_task(
+def embed_and_store_task(
     self,
     user_id: str,
     job_id: str,
-    connector_type: str,
-    item_id: str,
-    credentials: Dict[str, Any] = None
+    filename: str,
+    chunks: List[Dict[str, Any]],
+    doc_metadata: Dict[str, Any],
+    file_size_bytes: int
 ):
     """
-    Background task to ingest files from cloud connectors (Drive, Notion).
-    
-    Uses atomic RPC for database insertion.
+    Pipeline stage 2: embed parsed chunks and store them via atomic RPC.
     
     Args:
         user_id: User's ID for multi-tenancy
         job_id: Ingestion job ID for progress tracking
-        connector_type: 'drive' or 'notion'
-        item_id: File/page ID to ingest
+        filename: Original filename (document title)
+        chunks: [{content, chunk_index, metadata}] from ingest_file_task
+        doc_metadata: Document-level metadata
+        file_size_bytes: Original file size for quota tracking
+    """
+    task_id = self.request.id
+    supabase = get_supabase()
+    
+    try:
+        # ========== Embed ==========
+        chunk_embeddings = embed_with_cache(supabase, [chunk["content"] for chunk in chunks])
+        logger.info(f"🔢 [Worker:{task_id}] Embedded {len(chunks)} chunks")
+        
+        # ========== Atomic RPC Insert ==========
+        chunks_payload = [
+            {**chunk, "embedding": embedding}
+            for chunk, embedding in zip(chunks, chunk_embeddings)
+            if embedding is not None
+        ]
+        if len(chunks_payload) < len(chunks):
+            logger.warning(f"⚠️ [Worker:{task_id}] Skipped {len(chunks) - len(chunks_payload)} empty chunks")
+        
+        # Atomic RPC (paged for very large files) with file size for quota tracking
+        doc_id = store_document_with_chunks(
+            supabase, user_id, filename, "file", None,
+            doc_metadata, chunks_payload, file_size_bytes
+        )
+        
+        if doc_id:
+            logger.info(f"✅ [Worker:{task_id}] Document stored: {doc_id}")
+        else:
+            raise Exception("RPC returned no document ID")
+        
+        # Update job to completed
+        run_concurrently(
+            lambda: update_job_status(supabase, job_id, "completed", 1),
+            lambda: create_notification(
+                supabase, user_id,
+                "Ingestion Complete",
+                f"Successfully processed {filename} ({len(chunks_payload)} chunks)",
+                "success",
+                {"job_id": job_id, "document_id": str(doc_id)},
+                deferred=True
+            )
+        )
+        
+        return {"status": "success", "document_id": str(doc_id), "chunks": len(chunks_payload), "job_id": job_id}
+        
+    except Exception as e:
+        delay = throttle_retry_delay(e, self.request.retries)
+        if delay is not None and self.request.retries < UPSTREAM_THROTTLE_MAX_RETRIES:
+            logger.warning(f"⏳ [Worker:{task_id}] Upstream throttled, retrying in {delay:.1f}s: {e}")
+            raise self.retry(exc=e, countdown=delay, max_retries=UPSTREAM_THROTTLE_MAX_RETRIES)
+        # Let autoretry handle transient errors before failing the job
+        if isinstance(e, self.autoretry_for) and self.request.retries < self.max_retries:
+            raise
+        
+        logger.error(f"❌ [Worker:{task_id}] Embed/store failed: {e}")
+        
+        error = str(e)
+        # Failure email is fail-safe and respects user preferences
+        run_concurrently(
+            lambda: update_job_status(supabase, job_id, "failed", 0, error),
+            lambda: create_notification(
+                supabase, user_id,
+                "Ingestion Failed",
+                f"Failed to process {filename}: {error[:200]}",
+                "error",
+                {"job_id": job_id, "error": error}
+            ),
+            lambda: queue_email(send_failure_email_task, user_id, filename, error)
+        )
+        
+        raise
+
+
+@celery_app.task(ignore_result=True)
+def send_email_task(user_id: str, total_files: int):
+    """Fire-and-forget completion email (see queue_email)."""
+    send_email_notification(get_supabase(), user_id, total_files)
+
+
+@celery_app.task(ignore_result=True)
+def send_failure_email_task(user_id: str, filename: str, error_message: str):
+    """Fire-and-forget failure email (see queue_email)."""
+    send_failure_email_notification(get_supabase(), user_id, filename, error_message)
+
+
+def queue_email(task, *args) -> None:
+    """
+    Publish an email task to the `notifications` queue instead of sending
+    inline, so email-provider latency never holds an ingest worker slot.
+    
+    Fail-safe like the email helpers: a publish error is logged, not raised.
+    """
+    try:
+        task.delay(*args)
+    except Exception as e:
+        logger.warning(f"📧 [Email] Failed to queue {task.name}: {e}")
+
+
+# Completion emails are coalesced per user: ingests add to a pending file
+# count and flush_completion_emails (Celery Beat, every minute) sends one
+# summary email per user instead of one per file
+PENDING_EMAIL_USERS_KEY = "email:pending:users"
+PENDING_EMAIL_COUNT_PREFIX = "email:pending:count:"
+PENDING_EMAIL_TTL_SECONDS = 3600
+PENDING_EMAIL_FLUSH_BATCH = 100
+
+
+def queue_completion_email(user_id: str, total_files: int) -> None:
+    """
+    Add `total_files` to the user's pending completion email.
+    
+    Fail-safe: if Redis is unavailable the email is queued on its own.
+    """
+    try:
+        count_key = PENDING_EMAIL_COUNT_PREFIX + user_id
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.incrby(count_key, total_files)
+        pipe.expire(count_key, PENDING_EMAIL_TTL_SECONDS)
+        pipe.sadd(PENDING_EMAIL_USERS_KEY, user_id)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"📧 [Email] Could not coalesce completion email, queueing directly: {e}")
+        queue_email(send_email_task, user_id, total_files)
+
+
+@celery_app.task(bind=True)
+def notify_ingestion_task(self, result: Dict[str, Any], user_id: str):
+    """
+    Pipeline stage 3: count the stored document towards the user's next
+    completion email (see queue_completion_email).
+    
+    Runs after embed_and_store_task; fail-safe like the email helpers.
+    """
+    if result and result.get("status") == "success":
+        queue_completion_email(user_id, 1)
+    return result
+
+
+# ============================================================
+# CONNECTOR INGESTION TASK (Drive, Notion)
+# ============================================================
+
+# Connector documents are parsed on this pool while the event loop keeps
+# streaming the next ones from the provider. Celery's prefork children are
+# daemonic and cannot start a process pool, so these are threads: chunking
+# (tiktoken) releases the GIL, and parsing overlaps provider I/O either way.
+_document_parser = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix="doc-parse")
+
+# Connector ingestion embeds and stores parsed documents in windows of about
+# this many chunks while the provider stream continues (bounded memory)
+CONNECTOR_STORE_WINDOW_CHUNKS = 1000
+# Documents queued for parsing before the stream waits for the oldest one
+CONNECTOR_PARSE_AHEAD = (os.cpu_count() or 2) * 2
+
+# Credential keys that may hold Fernet-encrypted secrets. Everything else
+# (workspace ids, expiry timestamps, ...) is passed through untouched.
+ENCRYPTED_CREDENTIAL_KEYS = frozenset({"access_token", "refresh_token", "client_secret", "api_key"})
+
+# Connector file titles that already carry a parseable extension
+KNOWN_FILE_EXTENSIONS = frozenset({".pdf", ".docx", ".md", ".txt", ".py", ".js"})
+# (mime_type substring, extension) in priority order for extension-less titles
+MIME_TO_EXTENSION = (("pdf", ".pdf"), ("markdown", ".md"), ("document", ".docx"))
+
+
+@celery_app.task(
+    bind=True,
+    autoretry_for=(ConnectionError, TimeoutError, OSError),
+    retry_backoff=True,
+    retry_backoff_max=600,
+    max_retries=3,
+    acks_late=True
+)
+def ingest_connector_task(
+    self,
+    user_id: str,
+    job_id: str,
+    connector_type: str,
+    item_id: str,
+    credentials: Dict[str, Any] = None
+):
+    """
+    Background task to ingest files from cloud connectors (Drive, Notion).
+    
+    Uses atomic RPC for database insertion.
+    
+    Args:
+        user_id: User's ID for multi-tenancy
+        job_id: Ingestion job ID for progress tracking
+        connector_type: 'drive' or 'notion'
+        item_id: File/page ID to ingest
         credentials: Optional OAuth credentials
     """
     task_id = self.request.id
@@ -453,28 +1262,27 @@ def ingest_connector_task(
     logger.info(f"📥 [Worker:{task_id}] Connector: {connector_type}, Item: {item_id}, Job: {job_id}")
     
     supabase = get_supabase()
+    provider_pretty = connector_type.replace('_', ' ').title()
     
     try:
-        update_job_status(supabase, job_id, "processing", 0)
-        
-        create_notification(
-            supabase,
-            user_id,
-            "Ingestion Started",
-            f"Processing from {connector_type.replace('_', ' ').title()}",
-            "info",
-            {"job_id": job_id, "connector": connector_type}
+        run_concurrently(
+            lambda: update_job_status(supabase, job_id, "processing", 0),
+            lambda: create_notification(
+                supabase,
+                user_id,
+                "Ingestion Started",
+                f"Processing from {provider_pretty}",
+                "info",
+                {"job_id": job_id, "connector": connector_type},
+                deferred=True
+            )
         )
         
-        # 1. Decrypt credentials if provided
-        decrypted_creds = {}
-        if credentials:
-            for key, value in credentials.items():
-                if isinstance(value, str):
-                    decrypted_creds[key] = decrypt_token(value)
-                else:
-                    decrypted_creds[key] = value
-        
+        # 1. Decrypt credentials if provided (only token-shaped secrets are encrypted)
+        decrypted_creds = {
+            key: decrypt_token(value) if key in ENCRYPTED_CREDENTIAL_KEYS and isinstance(value, str) else value
+            for key, value in (credentials or {}).items()
+        }
 
         # 2. Get connector and ingest
         connector = get_connector(connector_type)
@@ -498,174 +1306,237 @@ def ingest_connector_task(
         }
         source_type_enum = CONNECTOR_TYPE_TO_ENUM.get(connector_type, "file")
         
-        # Define async stream consumer
-        async def process_stream():
-            stream = await connector.ingest(ingest_config)
-            processed_docs = []
+        def parse_document(doc):
+            """Route one connector document through the right processor."""
+            doc_title = doc.metadata.get('title', 'Untitled')
+            doc_content = doc.page_content
+            source_url = doc.metadata.get('source_url')
             
-            async for doc in stream:
-                # Route through appropriate processor based on connector type
+            if connector_type in ["notion"]:
+                # Notion: Treat as markdown (has headers, lists, etc.)
+                return DocumentProcessorFactory.process_web_content(
+                    doc_content,
+                    source_url or doc_title
+                )
+            
+            # Drive and others: Use extension/mime_type routing
+            content_bytes = doc_content.encode('utf-8')
+            mime_type = doc.metadata.get('mime_type', 'text/plain')
+            
+            # Try to get file extension from title
+            filename = doc_title
+            if os.path.splitext(filename)[1].lower() not in KNOWN_FILE_EXTENSIONS:
+                # Add extension based on mime type
+                for needle, ext in MIME_TO_EXTENSION:
+                    if needle in mime_type:
+                        filename = f"{doc_title}{ext}"
+                        break
+            
+            return DocumentProcessorFactory.process(
+                content=content_bytes,
+                filename=filename,
+                mime_type=mime_type
+            )
+        
+        def embed_and_store(parsed_docs, progress) -> List[str]:
+            """Embed and store one window of parsed documents; returns their IDs."""
+            # Content the user already has from the same source (e.g. an
+            # unchanged file on re-sync) keeps its existing document instead
+            # of being embedded again
+            keys = [
+                (doc.metadata.get('source_url') or doc.metadata.get('title', 'Untitled'), document_content_hash(doc.page_content))
+                for doc, _ in parsed_docs
+            ]
+            existing = find_existing_documents(supabase, user_id, keys)
+            if existing:
+                logger.info(f"♻️ [Worker:{task_id}] Skipping {sum(k in existing for k in keys)} already-ingested documents")
+            parsed_docs = [
+                (doc, result, key[1])
+                for (doc, result), key in zip(parsed_docs, keys)
+                if key not in existing
+            ]
+            
+            # Embed the chunks of the whole window together: full OpenAI batches
+            # and a single cache lookup instead of one partial batch per document
+            all_embeddings = embed_with_cache(
+                supabase,
+                [chunk.content for _, result, _ in parsed_docs for chunk in result.chunks]
+            )
+            
+            # Each document's embeddings are a contiguous run of the flat list
+            # starting at `offset`; index into it rather than slicing a copy
+            documents = []
+            offset = 0
+            for doc, result, content_hash in parsed_docs:
                 doc_title = doc.metadata.get('title', 'Untitled')
-                doc_content = doc.page_content
-                source_url = doc.metadata.get('source_url')
-                
-                if connector_type in ["notion"]:
-                    # Notion: Treat as markdown (has headers, lists, etc.)
-                    result = DocumentProcessorFactory.process_web_content(
-                        doc_content,
-                        source_url or doc_title
-                    )
-                else:
-                    # Drive and others: Use extension/mime_type routing
-                    content_bytes = doc_content.encode('utf-8')
-                    mime_type = doc.metadata.get('mime_type', 'text/plain')
-                    
-                    # Try to get file extension from title
-                    filename = doc_title
-                    if not any(filename.endswith(ext) for ext in ['.pdf', '.docx', '.md', '.txt', '.py', '.js']):
-                        # Add extension based on mime type
-                        if 'pdf' in mime_type:
-                            filename = f"{doc_title}.pdf"
-                        elif 'markdown' in mime_type:
-                            filename = f"{doc_title}.md"
-                        elif 'document' in mime_type:
-                            filename = f"{doc_title}.docx"
-                    
-                    result = DocumentProcessorFactory.process(
-                        content=content_bytes,
-                        filename=filename,
-                        mime_type=mime_type
-                    )
-                
-                if not result.chunks:
-                    logger.warning(f"⚠️ [Worker:{task_id}] No chunks from: {doc_title}")
-                    continue
-                
-                # Embed chunks
-                chunk_texts = [chunk.content for chunk in result.chunks]
-                chunk_embeddings = generate_embeddings_batch(chunk_texts)
-                
-                # Build chunks payload with enriched metadata
-                chunks_payload = []
-                for chunk, embedding in zip(result.chunks, chunk_embeddings):
-                    if embedding is None:
-                            logger.warning(f"⚠️ [Worker:{task_id}] Skipping empty chunk {chunk.chunk_index}")
-                            continue
 
-                    chunks_payload.append({
+                # Build chunks payload with enriched metadata
+                chunks_payload = [
+                    {
                         "content": chunk.content,
-                        "embedding": embedding,
+                        "embedding": all_embeddings[i],
                         "chunk_index": chunk.chunk_index,
-                        "metadata": {
-                            **chunk.metadata,
-                            "token_count": chunk.token_count,
-                        }
-                    })
-                
+                        "metadata": {**chunk.metadata, "token_count": chunk.token_count},
+                    }
+                    for i, chunk in enumerate(result.chunks, offset)
+                    if all_embeddings[i] is not None
+                ]
+                offset += len(result.chunks)
+                if len(chunks_payload) < len(result.chunks):
+                    logger.warning(f"⚠️ [Worker:{task_id}] Skipped {len(result.chunks) - len(chunks_payload)} empty chunks in {doc_title}")
+
                 # Calculate file size for quota tracking
-                content_size = len(doc_content.encode('utf-8'))
-                
+                content_size = len(doc.page_content.encode('utf-8'))
+
                 # Document metadata
                 doc_metadata = {
                     **doc.metadata,
                     "file_type": result.file_type,
                     "total_tokens": result.total_tokens,
                     "total_chunks": len(result.chunks),
+                    "content_hash": content_hash,
                     **(result.metadata or {}),
                 }
-                
-                # ATOMIC RPC: Insert document with all chunks and file size
-                rpc_result = supabase.rpc("ingest_document_with_chunks", {
-                    "p_user_id": user_id,
-                    "p_doc_title": doc_title,
-                    "p_source_type": source_type_enum,
-                    "p_source_url": source_url,
-                    "p_metadata": json.dumps(doc_metadata),
-                    "p_chunks": json.dumps(chunks_payload),
-                    "p_file_size_bytes": content_size
-                }).execute()
-                
-                if rpc_result.data:
-                    doc_id = rpc_result.data
-                    processed_docs.append(str(doc_id))
-                    logger.info(f"📄 [Worker:{task_id}] {doc_title}: {len(result.chunks)} chunks via {result.file_type}")
-                    
-                    # Update progress per document
-                    if job_id:
-                        update_job_status(supabase, job_id, "processing", len(processed_docs))
 
+                documents.append({
+                    "title": doc_title,
+                    "source_url": doc.metadata.get('source_url'),
+                    "metadata": doc_metadata,
+                    "file_size_bytes": content_size,
+                    "chunks": chunks_payload,
+                })
+                logger.info(f"📄 [Worker:{task_id}] {doc_title}: {len(result.chunks)} chunks via {result.file_type}")
+            
+            # Store: documents that fit one request share batched atomic RPCs
+            # (one round-trip per CHUNK_INSERT_BATCH chunks, not per document);
+            # bigger ones go through the paged single-document path
+            doc_ids = list(dict.fromkeys(existing[k] for k in keys if k in existing))
+            small_docs = [d for d in documents if len(d["chunks"]) <= CHUNK_INSERT_BATCH]
+            for batch in _iter_document_batches(small_docs):
+                doc_ids.extend(str(doc_id) for doc_id in store_documents(supabase, user_id, source_type_enum, batch))
+                # Progress per batch (coalesced, written in the background)
+                progress.update(processed_files=len(results) + len(doc_ids))
+            
+            for d in documents:
+                if len(d["chunks"]) <= CHUNK_INSERT_BATCH:
+                    continue
+                # ATOMIC RPC: Insert document with chunks and file size (paged)
+                doc_id = store_document_with_chunks(
+                    supabase, user_id, d["title"], source_type_enum, d["source_url"],
+                    d["metadata"], d["chunks"], d["file_size_bytes"]
+                )
+                if doc_id:
+                    doc_ids.append(str(doc_id))
+                    progress.update(processed_files=len(results) + len(doc_ids))
                 else:
-                    logger.warning(f"⚠️ [Worker:{task_id}] RPC returned no data for {doc_title}")
-                    
-            return processed_docs
-
-        # Execute stream processing
-        import asyncio
-        
-        # 3. Process each document through DocumentProcessorFactory
+                    logger.warning(f"⚠️ [Worker:{task_id}] RPC returned no data for {d['title']}")
+            return doc_ids
         
-        results = asyncio.run(process_stream())
+        # Define async stream consumer
+        async def process_stream(progress):
+            """
+            Parse streamed documents and embed/store them window by window.
+            
+            Parsing runs on the parser pool so it overlaps with fetching the
+            next document from the provider. Once CONNECTOR_STORE_WINDOW_CHUNKS
+            chunks are parsed, that window is embedded and stored on a worker
+            thread while the stream continues; at most one window is in
+            flight, so memory stays bounded however large the folder is.
+            """
+            loop = asyncio.get_running_loop()
+            stream = await connector.ingest(ingest_config)
+            parsing = deque()  # (doc, parse future), in stream order
+            window = []
+            window_chunks = 0
+            storing = None
+            
+            async def take_parsed(wait: bool):
+                """
+                Move parsed documents (in order) from `parsing` into `window`,
+                flushing every full window. Waits for parses when `wait` is set
+                or more than CONNECTOR_PARSE_AHEAD are queued (backpressure).
+                """
+                nonlocal window_chunks
+                while parsing and (wait or parsing[0][1].done() or len(parsing) > CONNECTOR_PARSE_AHEAD):
+                    doc, future = parsing.popleft()
+                    result = await future
+                    if not result.chunks:
+                        logger.warning(f"⚠️ [Worker:{task_id}] No chunks from: {doc.metadata.get('title', 'Untitled')}")
+                        continue
+                    window.append((doc, result))
+                    window_chunks += len(result.chunks)
+                    if window_chunks >= CONNECTOR_STORE_WINDOW_CHUNKS:
+                        await flush()
+            
+            async def flush():
+                """Hand the current window to a storer once the previous one is done."""
+                nonlocal window, window_chunks, storing
+                if storing is not None:
+                    results.extend(await storing)
+                storing = loop.run_in_executor(None, embed_and_store, window, progress)
+                window, window_chunks = [], 0
+            
+            async for doc in stream:
+                parsing.append((doc, loop.run_in_executor(_document_parser, parse_document, doc)))
+                await take_parsed(wait=False)
+            
+            await take_parsed(wait=True)
+            if window:
+                await flush()
+            if storing is not None:
+                results.extend(await storing)
+
+        # 3. Parse, embed and store every document from the stream
+        results = []
+        with StatusPublisher(
+            lambda **fields: job_id and update_job_status(supabase, job_id, "processing", **fields),
+            JOB_PROGRESS_INTERVAL_SECONDS
+        ) as progress:
+            asyncio.run(process_stream(progress))
         
         if not results:
             logger.warning(f"📥 [Worker:{task_id}] No content processed")
             update_job_status(supabase, job_id, "completed", 0)
             return {"status": "skipped", "message": "No content processed"}
         
-        # Mark job as completed
-        if job_id:
-            update_job_status(supabase, job_id, "completed", len(results))
-        
-        # Create "success" notification
-        create_notification(
-            supabase,
-            user_id,
-            f"Ingestion Complete",
-            f"Successfully processed {len(results)} documents from {connector_type.replace('_', ' ').title()}",
-            "success",
-            {"job_id": job_id, "connector": connector_type, "document_count": len(results)}
+        # Mark job as completed, notify and email (fail-safe, respects user preferences)
+        run_concurrently(
+            lambda: job_id and update_job_status(supabase, job_id, "completed", len(results)),
+            lambda: create_notification(
+                supabase,
+                user_id,
+                f"Ingestion Complete",
+                f"Successfully processed {len(results)} documents from {provider_pretty}",
+                "success",
+                {"job_id": job_id, "connector": connector_type, "document_count": len(results)},
+                deferred=True
+            ),
+            lambda: queue_completion_email(user_id, len(results))
         )
         
-        # Send email notification (fail-safe, respects user preferences)
-        send_email_notification(supabase, user_id, len(results))
-        
         logger.info(f"✅ [Worker:{task_id}] Ingestion complete: {len(results)} documents (via DocumentProcessorFactory)")
         return {"status": "success", "ingested_ids": results, "task_id": task_id, "job_id": job_id}
         
     except Exception as e:
+        # Let autoretry handle transient errors before failing the job
+        if isinstance(e, self.autoretry_for) and self.request.retries < self.max_retries:
+            logger.warning(f"⏳ [Worker:{task_id}] Ingestion attempt failed, will retry: {e}")
+            raise
+
         logger.error(f"❌ [Worker:{task_id}] Ingestion failed: {e}")
-        
-        # Update job status to failed
-        if job_id:
-            update_job_status(supabase, job_id, "failed", 0, str(e))
-        
-        # Create "error" notification
-        create_notification(
-            supabase,
-            user_id,
-            f"Ingestion Failed",
-            f"Failed to process files from {connector_type.replace('_', ' ').title()}: {str(e)[:200]}",
-            "error",
-            {"job_id": job_id, "connector": connector_type, "error": str(e)}
-        )
-        
-        # Re-raise for Celery retry mechanism
-        raise
-        
-    except Exception as e:
-        logger.error(f"❌ [Worker:{task_id}] Ingestion failed: {e}")
-        
-        # Update job status to failed
-        if job_id:
-            update_job_status(supabase, job_id, "failed", 0, str(e))
-        
-        # Create "error" notification
-        create_notification(
-            supabase,
-            user_id,
-            f"Ingestion Failed",
-            f"Failed to process files from {connector_type.replace('_', ' ').title()}: {str(e)[:200]}",
-            "error",
-            {"job_id": job_id, "connector": connector_type, "error": str(e)}
+
+        error = str(e)
+        # Update job status to failed and create "error" notification
+        run_concurrently(
+            lambda: job_id and update_job_status(supabase, job_id, "failed", 0, error),
+            lambda: create_notification(
+                supabase,
+                user_id,
+                f"Ingestion Failed",
+                f"Failed to process files from {provider_pretty}: {error[:200]}",
+                "error",
+                {"job_id": job_id, "connector": connector_type, "error": error}
+            )
         )
         
         # Re-raise for Celery retry mechanism
@@ -676,6 +1547,56 @@ def ingest_connector_task(
 # WEB CRAWL TASK
 # ============================================================
 
+# Concurrent page fetches per crawl. Politeness is enforced per host by
+# HostThrottle, so a single-host crawl is paced by its delay, not this cap.
+CRAWL_FETCH_CONCURRENCY = 16
+
+# Seconds between request starts to the same host (uniformly jittered)
+CRAWL_PAGE_DELAY = (1.0, 2.0)
+
+# Pages submitted to the fetch pool at once. Newly discovered links wait in
+# a plain deque, so the pool's work queue never holds the whole frontier.
+CRAWL_MAX_IN_FLIGHT = CRAWL_FETCH_CONCURRENCY * 2
+
+# Fetched pages are embedded and stored in windows of this many pages, so a
+# large crawl never holds every page's text until the end
+CRAWL_STORE_WINDOW = 100
+
+# Minimum seconds between progress writes while pages are being processed.
+# The terminal status write always happens regardless.
+CRAWL_STATUS_INTERVAL_SECONDS = 10
+
+
+class HostThrottle:
+    """
+    Per-host politeness for threaded crawling.
+    
+    Hands out request start times spaced by a jittered delay per host.
+    Callers sleep until their slot *before* the request, without holding
+    a lock, so a slow response never delays the next slot and different
+    hosts never wait on each other.
+    """
+    
+    def __init__(self, delay_range: tuple):
+        self.delay_range = delay_range
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, url: str) -> None:
+        """Block until the next polite slot for the URL's host."""
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + random.uniform(*self.delay_range)
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# Recursive discovery stops once this many URLs are known (runaway guard)
+DISCOVERY_MAX_URLS = 10000
+
+
 def update_crawl_status(
     supabase,
     crawl_id: str,
@@ -687,7 +1608,8 @@ def update_crawl_status(
 ):
     """Helper to update web crawl config status."""
     try:
-        update_data = {"updated_at": datetime.now(timezone.utc).isoformat()}
+        now = datetime.now(timezone.utc).isoformat()
+        update_data = {"updated_at": now}
         
         if status:
             update_data["status"] = status
@@ -700,7 +1622,7 @@ def update_crawl_status(
         if error_message:
             update_data["error_message"] = error_message
         if status == "completed":
-            update_data["completed_at"] = datetime.now(timezone.utc).isoformat()
+            update_data["completed_at"] = now
             
         supabase.table("web_crawl_configs").update(update_data).eq("id", crawl_id).execute()
         logger.info(f"🕸️ [Crawl:{crawl_id}] Status: {status}, Ingested: {pages_ingested}")
@@ -740,9 +1662,6 @@ def crawl_web_task(
             - 'max_depth': int (1-10)
             - 'respect_robots': bool
     """
-    import time
-    import random
-    from collections import deque
     
     task_id = self.request.id
     crawl_id = crawl_config.get("crawl_id")
@@ -755,27 +1674,27 @@ def crawl_web_task(
     
     supabase = get_supabase()
     
-    # Import connector
-    from connectors.web import WebConnector
-    connector = WebConnector()
+    # One keep-alive session for the whole crawl (discovery + page fetches)
+    session = create_http_session()
+    connector = WebConnector(session=session)
     
     # Track progress
     urls_to_process: List[str] = []
-    processed_urls: set = set()
     ingested_count = 0
     failed_count = 0
     
     try:
         # ===== PHASE 1: DISCOVERY =====
-        if crawl_id:
-            update_crawl_status(supabase, crawl_id, status="discovering")
-        
-        create_notification(
-            supabase, user_id,
-            "Web Crawl Started",
-            f"Discovering pages from {root_url}",
-            "info",
-            {"crawl_id": crawl_id, "crawl_type": crawl_type}
+        run_concurrently(
+            lambda: crawl_id and update_crawl_status(supabase, crawl_id, status="discovering"),
+            lambda: create_notification(
+                supabase, user_id,
+                "Web Crawl Started",
+                f"Discovering pages from {root_url}",
+                "info",
+                {"crawl_id": crawl_id, "crawl_type": crawl_type},
+                deferred=True
+            )
         )
         
         if crawl_type == "sitemap":
@@ -784,32 +1703,20 @@ def crawl_web_task(
             urls_to_process = connector.parse_sitemap(root_url)
             
         elif crawl_type == "recursive":
-            # BFS crawl with depth limit
+            # Links are followed while pages are ingested (phase 2), so the
+            # first page is stored without waiting for the whole site map.
             logger.info(f"🔄 [Crawl] Recursive crawl from: {root_url}")
-            queue = deque([(root_url, 0)])  # (url, depth)
-            seen = {root_url}
-            
-            while queue:
-                url, depth = queue.popleft()
-                urls_to_process.append(url)
-                
-                if depth < max_depth:
-                    # Fetch page and extract links
-                    html = connector.fetch_html(url)
-                    if html:
-                        links = connector.extract_links(html, url)
-                        for link in links:
-                            if link not in seen:
-                                seen.add(link)
-                                queue.append((link, depth + 1))
-                    
-                    # Rate limit during discovery
-                    time.sleep(random.uniform(0.5, 1.0))
+            urls_to_process = [root_url]
             
         else:  # single
             urls_to_process = [root_url]
         
-        total_pages = len(urls_to_process)
+        # Dedupe on canonical form: /a, /a/, /a?utm_source=x, /A.com/a are one page
+        unique_urls = list(dict.fromkeys(canonicalize_url(url) for url in urls_to_process))
+        if len(unique_urls) > DISCOVERY_MAX_URLS:
+            logger.warning(f"⚠️ [Crawl] Discovery limit reached ({DISCOVERY_MAX_URLS})")
+            unique_urls = unique_urls[:DISCOVERY_MAX_URLS]
+        total_pages = len(unique_urls)
         logger.info(f"📊 [Crawl] Discovered {total_pages} URLs to process")
         
         if crawl_id:
@@ -820,83 +1727,134 @@ def crawl_web_task(
                 update_crawl_status(supabase, crawl_id, status="completed", total_pages=0)
             return {"status": "completed", "message": "No pages found to crawl"}
         
-        # ===== PHASE 2: PROCESSING =====
+        # ===== PHASE 2: PROCESSING (concurrent, polite per host) =====
+        # The frontier is bounded: `seen` (and so `pending`, a subset of it)
+        # stops growing at DISCOVERY_MAX_URLS, at most CRAWL_MAX_IN_FLIGHT
+        # pages are in the pool, and fetched pages are stored every
+        # CRAWL_STORE_WINDOW pages instead of being held until the end.
         documents = []
-        
-        for i, url in enumerate(urls_to_process):
-            if url in processed_urls:
-                continue
-            processed_urls.add(url)
-            
-            try:
-                # Rate limiting (polite crawling)
-                if i > 0:
-                    time.sleep(random.uniform(1.0, 2.0))
-                
-                # Ingest this URL
-                docs = connector.ingest({
+        stored_count = 0
+        follow_links = crawl_type == "recursive"
+        seen = set(unique_urls)
+        pending = deque((url, 0) for url in unique_urls)
+        limit_logged = False
+        
+        # Rate limiting (polite crawling): request starts to one domain are
+        # spaced out, while unrelated domains are fetched in parallel. The
+        # session's Retry also honours Retry-After on 429/503.
+        page_throttle = HostThrottle(CRAWL_PAGE_DELAY)
+        
+        def crawl_page(url: str, depth: int):
+            """Fetch one page once; returns (documents, outgoing links)."""
+            page_throttle.wait(url)
+            if not follow_links or connector.is_youtube_url(url):
+                return connector.ingest_sync({
                     "item_ids": [url],
                     "respect_robots": respect_robots
-                })
+                }), []
+            
+            if respect_robots and not connector.check_robots_txt(url, connector.USER_AGENT):
+                logger.info(f"🚫 [Crawl] Blocked by robots.txt: {url}")
+                return [], []
+            
+            # The same HTML feeds both link discovery and text extraction
+            html = connector.fetch_html(url)
+            if not html:
+                return [], []
+            links = connector.extract_links(html, url) if depth < max_depth else []
+            document = connector.document_from_html(url, html)
+            return ([document] if document else []), links
+        
+        def write_progress(**fields):
+            if crawl_id:
+                update_crawl_status(supabase, crawl_id, **fields)
+        
+        def store_window(window) -> int:
+            """Embed and store one window of fetched pages (one chunk each)."""
+            chunk_embeddings = embed_with_cache(supabase, [d.page_content for d in window])
+            pages = [
+                {
+                    "title": doc.metadata.get("title", "Web Page"),
+                    "source_url": doc.metadata.get("source_url"),
+                    "metadata": doc.metadata if isinstance(doc.metadata, dict) else {},
+                    "file_size_bytes": len(doc.page_content.encode('utf-8')),
+                    # Single chunk per page
+                    "chunks": [{"content": doc.page_content, "embedding": embedding, "chunk_index": 0}]
+                }
+                for doc, embedding in zip(window, chunk_embeddings)
+                if embedding is not None
+            ]
+            if len(pages) < len(window):
+                logger.warning(f"⚠️ [Crawl] Skipped {len(window) - len(pages)} empty pages")
+            
+            # Batched RPC: many pages per transaction instead of one round-trip each
+            doc_ids = store_documents(supabase, user_id, "web", pages)
+            logger.info(f"📄 [Crawl] Stored {len(doc_ids)} pages")
+            return len(doc_ids)
+        
+        # Progress is published from a background thread at most every
+        # CRAWL_STATUS_INTERVAL_SECONDS; leaving the block flushes it.
+        with ThreadPoolExecutor(max_workers=CRAWL_FETCH_CONCURRENCY) as pool, \
+                StatusPublisher(write_progress, CRAWL_STATUS_INTERVAL_SECONDS) as progress:
+            in_flight = {}
+            
+            while pending or in_flight:
+                while pending and len(in_flight) < CRAWL_MAX_IN_FLIGHT:
+                    url, depth = pending.popleft()
+                    in_flight[pool.submit(crawl_page, url, depth)] = (url, depth)
                 
-                if docs:
-                    documents.extend(docs)
-                    ingested_count += 1
-                    logger.info(f"✅ [Crawl] Ingested ({ingested_count}/{total_pages}): {url}")
-                else:
-                    failed_count += 1
-                    logger.warning(f"⚠️ [Crawl] No content from: {url}")
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = in_flight.pop(future)
+                    try:
+                        docs, links = future.result()
+                        
+                        for link in links:
+                            if len(seen) >= DISCOVERY_MAX_URLS:
+                                if not limit_logged:
+                                    logger.warning(f"⚠️ [Crawl] Discovery limit reached ({DISCOVERY_MAX_URLS})")
+                                    limit_logged = True
+                                break
+                            link = canonicalize_url(link)
+                            if link not in seen:
+                                seen.add(link)
+                                pending.append((link, depth + 1))
+                        
+                        if docs:
+                            documents.extend(docs)
+                            ingested_count += 1
+                            logger.info(f"✅ [Crawl] Ingested ({ingested_count}/{len(seen)}): {url}")
+                        else:
+                            failed_count += 1
+                            logger.warning(f"⚠️ [Crawl] No content from: {url}")
+                        
+                    except Exception as e:
+                        failed_count += 1
+                        logger.error(f"❌ [Crawl] Failed to process {url}: {e}")
                 
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"❌ [Crawl] Failed to process {url}: {e}")
-            
-            # Update progress every 5 pages
-            if crawl_id and (i + 1) % 5 == 0:
-                update_crawl_status(
-                    supabase, crawl_id,
+                if len(documents) >= CRAWL_STORE_WINDOW:
+                    stored_count += store_window(documents)
+                    documents = []
+                
+                progress.update(
+                    total_pages=len(seen),
                     pages_ingested=ingested_count,
                     pages_failed=failed_count
                 )
         
-        # ===== PHASE 3: EMBEDDING & STORAGE (ATOMIC RPC) =====
+        total_pages = len(seen)
+        
+        # ===== PHASE 3: STORE THE LAST PARTIAL WINDOW =====
         if documents:
-            logger.info(f"🔢 [Crawl] Embedding {len(documents)} documents...")
-            
-            from services.embeddings import generate_embeddings_batch
-            
-            chunk_texts = [d.page_content for d in documents]
-            chunk_embeddings = generate_embeddings_batch(chunk_texts)
-            
-            # Store in database using ATOMIC RPC
-            for i, doc in enumerate(documents):
-                # Prepare chunk payload for atomic RPC (single chunk per page)
-                chunks_payload = [{
-                    "content": doc.page_content,
-                    "embedding": chunk_embeddings[i],
-                    "chunk_index": 0
-                }]
-                
-                # ATOMIC RPC: Insert document with all chunks in single transaction
-                content_size = len(doc.page_content.encode('utf-8'))
-                rpc_result = supabase.rpc("ingest_document_with_chunks", {
-                    "p_user_id": user_id,
-                    "p_doc_title": doc.metadata.get("title", "Web Page"),
-                    "p_source_type": "web",
-                    "p_source_url": doc.metadata.get("source_url"),
-                    "p_metadata": json.dumps(doc.metadata if isinstance(doc.metadata, dict) else {}),
-                    "p_chunks": json.dumps(chunks_payload),
-                    "p_file_size_bytes": content_size
-                }).execute()
-                
-                if rpc_result.data:
-                    logger.debug(f"📄 [Crawl] Stored via RPC: {doc.metadata.get('title', 'Web Page')}")
+            stored_count += store_window(documents)
+        logger.info(f"🔢 [Crawl] Stored {stored_count} pages in total")
         
         # ===== COMPLETE =====
         if crawl_id:
             update_crawl_status(
                 supabase, crawl_id,
                 status="completed",
+                total_pages=total_pages,
                 pages_ingested=ingested_count,
                 pages_failed=failed_count
             )
@@ -906,7 +1864,8 @@ def crawl_web_task(
             "Web Crawl Complete",
             f"Successfully ingested {ingested_count} pages from {root_url}",
             "success",
-            {"crawl_id": crawl_id, "pages_ingested": ingested_count}
+            {"crawl_id": crawl_id, "pages_ingested": ingested_count},
+            deferred=True
         )
         
         logger.info(f"✅ [Worker:{task_id}] Crawl complete: {ingested_count} pages ingested")
@@ -922,9 +1881,12 @@ def crawl_web_task(
         logger.error(f"❌ [Worker:{task_id}] Crawl failed: {e}")
         
         if crawl_id:
+            # Final write carries the counters the coalesced updates may have skipped
             update_crawl_status(
                 supabase, crawl_id,
                 status="failed",
+                pages_ingested=ingested_count,
+                pages_failed=failed_count,
                 error_message=str(e)
             )
         
@@ -937,312 +1899,43 @@ def crawl_web_task(
         )
         
         raise
+    finally:
+        session.close()
 
 
 # ============================================================
-# DISTRIBUTED CRAWLER: Master-Worker Pattern
+# SCHEDULED RE-CRAWL TASK (Living Knowledge)
 # ============================================================
 
-@celery_app.task(
-    bind=True,
-    autoretry_for=(ConnectionError, TimeoutError),
-    retry_backoff=True,
-    max_retries=2
-)
-def crawl_discovery_task(
-    self,
-    user_id: str,
-    root_url: str,
-    crawl_config: Dict[str, Any]
-):
+# Time until the next scheduled re-crawl, per refresh_interval
+RECRAWL_INTERVALS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+    "monthly": timedelta(days=30),
+}
+
+
+@celery_app.task(bind=True)
+def check_scheduled_crawls(self):
     """
-    Master task for distributed web crawling.
-    
-    Discovers URLs (via sitemap or recursive) and dispatches
-    individual page processing tasks using Celery groups.
+    Celery Beat task to check for scheduled re-crawls.
     
-    This pattern prevents Celery Soft Time Limit issues when
-    crawling large sites (10,000+ pages).
+    Runs hourly via Celery Beat.
+    Finds completed crawls that are due for refresh and triggers them.
     """
-    from celery import group
-    from collections import deque
-    import time
-    import random
     
     task_id = self.request.id
-    crawl_id = crawl_config.get("crawl_id")
-    crawl_type = crawl_config.get("crawl_type", "single")
-    max_depth = min(crawl_config.get("max_depth", 1), 10)
-    respect_robots = crawl_config.get("respect_robots", True)
-    
-    logger.info(f"🕸️ [Discovery:{task_id}] Starting distributed crawl for user {user_id}")
-    logger.info(f"🕸️ [Discovery:{task_id}] URL: {root_url}, Type: {crawl_type}, Depth: {max_depth}")
+    logger.info(f"⏰ [Scheduler:{task_id}] Checking for scheduled re-crawls...")
     
     supabase = get_supabase()
-    
-    try:
-        # Import connector
-        from connectors.web import WebConnector
-        connector = WebConnector()
-        
-        # Update status
-        if crawl_id:
-            update_crawl_status(supabase, crawl_id, status="discovering")
-        
-        create_notification(
-            supabase, user_id,
-            "Web Crawl Started",
-            f"Discovering pages from {root_url}",
-            "info",
-            {"crawl_id": crawl_id, "crawl_type": crawl_type}
-        )
-        
-        # ===== DISCOVERY PHASE =====
-        urls_to_process: List[str] = []
-        
-        if crawl_type == "sitemap":
-            logger.info(f"🗺️ [Discovery] Parsing sitemap: {root_url}")
-            urls_to_process = connector.parse_sitemap(root_url)
-            
-        elif crawl_type == "recursive":
-            logger.info(f"🔄 [Discovery] Recursive crawl from: {root_url}")
-            queue = deque([(root_url, 0)])
-            seen = {root_url}
-            
-            while queue:
-                url, depth = queue.popleft()
-                urls_to_process.append(url)
-                
-                if depth < max_depth:
-                    html = connector.fetch_html(url)
-                    if html:
-                        links = connector.extract_links(html, url)
-                        for link in links:
-                            if link not in seen:
-                                seen.add(link)
-                                queue.append((link, depth + 1))
-                    
-                    # Rate limit during discovery
-                    time.sleep(random.uniform(0.3, 0.6))
-        else:
-            urls_to_process = [root_url]
-        
-        total_pages = len(urls_to_process)
-        logger.info(f"📊 [Discovery] Discovered {total_pages} URLs")
-        
-        if crawl_id:
-            update_crawl_status(supabase, crawl_id, status="processing", total_pages=total_pages)
-        
-        if total_pages == 0:
-            if crawl_id:
-                update_crawl_status(supabase, crawl_id, status="completed", total_pages=0)
-            return {"status": "completed", "message": "No pages found"}
-        
-        # ===== DISPATCH PHASE: Parallel processing =====
-        # Create a group of tasks for parallel execution
-        page_tasks = group(
-            process_page_task.s(
-                user_id=user_id,
-                url=url,
-                crawl_id=crawl_id,
-                respect_robots=respect_robots
-            ) for url in urls_to_process
-        )
-        
-        # Execute all tasks in parallel
-        result = page_tasks.apply_async()
-        
-        logger.info(f"🚀 [Discovery:{task_id}] Dispatched {total_pages} page tasks")
-        
-        return {
-            "status": "dispatched",
-            "crawl_id": crawl_id,
-            "total_pages": total_pages,
-            "group_id": str(result.id)
-        }
-        
-    except Exception as e:
-        logger.error(f"❌ [Discovery:{task_id}] Failed: {e}")
-        
-        if crawl_id:
-            update_crawl_status(
-                supabase, crawl_id,
-                status="failed",
-                error_message=str(e)
-            )
-        
-        create_notification(
-            supabase, user_id,
-            "Web Crawl Failed",
-            f"Discovery failed for {root_url}: {str(e)[:200]}",
-            "error",
-            {"crawl_id": crawl_id, "error": str(e)}
-        )
-        
-        raise
-
-
-@celery_app.task(
-    bind=True,
-    autoretry_for=(ConnectionError, TimeoutError),
-    retry_backoff=True,
-    max_retries=3,
-    rate_limit='10/s'  # Rate limit: max 10 pages per second
-)
-def process_page_task(
-    self,
-    user_id: str,
-    url: str,
-    crawl_id: str = None,
-    respect_robots: bool = True
-):
-    """
-    Worker task for processing a single web page.
-    
-    Downloads, parses, embeds, and stores a single URL.
-    Uses rate limiting to be polite to target servers.
-    """
-    task_id = self.request.id
-    logger.info(f"📄 [Page:{task_id}] Processing: {url}")
-    
-    supabase = get_supabase()
-    
-    try:
-        from connectors.web import WebConnector
-        from services.parsers import DocumentProcessorFactory
-        
-        connector = WebConnector()
-        
-        # Fetch and parse page
-        docs = connector.ingest({
-            "item_ids": [url],
-            "respect_robots": respect_robots
-        })
-        
-        if not docs:
-            logger.warning(f"⚠️ [Page:{task_id}] No content from: {url}")
-            return {"status": "skipped", "url": url}
-        
-        # Get page content and title
-        page_content = docs[0].page_content if docs else ""
-        page_title = docs[0].metadata.get("title", "Web Page") if docs else "Web Page"
-        page_metadata = docs[0].metadata if docs else {}
-        
-        # Process using MarkdownProcessor (treats web content as markdown)
-        result = DocumentProcessorFactory.process_web_content(page_content, url)
-        
-        if not result.chunks:
-            logger.warning(f"⚠️ [Page:{task_id}] No chunks generated from: {url}")
-            return {"status": "skipped", "url": url}
-        
-        # Embed
-        from services.embeddings import generate_embeddings_batch
-        
-        chunk_texts = [chunk.content for chunk in result.chunks]
-        chunk_embeddings = generate_embeddings_batch(chunk_texts)
-        
-        # Build chunks payload with enriched metadata
-        chunks_payload = []
-        failed_chunks = 0
-        for chunk, embedding in zip(result.chunks, chunk_embeddings):
-            if embedding is None:
-                failed_chunks += 1
-                logger.warning(f"⚠️ [Page:{task_id}] Skipped chunk {chunk.chunk_index} for {url} due to failed embedding")
-                continue
-                
-            chunks_payload.append({
-                "content": chunk.content,
-                "embedding": embedding,
-                "chunk_index": chunk.chunk_index,
-                "metadata": {
-                    **chunk.metadata,
-                    "token_count": chunk.token_count,
-                }
-            })
-        
-        # Check for partial failure
-        if failed_chunks > 0:
-            total_chunks = len(result.chunks)
-            if failed_chunks / total_chunks > 0.5:
-                logger.error(f"❌ [Page:{task_id}] High embedding failure rate: {failed_chunks}/{total_chunks} chunks failed for {url}")
-        
-        # Document metadata
-        doc_metadata = {
-            **page_metadata,
-            "file_type": "web",
-            "total_tokens": result.total_tokens,
-            "total_chunks": len(result.chunks),
-        }
-        
-        # Store using atomic RPC
-        content_size = len(html_content.encode('utf-8')) if 'html_content' in dir() else 0
-        rpc_result = supabase.rpc("ingest_document_with_chunks", {
-            "p_user_id": user_id,
-            "p_doc_title": page_title,
-            "p_source_type": "web",
-            "p_source_url": url,
-            "p_metadata": json.dumps(doc_metadata),
-            "p_chunks": json.dumps(chunks_payload),
-            "p_file_size_bytes": content_size
-        }).execute()
-        
-        logger.info(f"✅ [Page:{task_id}] Stored: {url} ({len(result.chunks)} chunks)")
-        
-        # Update crawl progress
-        if crawl_id:
-            try:
-                supabase.rpc("increment_crawl_counter", {
-                    "p_crawl_id": crawl_id,
-                    "p_field": "pages_ingested"
-                }).execute()
-            except Exception:
-                pass  # Non-critical
-        
-        return {"status": "success", "url": url}
-        
-    except Exception as e:
-        logger.error(f"❌ [Page:{task_id}] Failed {url}: {e}")
-        
-        # Increment failure counter
-        if crawl_id:
-            try:
-                supabase.rpc("increment_crawl_counter", {
-                    "p_crawl_id": crawl_id,
-                    "p_field": "pages_failed"
-                }).execute()
-            except Exception:
-                pass
-        
-        # Send failure email for web page (fail-safe)
-        send_failure_email_notification(supabase, user_id, url, str(e))
-        
-        raise
-
-
-# ============================================================
-# SCHEDULED RE-CRAWL TASK (Living Knowledge)
-# ============================================================
-
-@celery_app.task(bind=True)
-def check_scheduled_crawls(self):
-    """
-    Celery Beat task to check for scheduled re-crawls.
-    
-    Runs hourly via Celery Beat.
-    Finds completed crawls that are due for refresh and triggers them.
-    """
-    from datetime import timedelta
-    
-    task_id = self.request.id
-    logger.info(f"⏰ [Scheduler:{task_id}] Checking for scheduled re-crawls...")
-    
-    supabase = get_supabase()
-    now = datetime.now(timezone.utc)
+    now = datetime.now(timezone.utc)
     
     try:
         # Find crawls that are due for refresh
         # Status = completed, refresh_interval != never, next_crawl_at <= now
-        result = supabase.table("web_crawl_configs").select("*").eq(
+        result = supabase.table("web_crawl_configs").select(
+            "id, user_id, root_url, crawl_type, max_depth, respect_robots_txt, refresh_interval"
+        ).eq(
             "status", "completed"
         ).neq(
             "refresh_interval", "never"
@@ -1254,68 +1947,63 @@ def check_scheduled_crawls(self):
             logger.info(f"⏰ [Scheduler:{task_id}] No crawls due for refresh")
             return {"status": "ok", "crawls_triggered": 0}
         
-        crawls_triggered = 0
+        # Build every reset row and crawl signature first, then reset all
+        # rows with one set-based RPC and publish all tasks as one group.
+        rows = []
+        signatures = {}
         
         for config in result.data:
             try:
                 crawl_id = str(config["id"])
-                user_id = str(config["user_id"])
-                root_url = config["root_url"]
-                crawl_type = config["crawl_type"]
-                max_depth = config["max_depth"]
                 refresh_interval = config["refresh_interval"]
                 
-                logger.info(f"🔄 [Scheduler] Triggering re-crawl: {root_url} ({refresh_interval})")
-                
-                # Reset status to pending for re-crawl
-                supabase.table("web_crawl_configs").update({
-                    "status": "pending",
-                    "pages_ingested": 0,
-                    "pages_failed": 0,
-                    "total_pages_found": 0,
-                    "error_message": None,
-                    "updated_at": now.isoformat()
-                }).eq("id", crawl_id).execute()
+                logger.info(f"🔄 [Scheduler] Triggering re-crawl: {config['root_url']} ({refresh_interval})")
                 
-                # Trigger the crawl task
-                task = crawl_web_task.delay(
-                    user_id=user_id,
-                    root_url=root_url,
-                    crawl_config={
-                        "crawl_id": crawl_id,
-                        "crawl_type": crawl_type,
-                        "max_depth": max_depth,
-                        "respect_robots": config.get("respect_robots_txt", True),
-                        "is_recrawl": True  # Flag for re-crawl
-                    }
+                # Task ID is assigned up front so it is stored with the reset
+                crawl_task_id = str(uuid.uuid4())
+                signatures[crawl_id] = crawl_web_task.signature(
+                    kwargs={
+                        "user_id": str(config["user_id"]),
+                        "root_url": config["root_url"],
+                        "crawl_config": {
+                            "crawl_id": crawl_id,
+                            "crawl_type": config["crawl_type"],
+                            "max_depth": config["max_depth"],
+                            "respect_robots": config.get("respect_robots_txt", True),
+                            "is_recrawl": True  # Flag for re-crawl
+                        }
+                    },
+                    task_id=crawl_task_id
                 )
                 
-                # Calculate next_crawl_at based on interval
-                if refresh_interval == "daily":
-                    next_crawl = now + timedelta(days=1)
-                elif refresh_interval == "weekly":
-                    next_crawl = now + timedelta(weeks=1)
-                elif refresh_interval == "monthly":
-                    next_crawl = now + timedelta(days=30)
-                else:
-                    next_crawl = None
-                
-                # Update with new task ID and next crawl time
-                update_data = {
-                    "celery_task_id": task.id,
-                    "last_crawl_at": now.isoformat()
-                }
-                if next_crawl:
-                    update_data["next_crawl_at"] = next_crawl.isoformat()
-                
-                supabase.table("web_crawl_configs").update(update_data).eq("id", crawl_id).execute()
-                
-                crawls_triggered += 1
+                # Only the per-row values; the RPC sets the shared reset
+                # columns (status, counters, error, timestamps) itself
+                interval = RECRAWL_INTERVALS.get(refresh_interval)
+                rows.append({
+                    "id": crawl_id,
+                    "celery_task_id": crawl_task_id,
+                    "next_crawl_at": (now + interval).isoformat() if interval else None
+                })
                 
             except Exception as e:
                 logger.error(f"❌ [Scheduler] Failed to trigger re-crawl for {config.get('root_url')}: {e}")
                 continue
         
+        if not rows:
+            return {"status": "ok", "crawls_triggered": 0}
+        
+        # Reset before dispatch so a crawl's own status writes always win.
+        # Configs deleted or edited since the select are skipped by the RPC,
+        # so only the IDs it returns are dispatched.
+        reset = supabase.rpc("reset_scheduled_crawls", {
+            "p_rows": rows,
+            "p_now": now.isoformat()
+        }).execute()
+        reset_ids = [str(row_id) for row_id in (reset.data or [])]
+        if reset_ids:
+            group([signatures[crawl_id] for crawl_id in reset_ids if crawl_id in signatures]).apply_async()
+        crawls_triggered = len(reset_ids)
+        
         logger.info(f"✅ [Scheduler:{task_id}] Triggered {crawls_triggered} re-crawls")
         return {"status": "ok", "crawls_triggered": crawls_triggered}
         
@@ -1329,53 +2017,119 @@ def check_scheduled_crawls(self):
 # ============================================================
 # 
 # Master task (crawl_discovery_task):
-#   - Discovers all URLs (sitemap, recursive, single)
+#   - Discovers all URLs (sitemap, single) or seeds recursive discovery
 #   - Deduplicates against existing documents
-#   - Dispatches process_page_task for each URL via Celery Group
+#   - Dispatches process_page_task for each URL via Celery Chord
+#
+# Discovery task (discover_page_task):
+#   - Fetches one page of a recursive crawl and fans out its new links
+#   - Frontier is the broker queue, `seen` a Redis set (restart-safe)
+#   - The last one to finish dispatches the pages like the master does
 #
 # Worker task (process_page_task):
-#   - Processes a single URL
+#   - Fetches a single URL
 #   - Rate limited per domain
-#   - Saves via atomic RPC
+#   - Returns page content (no embedding, no DB write)
+#
+# Callback task (store_crawl_pages_task):
+#   - Embeds all pages in batched OpenAI calls
+#   - Saves via batched ingest_documents_with_chunks RPCs
 #
 
 # Redis key prefix for rate limiting
 RATE_LIMIT_PREFIX = "crawl_ratelimit:"
 RATE_LIMIT_WINDOW = 1  # seconds
 RATE_LIMIT_MAX_REQUESTS = 5  # max requests per window per domain
+RATE_LIMIT_RETRY_DELAY = (0.5, 2.0)  # seconds before a rate-limited page is retried
+RATE_LIMIT_MAX_RETRIES = 10  # then the page is fetched anyway
+
+# URLs per dispatched chord (one embed/store callback each)
+CRAWL_DISPATCH_BATCH = 500
+# Chords published at once during dispatch
+CRAWL_DISPATCH_CONCURRENCY = 8
+# Per-crawl-run batch counters (see record_crawl_batch)
+CRAWL_RUN_PREFIX = "crawl:run:"
+CRAWL_RUN_TTL_SECONDS = 86400
+# Per-run recursive discovery state: a hash with the crawl parameters, the
+# set of seen URLs and the set of URLs whose discover_page_task has not
+# finished yet (SREM makes finishing a page idempotent under redelivery)
+CRAWL_DISCOVERY_PREFIX = "crawl:discovery:"
+CRAWL_SEEN_PREFIX = "crawl:seen:"
+CRAWL_INFLIGHT_PREFIX = "crawl:inflight:"
+# Active discovery runs scored by last activity; a run idle for longer than
+# the stall timeout is finalized as failed by reap_stalled_discoveries
+CRAWL_DISCOVERY_RUNS_KEY = "crawl:discovery:runs"
+CRAWL_DISCOVERY_STALL_SECONDS = 15 * 60
+
+
+# URLs per `source_url=in.(...)` lookup (keeps the request URL short)
+DEDUP_LOOKUP_BATCH = 100
+
+
+def find_existing_source_urls(supabase, user_id: str, urls: List[str]) -> set:
+    """
+    Return the subset of `urls` the user already has documents for.
+    
+    Checks every URL (not just the first 1000) with fixed-size `in_`
+    lookups sent CRAWL_DISPATCH_CONCURRENCY at a time. A failed lookup is
+    logged and treated as "not ingested yet" (fail-open: the page is
+    crawled again rather than skipped).
+    """
+    def lookup(batch: List[str]) -> List[str]:
+        try:
+            res = supabase.table("documents").select("source_url").eq(
+                "user_id", user_id
+            ).in_("source_url", batch).execute()
+            return [d["source_url"] for d in res.data or [] if d.get("source_url")]
+        except Exception as e:
+            logger.warning(f"⚠️ [Dedup] Lookup failed for {len(batch)} URLs: {e}")
+            return []
+    
+    batches = list(_iter_batches(urls, DEDUP_LOOKUP_BATCH))
+    if not batches:
+        return set()
+    with ThreadPoolExecutor(max_workers=min(CRAWL_DISPATCH_CONCURRENCY, len(batches))) as pool:
+        return {url for found in pool.map(lookup, batches) for url in found}
 
 
 def get_domain_rate_limit_key(url: str) -> str:
     """Get Redis key for domain rate limiting."""
-    from urllib.parse import urlparse
     domain = urlparse(url).netloc
     return f"{RATE_LIMIT_PREFIX}{domain}"
 
 
+# Fixed-window counter in one atomic round-trip: count this request, start
+# the window on the first one, allow while within the limit.
+RATE_LIMIT_SCRIPT = """
+local n = redis.call('INCR', KEYS[1])
+if n == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+if n > tonumber(ARGV[2]) then
+    return 0
+end
+return 1
+"""
+
+_rate_limit_script = None
+
+
 def check_rate_limit(supabase, url: str) -> bool:
     """
     Check if we can make a request to this domain.
-    Uses simple counter with TTL for rate limiting.
+    Uses simple counter with TTL for rate limiting (one EVALSHA on the
+    shared Redis client).
     
     Returns True if allowed, False if rate limited.
     """
-    import redis
-    from core.config import settings
+    global _rate_limit_script
     
     try:
-        r = redis.from_url(settings.REDIS_URL)
-        key = get_domain_rate_limit_key(url)
-        
-        current = r.get(key)
-        if current is None:
-            r.setex(key, RATE_LIMIT_WINDOW, 1)
-            return True
+        if _rate_limit_script is None:
+            _rate_limit_script = get_redis().register_script(RATE_LIMIT_SCRIPT)
         
-        if int(current) >= RATE_LIMIT_MAX_REQUESTS:
-            return False
-        
-        r.incr(key)
-        return True
+        key = get_domain_rate_limit_key(url)
+        return bool(_rate_limit_script(keys=[key], args=[RATE_LIMIT_WINDOW, RATE_LIMIT_MAX_REQUESTS]))
         
     except Exception as e:
         logger.warning(f"⚠️ Rate limit check failed: {e}")
@@ -1388,7 +2142,8 @@ def check_rate_limit(supabase, url: str) -> bool:
     retry_backoff=True,
     retry_backoff_max=60,
     max_retries=3,
-    acks_late=True
+    acks_late=True,
+    reject_on_worker_lost=True
 )
 def process_page_task(
     self,
@@ -1397,40 +2152,38 @@ def process_page_task(
     crawl_id: str
 ):
     """
-    Worker task: Process a single URL.
+    Worker task: Fetch and extract a single URL.
     
     Designed for distributed execution - many of these run in parallel.
+    Embedding and storage happen once per crawl in store_crawl_pages_task
+    (the chord callback), so this task only returns the page content.
     
     Args:
         url: Single URL to process
         user_id: User ID for multi-tenancy
         crawl_id: Parent crawl config ID for progress updates
     """
-    import time
-    import random
     
     task_id = self.request.id
     logger.info(f"🔗 [PageWorker:{task_id}] Processing: {url}")
     
     supabase = get_supabase()
     
+    # Rate limiting - requeue instead of sleeping so the slot serves
+    # another URL meanwhile (outside the try: Retry must propagate)
+    if not check_rate_limit(supabase, url):
+        if self.request.retries < RATE_LIMIT_MAX_RETRIES:
+            raise self.retry(
+                countdown=random.uniform(*RATE_LIMIT_RETRY_DELAY),
+                max_retries=RATE_LIMIT_MAX_RETRIES
+            )
+        logger.warning(f"⏳ [PageWorker:{task_id}] Rate limit retries exhausted for: {url}")
+    
     try:
-        # Rate limiting - wait if needed
-        max_wait = 5
-        waited = 0
-        while not check_rate_limit(supabase, url) and waited < max_wait:
-            time.sleep(0.5)
-            waited += 0.5
-        
-        if waited >= max_wait:
-            logger.warning(f"⏳ [PageWorker:{task_id}] Rate limit timeout for: {url}")
-        
-        # Import connector
-        from connectors.web import WebConnector
-        connector = WebConnector()
+        connector = get_web_connector()
         
         # Ingest this URL
-        docs = connector.ingest({
+        docs = connector.ingest_sync({
             "item_ids": [url],
             "respect_robots": True
         })
@@ -1439,37 +2192,15 @@ def process_page_task(
             logger.warning(f"⚠️ [PageWorker:{task_id}] No content from: {url}")
             return {"status": "skipped", "url": url}
         
-        # Embed
-        from services.embeddings import generate_embeddings_batch
-        
         doc = docs[0]  # Single URL = single doc
-        chunk_embeddings = generate_embeddings_batch([doc.page_content])
-        chunk_embedding = chunk_embeddings[0]
-        
-        # Prepare for RPC
-        chunks_payload = [{
-            "content": doc.page_content,
-            "embedding": chunk_embedding,
-            "chunk_index": 0
-        }]
-        
-        # Atomic insert via RPC
-        content_size = len(doc.page_content.encode('utf-8'))
-        rpc_result = supabase.rpc("ingest_document_with_chunks", {
-            "p_user_id": user_id,
-            "p_doc_title": doc.metadata.get("title", url),
-            "p_source_type": doc.metadata.get("source", "web"),
-            "p_source_url": url,
-            "p_metadata": json.dumps(doc.metadata),
-            "p_chunks": json.dumps(chunks_payload),
-            "p_file_size_bytes": content_size
-        }).execute()
-        
-        if rpc_result.data:
-            logger.info(f"✅ [PageWorker:{task_id}] Ingested: {url}")
-            return {"status": "success", "url": url, "doc_id": str(rpc_result.data)}
-        else:
-            raise Exception("RPC returned no document ID")
+        logger.info(f"✅ [PageWorker:{task_id}] Fetched: {url}")
+        return {
+            "status": "success",
+            "url": url,
+            "title": doc.metadata.get("title", url),
+            "metadata": doc.metadata,
+            "content": doc.page_content
+        }
         
     except Exception as e:
         logger.error(f"❌ [PageWorker:{task_id}] Failed {url}: {e}")
@@ -1494,20 +2225,17 @@ def crawl_discovery_task(
     Master task: Discover URLs and dispatch worker tasks.
     
     This is the "Conductor" that:
-    1. Discovers all URLs (sitemap/recursive/single)
+    1. Discovers all URLs (sitemap/single), or seeds discover_page_task
+       fan-out for recursive crawls and returns right away
     2. Deduplicates against existing documents
     3. Dispatches process_page_task for each URL
-    4. Uses Celery Group for parallel execution
+    4. Uses Celery Chords for parallel execution
     
     Args:
         user_id: User's ID
         root_url: Starting URL
         crawl_config: Configuration dict with crawl_id, type, depth, etc.
     """
-    from celery import group
-    from collections import deque
-    import time
-    import random
     
     task_id = self.request.id
     crawl_id = crawl_config.get("crawl_id")
@@ -1529,132 +2257,36 @@ def crawl_discovery_task(
             "Web Crawl Started",
             f"Discovering pages from {root_url}",
             "info",
-            {"crawl_id": crawl_id, "crawl_type": crawl_type}
+            {"crawl_id": crawl_id, "crawl_type": crawl_type},
+            deferred=True
         )
         
         # ===== PHASE 1: DISCOVERY =====
-        from connectors.web import WebConnector
-        connector = WebConnector()
+        connector = get_web_connector()
         
         discovered_urls: List[str] = []
         
         if crawl_type == "sitemap":
             logger.info(f"🗺️ [Master:{task_id}] Parsing sitemap...")
-            discovered_urls = connector.parse_sitemap(root_url)
+            # Streamed: parsing (and downloading) stops at the discovery cap
+            discovered_urls = list(islice(connector.iter_sitemap_urls(root_url), DISCOVERY_MAX_URLS))
+            if len(discovered_urls) == DISCOVERY_MAX_URLS:
+                logger.warning(f"⚠️ [Master:{task_id}] Discovery limit reached ({DISCOVERY_MAX_URLS})")
             
-        elif crawl_type == "recursive":
+        elif crawl_type == "recursive" and max_depth > 0:
             logger.info(f"🔄 [Master:{task_id}] Recursive discovery...")
-            queue = deque([(root_url, 0)])
-            seen = {root_url}
-            
-            while queue:
-                url, depth = queue.popleft()
-                discovered_urls.append(url)
-                
-                if depth < max_depth:
-                    html = connector.fetch_html(url)
-                    if html:
-                        links = connector.extract_links(html, url)
-                        for link in links:
-                            if link not in seen:
-                                seen.add(link)
-                                queue.append((link, depth + 1))
-                    
-                    time.sleep(random.uniform(0.3, 0.6))
-                
-                # Limit discovery to prevent runaway
-                if len(discovered_urls) > 10000:
-                    logger.warning(f"⚠️ [Master:{task_id}] Discovery limit reached (10k)")
-                    break
+            # Fanned out over discover_page_task; the last one dispatches the pages
+            seed_recursive_discovery(task_id, user_id, root_url, crawl_config)
+            return {"status": "discovering", "crawl_id": crawl_id}
         else:
             discovered_urls = [root_url]
         
-        total_discovered = len(discovered_urls)
-        logger.info(f"📊 [Master:{task_id}] Discovered {total_discovered} URLs")
-        
-        # ===== PHASE 2: DEDUPLICATION =====
-        # Check which URLs are already in the database
-        existing_urls = set()
-        try:
-            existing_res = supabase.table("documents").select("source_url").eq(
-                "user_id", user_id
-            ).in_(
-                "source_url", discovered_urls[:1000]  # Batch limit
-            ).execute()
-            
-            if existing_res.data:
-                existing_urls = {d["source_url"] for d in existing_res.data if d.get("source_url")}
-        except Exception as e:
-            logger.warning(f"⚠️ [Master:{task_id}] Dedup query failed: {e}")
-        
-        # Filter out existing URLs (unless this is a re-crawl)
-        is_recrawl = crawl_config.get("is_recrawl", False)
-        if not is_recrawl:
-            new_urls = [url for url in discovered_urls if url not in existing_urls]
-            logger.info(f"📊 [Master:{task_id}] After dedup: {len(new_urls)} new URLs (skipped {len(existing_urls)} existing)")
-        else:
-            new_urls = discovered_urls
-            logger.info(f"📊 [Master:{task_id}] Re-crawl mode: processing all {len(new_urls)} URLs")
-        
-        if not new_urls:
-            if crawl_id:
-                update_crawl_status(supabase, crawl_id, status="completed", total_pages=0)
-            return {"status": "completed", "message": "No new URLs to crawl"}
-        
-        # Update total pages found
-        if crawl_id:
-            update_crawl_status(supabase, crawl_id, status="processing", total_pages=len(new_urls))
-        
-        # ===== PHASE 3: DISPATCH WORKERS =====
-        logger.info(f"🚀 [Master:{task_id}] Dispatching {len(new_urls)} worker tasks...")
-        
-        # Create Celery Group for parallel execution
-        job = group(
-            process_page_task.s(url, user_id, crawl_id)
-            for url in new_urls
+        # Dedupe on canonical form (sitemaps list /a and /a/ separately too)
+        discovered_urls = list(dict.fromkeys(canonicalize_url(url) for url in discovered_urls))
+        return dispatch_crawl_pages(
+            supabase, user_id, root_url, crawl_config, discovered_urls, run_id=task_id
         )
         
-        # Apply async - workers will process in parallel
-        result = job.apply_async()
-        
-        # Wait for completion and collect results
-        # Note: For very large crawls, consider using a callback instead
-        try:
-            results = result.get(timeout=3600)  # 1 hour max
-            
-            success_count = sum(1 for r in results if r.get("status") == "success")
-            failed_count = sum(1 for r in results if r.get("status") == "failed")
-            
-            logger.info(f"✅ [Master:{task_id}] Crawl complete: {success_count} success, {failed_count} failed")
-            
-            if crawl_id:
-                update_crawl_status(
-                    supabase, crawl_id,
-                    status="completed",
-                    pages_ingested=success_count,
-                    pages_failed=failed_count
-                )
-            
-            create_notification(
-                supabase, user_id,
-                "Web Crawl Complete",
-                f"Successfully ingested {success_count} pages from {root_url}",
-                "success",
-                {"crawl_id": crawl_id, "pages_ingested": success_count}
-            )
-            
-            return {
-                "status": "success",
-                "discovered": total_discovered,
-                "processed": len(new_urls),
-                "success": success_count,
-                "failed": failed_count
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ [Master:{task_id}] Worker group failed: {e}")
-            raise
-        
     except Exception as e:
         logger.error(f"❌ [Master:{task_id}] Discovery failed: {e}")
         
@@ -1672,12 +2304,548 @@ def crawl_discovery_task(
         raise
 
 
+def dispatch_crawl_pages(
+    supabase,
+    user_id: str,
+    root_url: str,
+    crawl_config: Dict[str, Any],
+    discovered_urls: List[str],
+    run_id: str
+) -> Dict[str, Any]:
+    """
+    Deduplicate discovered URLs and dispatch the page workers.
+    
+    Shared by crawl_discovery_task (sitemap/single crawls) and the last
+    discover_page_task of a recursive crawl.
+    
+    Args:
+        discovered_urls: Canonical, already unique URLs
+        run_id: Groups the dispatched batches of this crawl run
+    """
+    crawl_id = crawl_config.get("crawl_id")
+    total_discovered = len(discovered_urls)
+    logger.info(f"📊 [Master:{run_id}] Discovered {total_discovered} URLs")
+    
+    # ===== PHASE 2: DEDUPLICATION =====
+    # Filter out URLs already in the database (unless this is a re-crawl)
+    is_recrawl = crawl_config.get("is_recrawl", False)
+    if not is_recrawl:
+        existing_urls = find_existing_source_urls(supabase, user_id, discovered_urls)
+        new_urls = [url for url in discovered_urls if url not in existing_urls]
+        logger.info(f"📊 [Master:{run_id}] After dedup: {len(new_urls)} new URLs (skipped {len(existing_urls)} existing)")
+    else:
+        new_urls = discovered_urls
+        logger.info(f"📊 [Master:{run_id}] Re-crawl mode: processing all {len(new_urls)} URLs")
+    
+    if not new_urls:
+        if crawl_id:
+            update_crawl_status(supabase, crawl_id, status="completed", total_pages=0)
+        return {"status": "completed", "message": "No new URLs to crawl"}
+    
+    # Update total pages found
+    if crawl_id:
+        update_crawl_status(supabase, crawl_id, status="processing", total_pages=len(new_urls))
+    
+    # ===== PHASE 3: DISPATCH WORKERS =====
+    logger.info(f"🚀 [Master:{run_id}] Dispatching {len(new_urls)} worker tasks...")
+    
+    # One chord per CRAWL_DISPATCH_BATCH URLs: workers fetch pages in
+    # parallel, then the batch's callback embeds and stores them (no
+    # per-page OpenAI/RPC call, and the master never blocks on results).
+    # Batches are published concurrently, and the last callback to
+    # report finalizes the crawl.
+    batches = list(_iter_batches(new_urls, CRAWL_DISPATCH_BATCH))
+    callback = store_crawl_pages_task.s(
+        user_id, root_url, crawl_id,
+        run_id=run_id, total_batches=len(batches)
+    )
+    
+    def dispatch(batch: List[str]):
+        return chord(
+            process_page_task.s(url, user_id, crawl_id)
+            for url in batch
+        )(callback.clone())
+    
+    with ThreadPoolExecutor(max_workers=min(CRAWL_DISPATCH_CONCURRENCY, len(batches))) as pool:
+        callback_ids = [str(result.id) for result in pool.map(dispatch, batches)]
+    
+    return {
+        "status": "dispatched",
+        "crawl_id": crawl_id,
+        "discovered": total_discovered,
+        "processed": len(new_urls),
+        "callback_ids": callback_ids
+    }
+
+
+def seed_recursive_discovery(
+    run_id: str,
+    user_id: str,
+    root_url: str,
+    crawl_config: Dict[str, Any]
+) -> None:
+    """
+    Start a recursive crawl run: mark the root seen and queue its page.
+    
+    The run's parameters and its seen/in-flight sets live in Redis, so any
+    worker can pick up a discover_page_task, including after a restart.
+    """
+    root_url = canonicalize_url(root_url)
+    state_key = CRAWL_DISCOVERY_PREFIX + run_id
+    seen_key = CRAWL_SEEN_PREFIX + run_id
+    inflight_key = CRAWL_INFLIGHT_PREFIX + run_id
+    
+    pipe = get_redis().pipeline()
+    pipe.delete(state_key, seen_key, inflight_key)
+    pipe.hset(state_key, mapping={
+        "user_id": user_id,
+        "root_url": root_url,
+        "crawl_config": dumps_json(crawl_config)
+    })
+    pipe.sadd(seen_key, root_url)
+    pipe.sadd(inflight_key, root_url)
+    for key in (state_key, seen_key, inflight_key):
+        pipe.expire(key, CRAWL_RUN_TTL_SECONDS)
+    pipe.zadd(CRAWL_DISCOVERY_RUNS_KEY, {run_id: time.time()})
+    pipe.execute()
+    
+    discover_page_task.delay(run_id, root_url, 0)
+
+
+@celery_app.task(
+    bind=True,
+    autoretry_for=(ConnectionError, TimeoutError, redis.RedisError),
+    retry_backoff=True,
+    retry_backoff_max=60,
+    max_retries=3,
+    acks_late=True,
+    reject_on_worker_lost=True
+)
+def discover_page_task(
+    self,
+    run_id: str,
+    url: str,
+    depth: int
+):
+    """
+    Discovery task: Fetch one page of a recursive crawl and fan out its links.
+    
+    Links are deduped against the run's Redis `seen` set (SADD tells which
+    are new, across all workers). New links one level short of max_depth
+    get their own discover_page_task; links at max_depth are listed but not
+    fetched. Children join the run's in-flight set before this page leaves
+    it, so the set only empties once, in the last task of the run, which
+    then dedupes against existing documents and dispatches the page workers.
+    
+    A page that fails for good still leaves the in-flight set (with no
+    children), and a redelivered page that already left it does nothing.
+    Runs that stop making progress anyway are failed by
+    reap_stalled_discoveries.
+    
+    Args:
+        run_id: Master task ID (keys the run's Redis state)
+        url: Canonical URL to fetch
+        depth: Link distance from the root
+    """
+    
+    task_id = self.request.id
+    state_key = CRAWL_DISCOVERY_PREFIX + run_id
+    seen_key = CRAWL_SEEN_PREFIX + run_id
+    inflight_key = CRAWL_INFLIGHT_PREFIX + run_id
+    redis_client = get_redis()
+    
+    state = redis_client.hgetall(state_key)
+    if not state:
+        logger.warning(f"⚠️ [Discovery:{task_id}] Run {run_id} expired, dropping: {url}")
+        return {"status": "expired", "url": url}
+    
+    user_id = state[b"user_id"].decode()
+    root_url = state[b"root_url"].decode()
+    crawl_config = orjson.loads(state[b"crawl_config"])
+    max_depth = min(crawl_config.get("max_depth", 1), 10)
+    
+    # Politeness is shared with the page workers (per-domain Redis window)
+    if not check_rate_limit(None, url) and self.request.retries < RATE_LIMIT_MAX_RETRIES:
+        raise self.retry(
+            countdown=random.uniform(*RATE_LIMIT_RETRY_DELAY),
+            max_retries=RATE_LIMIT_MAX_RETRIES
+        )
+    
+    new_links: List[str] = []
+    try:
+        connector = get_web_connector()
+        try:
+            html = connector.fetch_html(url)
+            links = connector.extract_links(html, url) if html else []
+        except Exception as e:
+            logger.warning(f"⚠️ [Discovery:{task_id}] Failed to fetch {url}: {e}")
+            links = []
+        
+        links = list(dict.fromkeys(map(canonicalize_url, links)))
+        if links:
+            pipe = redis_client.pipeline()
+            pipe.scard(seen_key)
+            for link in links:
+                pipe.sadd(seen_key, link)
+            known, *added = pipe.execute()
+            fresh = [link for link, is_new in zip(links, added) if is_new]
+            # Runaway guard, approximate across concurrent workers
+            room = max(DISCOVERY_MAX_URLS - known, 0)
+            new_links, over_limit = fresh[:room], fresh[room:]
+            if over_limit:
+                logger.warning(f"⚠️ [Discovery:{task_id}] Discovery limit reached ({DISCOVERY_MAX_URLS})")
+                redis_client.srem(seen_key, *over_limit)
+        
+        children = new_links if depth + 1 < max_depth else []
+        if children:
+            redis_client.sadd(inflight_key, *children)
+            try:
+                group(discover_page_task.s(run_id, link, depth + 1) for link in children).apply_async()
+            except Exception:
+                # Never published: they must not hold the run open
+                redis_client.srem(inflight_key, *children)
+                raise
+    except Exception as e:
+        if isinstance(e, self.autoretry_for) and self.request.retries < self.max_retries:
+            raise
+        # Out of retries: finish this page as a leaf so the run still drains
+        logger.error(f"❌ [Discovery:{task_id}] Giving up on links from {url}: {e}")
+    
+    # Leave the in-flight set; the task that empties it owns the dispatch
+    pipe = redis_client.pipeline()
+    pipe.srem(inflight_key, url)
+    pipe.scard(inflight_key)
+    pipe.zadd(CRAWL_DISCOVERY_RUNS_KEY, {run_id: time.time()}, xx=True)
+    removed, remaining, _ = pipe.execute()
+    if not removed:
+        return {"status": "duplicate", "url": url}
+    if remaining > 0:
+        return {"status": "discovered", "url": url, "new_links": len(new_links)}
+    
+    # ===== LAST PAGE: DISPATCH THE CRAWL =====
+    # Claim the run; if the stall reaper already failed it, do nothing
+    if not redis_client.zrem(CRAWL_DISCOVERY_RUNS_KEY, run_id):
+        return {"status": "finalized", "url": url}
+    discovered_urls = sorted(member.decode() for member in redis_client.smembers(seen_key))
+    redis_client.delete(state_key, seen_key, inflight_key)
+    
+    supabase = get_supabase()
+    try:
+        return dispatch_crawl_pages(
+            supabase, user_id, root_url, crawl_config, discovered_urls, run_id=run_id
+        )
+    except Exception as e:
+        logger.error(f"❌ [Discovery:{task_id}] Dispatch failed: {e}")
+        return finalize_crawl(supabase, user_id, root_url, crawl_config.get("crawl_id"), 0, 0, str(e))
+
+
+@celery_app.task(bind=True, ignore_result=True)
+def reap_stalled_discoveries(self):
+    """
+    Fail recursive discovery runs that stopped making progress.
+    
+    A run whose in-flight set cannot drain (a page task lost for good, or
+    Redis unreachable for all of a page's retries) would otherwise sit in
+    "discovering" until its keys expire. Runs idle for longer than
+    CRAWL_DISCOVERY_STALL_SECONDS are claimed with ZREM (so a page task that
+    finishes late cannot dispatch them too) and finalized as failed.
+    """
+    client = get_redis()
+    cutoff = time.time() - CRAWL_DISCOVERY_STALL_SECONDS
+    reaped = 0
+    
+    for member in client.zrangebyscore(CRAWL_DISCOVERY_RUNS_KEY, 0, cutoff):
+        if not client.zrem(CRAWL_DISCOVERY_RUNS_KEY, member):
+            continue  # Finished or claimed meanwhile
+        run_id = member.decode() if isinstance(member, bytes) else member
+        state_key = CRAWL_DISCOVERY_PREFIX + run_id
+        state = client.hgetall(state_key)
+        client.delete(state_key, CRAWL_SEEN_PREFIX + run_id, CRAWL_INFLIGHT_PREFIX + run_id)
+        if not state:
+            continue
+        
+        crawl_config = orjson.loads(state[b"crawl_config"])
+        logger.warning(f"⏳ [Discovery] Run {run_id} stalled, failing crawl {crawl_config.get('crawl_id')}")
+        finalize_crawl(
+            get_supabase(), state[b"user_id"].decode(), state[b"root_url"].decode(),
+            crawl_config.get("crawl_id"), 0, 0,
+            f"Discovery stalled: no progress for {CRAWL_DISCOVERY_STALL_SECONDS // 60} minutes"
+        )
+        reaped += 1
+    
+    return reaped
+
+
+def record_crawl_batch(
+    run_id: str,
+    total_batches: int,
+    pages_ingested: int,
+    pages_failed: int
+) -> Dict[str, Any]:
+    """
+    Add one stored batch's counts to its crawl run.
+    
+    Counters live in a Redis hash updated with one pipelined round-trip,
+    so progress reaches the database once per batch instead of once per
+    page.
+    
+    Returns:
+        Run totals so far ({pages_ingested, pages_failed}) and `finished`,
+        True once the last batch has reported. Single-batch runs (and Redis
+        errors, fail-open) return the batch's own counts as finished.
+    """
+    batch_counts = {"pages_ingested": pages_ingested, "pages_failed": pages_failed, "finished": True}
+    if total_batches <= 1:
+        return batch_counts
+    
+    key = CRAWL_RUN_PREFIX + run_id
+    try:
+        pipe = get_redis().pipeline()
+        pipe.hincrby(key, "pages_ingested", pages_ingested)
+        pipe.hincrby(key, "pages_failed", pages_failed)
+        pipe.hincrby(key, "batches_done", 1)
+        pipe.expire(key, CRAWL_RUN_TTL_SECONDS)
+        ingested, failed, batches_done, _ = pipe.execute()
+    except Exception as e:
+        logger.warning(f"⚠️ [Crawl] Failed to record batch for run {run_id}: {e}")
+        return batch_counts
+    
+    finished = batches_done >= total_batches
+    if finished:
+        try:
+            get_redis().delete(key)
+        except Exception:
+            pass  # Expires on its own
+    return {"pages_ingested": ingested, "pages_failed": failed, "finished": finished}
+
+
+def finalize_crawl(
+    supabase,
+    user_id: str,
+    root_url: str,
+    crawl_id: Optional[str],
+    pages_ingested: int,
+    pages_failed: int,
+    error: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Write the terminal crawl status and notify the user.
+    
+    Called once per crawl run by the last store_crawl_pages_task batch, so
+    no task ever waits on the page group. The status write and the
+    notification are independent and run concurrently. A run that stored
+    nothing because of `error` is reported as failed.
+    """
+    if error and not pages_ingested:
+        run_concurrently(
+            lambda: crawl_id and update_crawl_status(supabase, crawl_id, status="failed", error_message=error),
+            lambda: create_notification(
+                supabase, user_id,
+                "Web Crawl Failed",
+                f"Failed to crawl {root_url}: {error[:200]}",
+                "error",
+                {"crawl_id": crawl_id, "error": error}
+            )
+        )
+        return {"status": "failed", "success": 0, "failed": pages_failed, "error": error}
+    
+    run_concurrently(
+        lambda: crawl_id and update_crawl_status(
+            supabase, crawl_id,
+            status="completed",
+            pages_ingested=pages_ingested,
+            pages_failed=pages_failed
+        ),
+        lambda: create_notification(
+            supabase, user_id,
+            "Web Crawl Complete",
+            f"Successfully ingested {pages_ingested} pages from {root_url}",
+            "success",
+            {"crawl_id": crawl_id, "pages_ingested": pages_ingested},
+            deferred=True
+        )
+    )
+    return {"status": "success", "success": pages_ingested, "failed": pages_failed}
+
+
+@celery_app.task(
+    bind=True,
+    autoretry_for=(ConnectionError, TimeoutError),
+    retry_backoff=True,
+    max_retries=2,
+    acks_late=True
+)
+def store_crawl_pages_task(
+    self,
+    results: List[Dict[str, Any]],
+    user_id: str,
+    root_url: str,
+    crawl_id: str,
+    run_id: str = None,
+    total_batches: int = 1
+):
+    """
+    Chord callback: Embed and store one batch of pages fetched by process_page_task.
+    
+    All page texts go through one embed_with_cache call (unchanged pages on
+    a re-crawl are served from the cache, the rest sub-batched by the
+    embeddings service) and are written with batched
+    ingest_documents_with_chunks RPCs, instead of one OpenAI request and one
+    RPC per page. The callback of the last batch to finish marks the crawl
+    completed and notifies the user.
+    
+    Args:
+        results: process_page_task return values, one per URL
+        user_id: User ID for multi-tenancy
+        root_url: Crawl root (for notifications)
+        crawl_id: Parent crawl config ID for progress updates
+        run_id: Dispatching master task ID (groups the batches of one crawl)
+        total_batches: Number of batches dispatched for this crawl run
+    """
+    
+    task_id = self.request.id
+    supabase = get_supabase()
+    
+    fetched = [r for r in results if r and r.get("status") == "success"]
+    failed_count = sum(1 for r in results if r and r.get("status") == "failed")
+    logger.info(f"🔢 [Store:{task_id}] Embedding {len(fetched)} pages...")
+    
+    error = None
+    try:
+        embeddings = embed_with_cache(supabase, [r["content"] for r in fetched])
+        
+        pages = [
+            {
+                "title": page["title"],
+                "source_url": page["url"],
+                "metadata": page["metadata"],
+                "file_size_bytes": len(page["content"].encode('utf-8')),
+                # Single chunk per page
+                "chunks": [{"content": page["content"], "embedding": embedding, "chunk_index": 0}]
+            }
+            for page, embedding in zip(fetched, embeddings)
+            if embedding is not None
+        ]
+        if len(pages) < len(fetched):
+            logger.warning(f"⚠️ [Store:{task_id}] Skipped {len(fetched) - len(pages)} empty pages")
+        
+        doc_ids = store_documents(supabase, user_id, "web", pages)
+        success_count = len(doc_ids)
+        logger.info(f"✅ [Store:{task_id}] Batch stored: {success_count} success, {failed_count} failed")
+        
+    except Exception as e:
+        logger.error(f"❌ [Store:{task_id}] Failed to store crawl pages: {e}")
+        # Let autoretry handle transient errors before counting the batch
+        if isinstance(e, self.autoretry_for) and self.request.retries < self.max_retries:
+            raise
+        error = str(e)
+        success_count, failed_count = 0, len(results)
+    
+    totals = record_crawl_batch(run_id or task_id, total_batches, success_count, failed_count)
+    if not totals["finished"]:
+        # Aggregated progress: one status write per batch
+        if crawl_id:
+            update_crawl_status(
+                supabase, crawl_id,
+                pages_ingested=totals["pages_ingested"],
+                pages_failed=totals["pages_failed"]
+            )
+        return {"status": "batch_stored", "success": success_count, "failed": failed_count}
+    
+    # ===== LAST BATCH: FINALIZE THE CRAWL =====
+    logger.info(f"✅ [Store:{task_id}] Crawl complete: {totals['pages_ingested']} success, {totals['pages_failed']} failed")
+    return finalize_crawl(
+        supabase, user_id, root_url, crawl_id,
+        totals["pages_ingested"], totals["pages_failed"], error
+    )
+
+
 @celery_app.task(bind=True)
 def health_check_task(self):
     """Simple task to verify worker is running."""
     return {"status": "healthy", "task_id": self.request.id}
 
 
+# ============================================================
+# STAGED UPLOAD CLEANUP TASK
+# ============================================================
+
+@celery_app.task(bind=True, ignore_result=True)
+def sweep_staging_uploads(self):
+    """
+    Delete staged uploads queued by schedule_staging_cleanup.
+    
+    Runs every few seconds via Celery Beat and removes up to
+    STAGING_CLEANUP_BATCH files per Storage API call.
+    """
+    supabase = get_supabase()
+    client = get_redis()
+    deleted = 0
+    
+    while True:
+        # Take one batch off the queue atomically (MULTI/EXEC). LPOP with a
+        # count would do the same but needs Redis >= 6.2.
+        pipe = client.pipeline()
+        pipe.lrange(STAGING_CLEANUP_KEY, 0, STAGING_CLEANUP_BATCH - 1)
+        pipe.ltrim(STAGING_CLEANUP_KEY, STAGING_CLEANUP_BATCH, -1)
+        paths, _ = pipe.execute()
+        if not paths:
+            break
+        paths = [path.decode() if isinstance(path, bytes) else path for path in paths]
+        try:
+            supabase.storage.from_(STAGING_BUCKET).remove(paths)
+            deleted += len(paths)
+        except Exception as e:
+            # Put them back for the next sweep
+            client.rpush(STAGING_CLEANUP_KEY, *paths)
+            logger.warning(f"⚠️ [Cleanup] Storage delete failed for {len(paths)} files: {e}")
+            break
+    
+    if deleted:
+        logger.info(f"🗑️ [Cleanup] Deleted {deleted} staged uploads")
+    return deleted
+
+
+# ============================================================
+# COMPLETION EMAIL FLUSH TASK
+# ============================================================
+
+@celery_app.task(bind=True, ignore_result=True)
+def flush_completion_emails(self):
+    """
+    Send one completion email per user for everything ingested since the
+    last flush (counts added by queue_completion_email).
+    
+    Runs every minute via Celery Beat; the emails themselves go out on the
+    notifications queue.
+    """
+    client = get_redis()
+    sent = 0
+    
+    while True:
+        user_ids = client.spop(PENDING_EMAIL_USERS_KEY, PENDING_EMAIL_FLUSH_BATCH)
+        if not user_ids:
+            break
+        user_ids = [user_id.decode() if isinstance(user_id, bytes) else user_id for user_id in user_ids]
+        
+        # Read and reset each count atomically; files added after this
+        # re-register the user for the next flush
+        pipe = client.pipeline()
+        for user_id in user_ids:
+            pipe.get(PENDING_EMAIL_COUNT_PREFIX + user_id)
+            pipe.delete(PENDING_EMAIL_COUNT_PREFIX + user_id)
+        counts = pipe.execute()[::2]
+        
+        for user_id, count in zip(user_ids, counts):
+            if count and int(count) > 0:
+                queue_email(send_email_task, user_id, int(count))
+                sent += 1
+    
+    if sent:
+        logger.info(f"📧 [Email] Queued {sent} coalesced completion emails")
+    return sent
+
+
 # ============================================================
 # DATABASE CLEANUP TASK
 # ============================================================
@@ -1690,8 +2858,6 @@ def cleanup_old_jobs(self):
     Runs daily via Celery Beat to prevent database bloat.
     Deletes jobs older than 30 days that are no longer active.
     """
-    from core.db import get_supabase
-    from datetime import datetime, timedelta, timezone
     
     task_id = self.request.id[:8] if self.request.id else "cleanup"
     logger.info(f"🧹 [Cleanup:{task_id}] Starting database cleanup...")
@@ -1,5 +1,8 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
+from urllib3.util.retry import Retry
 import os
 import json
 import time
@@ -14,6 +17,40 @@ if "backend" in BACKEND_URL and "localhost" not in os.getenv("BACKEND_URL", ""):
 
 API_KEY = "default-insecure-key"
 
+# Uploads above this are rejected before they are sent to the backend
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "200"))
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """One keep-alive HTTP session to the backend, shared across reruns."""
+    session = requests.Session()
+    # Retries cover connection errors for every method, status codes only for GETs
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_resource
+def get_probe_session() -> requests.Session:
+    """Keep-alive session without retries, so a down backend fails fast."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(ttl=10)
+def check_health(url: str):
+    """Backend /health status code (None if unreachable), cached across reruns."""
+    try:
+        return get_probe_session().get(f"{url}/health", timeout=2).status_code
+    except requests.RequestException:
+        return None
+
 # Page Config
 st.set_page_config(
     page_title="Axial Newton", 
@@ -71,13 +108,12 @@ with st.sidebar:
     st.caption(f"Backend: `{BACKEND_URL}`")
     
     # Health Check
-    try:
-        res = requests.get(f"{BACKEND_URL}/health", timeout=2)
-        if res.status_code == 200:
-            st.success("System Online 🟢")
-        else:
-            st.error(f"Status: {res.status_code} 🔴")
-    except:
+    health_status = check_health(BACKEND_URL)
+    if health_status == 200:
+        st.success("System Online 🟢")
+    elif health_status is not None:
+        st.error(f"Status: {health_status} 🔴")
+    else:
         st.error("System Unreachable 🔴")
         
     st.divider()
@@ -86,21 +122,28 @@ with st.sidebar:
     st.subheader("📚 Knowledge Base")
     st.info("Upload documents to train the RAG brain.")
     
-    uploaded_file = st.file_uploader("Upload File", type=["pdf", "txt", "docx", "png", "jpg"])
+    uploaded_file = st.file_uploader(
+        "Upload File", type=["pdf", "txt", "docx", "png", "jpg"], accept_multiple_files=False
+    )
     
-    if uploaded_file:
+    if uploaded_file and uploaded_file.size > MAX_UPLOAD_MB * 1024 * 1024:
+        st.error(f"File is larger than {MAX_UPLOAD_MB} MB.")
+    elif uploaded_file:
         if st.button("🚀 Ingest Document", use_container_width=True):
             with st.spinner("Processing & Embedding..."):
                 try:
-                    files = {"file": (uploaded_file.name, uploaded_file, uploaded_file.type)}
-                    data = {"metadata": json.dumps({"source": "frontend_upload", "client_id": "web-ui"})}
-                    headers = {"X-API-KEY": API_KEY}
+                    # Stream the multipart body from the upload buffer in chunks
+                    # (requests' files= would build the whole body in memory)
+                    body = MultipartEncoder(fields={
+                        "file": (uploaded_file.name, uploaded_file, uploaded_file.type),
+                        "metadata": json.dumps({"source": "frontend_upload", "client_id": "web-ui"}),
+                    })
+                    headers = {"X-API-KEY": API_KEY, "Content-Type": body.content_type}
                     
                     # POST to Backend
-                    response = requests.post(
+                    response = get_session().post(
                         f"{BACKEND_URL}/api/v1/ingest", 
-                        files=files, 
-                        data=data, 
+                        data=body, 
                         headers=headers
                     )
                     
@@ -140,22 +183,38 @@ if prompt := st.chat_input("Ask me anything..."):
         message_placeholder = st.empty()
         
         try:
-            payload = {"query": prompt, "model": "gpt-4o"}
+            payload = {"query": prompt}
             headers = {"X-API-KEY": API_KEY}
+            answer = ""
+            sources = []
+            error_msg = None
             
-            # Show a nice spinner while waiting
-            with st.spinner("Analyzing documents..."):
-                response = requests.post(
-                    f"{BACKEND_URL}/api/v1/chat", 
-                    json=payload, 
-                    headers=headers
-                )
+            # Stream tokens from the SSE endpoint so the answer renders as it is
+            # generated instead of after the whole completion
+            with get_session().post(
+                f"{BACKEND_URL}/api/v1/chat/stream", 
+                json=payload, 
+                headers=headers,
+                stream=True
+            ) as response:
+                if response.status_code != 200:
+                    error_msg = f"Server Error: {response.text}"
+                else:
+                    event = None
+                    for line in response.iter_lines(decode_unicode=True):
+                        if line.startswith("event: "):
+                            event = line[7:]
+                        elif line.startswith("data: "):
+                            data = json.loads(line[6:])
+                            if event == "sources":
+                                sources = [src.get("title") for src in data]
+                            elif event == "token":
+                                answer += data.get("token", "")
+                                message_placeholder.markdown(answer + "▌")
+                            elif event == "error":
+                                error_msg = f"Server Error: {data.get('error')}"
             
-            if response.status_code == 200:
-                data = response.json()
-                answer = data.get("answer", "")
-                sources = data.get("sources", [])
-                
+            if error_msg is None:
                 # Display Answer
                 message_placeholder.markdown(answer)
                 
@@ -172,7 +231,6 @@ if prompt := st.chat_input("Ask me anything..."):
                     "sources": sources
                 })
             else:
-                error_msg = f"Server Error: {response.text}"
                 message_placeholder.error(error_msg)
                 st.session_state.messages.append({"role": "assistant", "content": error_msg})
                 
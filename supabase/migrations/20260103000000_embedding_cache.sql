@@ -0,0 +1,30 @@
+-- Migration: Content-hash embedding cache
+-- Created: 2026-01-03
+-- Purpose: Skip re-embedding chunks whose text was already embedded
+
+-- ============================================================
+-- 1. EMBEDDING CACHE TABLE
+-- ============================================================
+-- Keyed by SHA-256 of the chunk text. Embeddings are deterministic
+-- per (model, text), so re-ingesting an unchanged Drive/Notion file
+-- can reuse the stored vectors instead of calling OpenAI again.
+
+CREATE TABLE IF NOT EXISTS public.embedding_cache (
+    hash TEXT PRIMARY KEY,
+    embedding VECTOR(1536) NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- ============================================================
+-- 2. SECURITY
+-- ============================================================
+-- Only the worker (service_role) reads/writes the cache.
+-- No policies = no access for anon/authenticated.
+
+ALTER TABLE public.embedding_cache ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE public.embedding_cache IS
+'SHA-256(chunk text) -> text-embedding-3-small vector. Worker-only cache to avoid re-embedding unchanged content.';
+
+-- Notify PostgREST
+NOTIFY pgrst, 'reload config';
@@ -0,0 +1,37 @@
+-- Migration: User notification context view
+-- Created: 2026-01-04
+-- Purpose: Let the worker fetch email address + opt-in flag in one round-trip
+
+-- ============================================================
+-- 1. VIEW
+-- ============================================================
+-- Joins profiles with the 'email_on_ingestion_complete' setting.
+-- A missing setting row means the user never opted out (default enabled).
+
+CREATE OR REPLACE VIEW public.user_notification_context
+WITH (security_invoker = true) AS
+SELECT
+    p.id,
+    p.email,
+    p.display_name,
+    p.full_name,
+    COALESCE(s.enabled, true) AS email_enabled
+FROM public.profiles p
+LEFT JOIN public.user_notification_settings s
+    ON s.user_id = p.id
+   AND s.setting_key = 'email_on_ingestion_complete';
+
+-- ============================================================
+-- 2. SECURITY
+-- ============================================================
+-- security_invoker keeps the underlying RLS policies in force;
+-- only the worker (service_role) needs to read it.
+
+REVOKE ALL ON public.user_notification_context FROM anon, authenticated;
+GRANT SELECT ON public.user_notification_context TO service_role;
+
+COMMENT ON VIEW public.user_notification_context IS
+'Profile email/name plus email_on_ingestion_complete opt-in (default true). Used by worker email notifications.';
+
+-- Notify PostgREST
+NOTIFY pgrst, 'reload config';
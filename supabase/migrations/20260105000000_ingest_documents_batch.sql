@@ -0,0 +1,71 @@
+-- Migration: Batched multi-document ingest RPC
+-- Created: 2026-01-05
+-- Purpose: Store many small documents (crawled pages) in one round-trip
+
+-- ============================================================
+-- 1. ingest_documents_with_chunks
+-- ============================================================
+-- Plural form of ingest_document_with_chunks. p_docs is an array of
+-- {title, source_url, metadata, file_size_bytes, chunks} objects; every
+-- document and its chunks are inserted in a single transaction.
+-- Returns the new document IDs in input order.
+
+CREATE OR REPLACE FUNCTION public.ingest_documents_with_chunks(
+    p_user_id UUID,
+    p_source_type TEXT,
+    p_docs JSONB
+) RETURNS UUID[]
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    doc_record JSONB;
+    v_doc_id UUID;
+    v_doc_ids UUID[] := '{}';
+BEGIN
+    FOR doc_record IN SELECT * FROM jsonb_array_elements(p_docs)
+    LOOP
+        INSERT INTO documents (user_id, title, source_type, source_url, metadata, file_size_bytes, created_at)
+        VALUES (
+            p_user_id,
+            doc_record->>'title',
+            p_source_type,
+            doc_record->>'source_url',
+            COALESCE(doc_record->'metadata', '{}'::jsonb),
+            COALESCE((doc_record->>'file_size_bytes')::bigint, 0),
+            NOW()
+        )
+        RETURNING id INTO v_doc_id;
+
+        -- Set-based chunk insert instead of a per-chunk loop
+        INSERT INTO document_chunks (document_id, content, embedding, chunk_index, created_at)
+        SELECT
+            v_doc_id,
+            chunk->>'content',
+            (chunk->>'embedding')::vector,
+            COALESCE((chunk->>'chunk_index')::int, (ord - 1)::int),
+            NOW()
+        FROM jsonb_array_elements(COALESCE(doc_record->'chunks', '[]'::jsonb)) WITH ORDINALITY AS c(chunk, ord);
+
+        v_doc_ids := v_doc_ids || v_doc_id;
+    END LOOP;
+
+    RETURN v_doc_ids;
+END;
+$$;
+
+-- ============================================================
+-- 2. SECURITY
+-- ============================================================
+-- Only the worker (service role) ingests on behalf of users.
+
+REVOKE EXECUTE ON FUNCTION public.ingest_documents_with_chunks(UUID, TEXT, JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.ingest_documents_with_chunks(UUID, TEXT, JSONB) TO service_role;
+
+COMMENT ON FUNCTION public.ingest_documents_with_chunks(UUID, TEXT, JSONB) IS
+'Batched atomic ingestion: creates many documents and their chunks in one transaction.
+Returns new document IDs in input order. SECURITY: Fixed search_path, service_role only.';
+
+-- Notify PostgREST
+NOTIFY pgrst, 'reload config';
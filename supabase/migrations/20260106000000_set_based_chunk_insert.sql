@@ -0,0 +1,53 @@
+-- Migration: Set-based chunk insert in ingest_document_with_chunks
+-- Created: 2026-01-06
+-- Purpose: Insert all chunks of a document with one statement instead of a row-at-a-time loop
+
+-- ============================================================
+-- 1. ingest_document_with_chunks
+-- ============================================================
+-- Same signature and behaviour as 20251227164000_fix_ingest_rpc_signature.
+-- The PL/pgSQL FOR loop executed one INSERT per chunk; a single
+-- INSERT ... SELECT over jsonb_array_elements lets Postgres plan the
+-- batch once and write it as one multi-row insert.
+
+CREATE OR REPLACE FUNCTION public.ingest_document_with_chunks(
+    p_user_id UUID,
+    p_doc_title TEXT,
+    p_source_type TEXT,
+    p_source_url TEXT,
+    p_metadata JSONB,
+    p_chunks JSONB,
+    p_file_size_bytes BIGINT DEFAULT 0  -- Track file size for quotas
+) RETURNS UUID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_doc_id UUID;
+BEGIN
+    -- 1. Insert Parent Document with file_size_bytes
+    INSERT INTO documents (user_id, title, source_type, source_url, metadata, file_size_bytes, created_at)
+    VALUES (p_user_id, p_doc_title, p_source_type, p_source_url, p_metadata, COALESCE(p_file_size_bytes, 0), NOW())
+    RETURNING id INTO v_doc_id;
+
+    -- 2. Insert all chunks in one statement (same transaction)
+    INSERT INTO document_chunks (document_id, content, embedding, chunk_index, created_at)
+    SELECT
+        v_doc_id,
+        chunk->>'content',
+        (chunk->>'embedding')::vector,
+        COALESCE((chunk->>'chunk_index')::int, (ord - 1)::int),
+        NOW()
+    FROM jsonb_array_elements(COALESCE(p_chunks, '[]'::jsonb)) WITH ORDINALITY AS c(chunk, ord);
+
+    RETURN v_doc_id;
+END;
+$$;
+
+COMMENT ON FUNCTION public.ingest_document_with_chunks(UUID, TEXT, TEXT, TEXT, JSONB, JSONB, BIGINT) IS
+'Atomic ingestion: Creates document and all chunks (single set-based insert) in one transaction.
+Tracks file_size_bytes for quota enforcement. SECURITY: Fixed search_path.';
+
+-- Notify PostgREST
+NOTIFY pgrst, 'reload config';
@@ -0,0 +1,120 @@
+-- Migration: Content hash on documents
+-- Created: 2026-01-07
+-- Purpose: Let the worker skip re-embedding and re-inserting content a user already has
+
+-- ============================================================
+-- 1. documents.content_hash
+-- ============================================================
+-- BLAKE2b-128 hex digest of the raw file / connector content, computed by
+-- the worker and passed in as metadata.content_hash. Nullable: crawled
+-- pages and documents ingested before this migration have none.
+-- Not unique on purpose: existing duplicates must stay valid, and the
+-- worker only uses it as a pre-check.
+-- The worker matches on (user_id, source, content_hash), where the source
+-- is source_url, or title for uploads that have none, so source_url and
+-- title are part of the index.
+
+ALTER TABLE public.documents ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_documents_user_content_hash_source
+    ON public.documents (user_id, content_hash, source_url, title)
+    WHERE content_hash IS NOT NULL;
+
+-- ============================================================
+-- 2. ingest_document_with_chunks
+-- ============================================================
+-- Same signature as 20260106000000_set_based_chunk_insert; also stores
+-- p_metadata->>'content_hash' on the document row.
+
+CREATE OR REPLACE FUNCTION public.ingest_document_with_chunks(
+    p_user_id UUID,
+    p_doc_title TEXT,
+    p_source_type TEXT,
+    p_source_url TEXT,
+    p_metadata JSONB,
+    p_chunks JSONB,
+    p_file_size_bytes BIGINT DEFAULT 0  -- Track file size for quotas
+) RETURNS UUID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_doc_id UUID;
+BEGIN
+    -- 1. Insert Parent Document with file_size_bytes and content hash
+    INSERT INTO documents (user_id, title, source_type, source_url, metadata, file_size_bytes, content_hash, created_at)
+    VALUES (
+        p_user_id, p_doc_title, p_source_type, p_source_url, p_metadata,
+        COALESCE(p_file_size_bytes, 0), p_metadata->>'content_hash', NOW()
+    )
+    RETURNING id INTO v_doc_id;
+
+    -- 2. Insert all chunks in one statement (same transaction)
+    INSERT INTO document_chunks (document_id, content, embedding, chunk_index, created_at)
+    SELECT
+        v_doc_id,
+        chunk->>'content',
+        (chunk->>'embedding')::vector,
+        COALESCE((chunk->>'chunk_index')::int, (ord - 1)::int),
+        NOW()
+    FROM jsonb_array_elements(COALESCE(p_chunks, '[]'::jsonb)) WITH ORDINALITY AS c(chunk, ord);
+
+    RETURN v_doc_id;
+END;
+$$;
+
+-- ============================================================
+-- 3. ingest_documents_with_chunks
+-- ============================================================
+-- Same signature as 20260105000000_ingest_documents_batch; also stores
+-- metadata.content_hash on each document row.
+
+CREATE OR REPLACE FUNCTION public.ingest_documents_with_chunks(
+    p_user_id UUID,
+    p_source_type TEXT,
+    p_docs JSONB
+) RETURNS UUID[]
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    doc_record JSONB;
+    v_doc_id UUID;
+    v_doc_ids UUID[] := '{}';
+BEGIN
+    FOR doc_record IN SELECT * FROM jsonb_array_elements(p_docs)
+    LOOP
+        INSERT INTO documents (user_id, title, source_type, source_url, metadata, file_size_bytes, content_hash, created_at)
+        VALUES (
+            p_user_id,
+            doc_record->>'title',
+            p_source_type,
+            doc_record->>'source_url',
+            COALESCE(doc_record->'metadata', '{}'::jsonb),
+            COALESCE((doc_record->>'file_size_bytes')::bigint, 0),
+            doc_record->'metadata'->>'content_hash',
+            NOW()
+        )
+        RETURNING id INTO v_doc_id;
+
+        -- Set-based chunk insert instead of a per-chunk loop
+        INSERT INTO document_chunks (document_id, content, embedding, chunk_index, created_at)
+        SELECT
+            v_doc_id,
+            chunk->>'content',
+            (chunk->>'embedding')::vector,
+            COALESCE((chunk->>'chunk_index')::int, (ord - 1)::int),
+            NOW()
+        FROM jsonb_array_elements(COALESCE(doc_record->'chunks', '[]'::jsonb)) WITH ORDINALITY AS c(chunk, ord);
+
+        v_doc_ids := v_doc_ids || v_doc_id;
+    END LOOP;
+
+    RETURN v_doc_ids;
+END;
+$$;
+
+-- Notify PostgREST
+NOTIFY pgrst, 'reload config';
@@ -0,0 +1,54 @@
+-- Migration: Set-based reset for scheduled re-crawls
+-- Created: 2026-01-08
+-- Purpose: Reset every due crawl config in one statement without round-tripping full rows
+
+-- ============================================================
+-- 1. reset_scheduled_crawls
+-- ============================================================
+-- p_rows is an array of {id, celery_task_id, next_crawl_at} objects; the
+-- shared reset columns are set here. Only rows that are still completed
+-- and scheduled are touched, so configs deleted or edited since the
+-- scheduler read them are skipped (never re-inserted or overwritten).
+-- Returns the IDs that were actually reset.
+
+CREATE OR REPLACE FUNCTION public.reset_scheduled_crawls(
+    p_rows JSONB,
+    p_now TIMESTAMPTZ DEFAULT NOW()
+) RETURNS SETOF UUID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    UPDATE web_crawl_configs AS c
+    SET
+        status = 'pending',
+        pages_ingested = 0,
+        pages_failed = 0,
+        total_pages_found = 0,
+        error_message = NULL,
+        celery_task_id = r.celery_task_id,
+        next_crawl_at = COALESCE(r.next_crawl_at, c.next_crawl_at),
+        last_crawl_at = p_now,
+        updated_at = p_now
+    FROM jsonb_to_recordset(COALESCE(p_rows, '[]'::jsonb))
+        AS r(id UUID, celery_task_id TEXT, next_crawl_at TIMESTAMPTZ)
+    WHERE c.id = r.id
+      AND c.status = 'completed'
+      AND c.refresh_interval != 'never'
+    RETURNING c.id;
+$$;
+
+-- ============================================================
+-- 2. SECURITY
+-- ============================================================
+-- Only the beat scheduler (service role) resets crawls.
+
+REVOKE EXECUTE ON FUNCTION public.reset_scheduled_crawls(JSONB, TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.reset_scheduled_crawls(JSONB, TIMESTAMPTZ) TO service_role;
+
+COMMENT ON FUNCTION public.reset_scheduled_crawls(JSONB, TIMESTAMPTZ) IS
+'Set-based re-crawl reset: updates only still-completed configs from (id, celery_task_id, next_crawl_at) rows.
+Returns reset IDs. SECURITY: Fixed search_path, service_role only.';
+
+-- Notify PostgREST
+NOTIFY pgrst, 'reload config';
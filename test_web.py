@@ -1,9 +1,17 @@
+import functools
 import jwt
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 
 BASE_URL = "http://localhost:8000"
 
+# Reuse one keep-alive connection for every request in the run
+session = requests.Session()
+session.mount("http://", HTTPAdapter(max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])))
+
+@functools.lru_cache(maxsize=128)
 def generate_token(user_id):
     payload = {"sub": user_id, "aud": "authenticated"}
     return jwt.encode(payload, "secret", algorithm="HS256")
@@ -21,7 +29,7 @@ def test_web_ingest(user_id, url):
     print(f"Crawling URL {url} for user {user_id}...")
     try:
         # Note: No 'files' argument here
-        response = requests.post(f"{BASE_URL}/api/v1/ingest", headers=headers, data=data)
+        response = session.post(f"{BASE_URL}/api/v1/ingest", headers=headers, data=data)
         print(f"Status: {response.status_code}")
         print(f"Response: {response.text}")
         return response.status_code == 200
@@ -40,7 +48,7 @@ def test_chat(user_id, query):
     
     print(f"Chatting as user {user_id}...")
     try:
-        response = requests.post(f"{BASE_URL}/api/v1/chat", headers=headers, json=payload)
+        response = session.post(f"{BASE_URL}/api/v1/chat", headers=headers, json=payload)
         print(f"Status: {response.status_code}")
         print(f"Answer: {response.json().get('answer')}")
         return response.json()